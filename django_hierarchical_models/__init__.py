@@ -1 +1,13 @@
-__all__ = ("models",)
+__all__ = (
+    "analytics",
+    "generator",
+    "index",
+    "integrity",
+    "models",
+    "operations",
+    "rebuild",
+    "refresher",
+    "serializers",
+    "testing",
+    "transfer",
+)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Any
+
+from django.db.models import Model, QuerySet
+
+from django_hierarchical_models.models.exceptions import CycleException
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+
+def _require_numpy():
+    if np is None:  # pragma: no cover
+        raise ImportError("django_hierarchical_models.analytics requires numpy")
+
+
+@dataclass
+class ForestMetrics:
+    """Per-row metrics of a whole forest, as aligned NumPy arrays.
+
+    Attributes:
+        pks: Primary keys, sorted.
+        parents: Index of each row's parent in pks, or -1 for roots.
+        depth: Number of ancestors of each row.
+        root: Primary key of each row's top level root.
+        children: Number of direct children of each row.
+        size: Number of rows in each row's subtree, including itself.
+        leaves: Number of leaves in each row's subtree, including itself.
+    """
+
+    pks: Any
+    parents: Any
+    depth: Any
+    root: Any
+    children: Any
+    size: Any
+    leaves: Any
+
+    @property
+    def descendants(self) -> Any:
+        """Number of children at any level of each row."""
+
+        return self.size - 1
+
+
+def load_parents(source: type[Model] | QuerySet) -> tuple[Any, Any]:
+    """Loads the parent links of a HierarchicalModel table into arrays.
+
+    Args:
+        source: A HierarchicalModel subclass or a QuerySet of one. Only the
+          primary key and parent_id columns are loaded. Primary keys must be
+          integers.
+
+    Returns:
+        A tuple of the sorted primary keys and the index of each row's parent
+        in them, -1 for roots and for parents outside of source.
+    """
+
+    _require_numpy()
+    queryset = source._base_manager.all() if isinstance(source, type) else source
+    pk_column = array("q")
+    parent_column = array("q")
+    for pk, parent_id in (
+        queryset.order_by("pk").values_list("pk", "parent_id").iterator()
+    ):
+        pk_column.append(pk)
+        parent_column.append(-1 if parent_id is None else parent_id)
+    pks = np.frombuffer(pk_column, dtype=np.int64)
+    parent_ids = np.frombuffer(parent_column, dtype=np.int64)
+    parents = np.searchsorted(pks, parent_ids)
+    found = parents < len(pks)
+    found[found] = pks[parents[found]] == parent_ids[found]
+    return pks, np.where(found, parents, -1)
+
+
+def compute_metrics(pks: Any, parents: Any) -> ForestMetrics:
+    """Computes depth, root, subtree size and leaf counts for every row.
+
+    Depths and roots are found by pointer jumping, which takes a logarithmic
+    number of vectorized passes. Subtree sizes and leaf counts are summed
+    into parents one generation at a time, deepest first, using bincount.
+
+    Args:
+        pks: Sorted primary keys, as returned by load_parents().
+        parents: Parent indices, as returned by load_parents().
+
+    Returns:
+        The metrics of every row.
+
+    Raises:
+        CycleException: The parent links contain a cycle.
+    """
+
+    _require_numpy()
+    n = len(pks)
+    index = np.arange(n)
+    is_root = parents == -1
+    jump = np.where(is_root, index, parents)
+    depth = (~is_root).astype(np.int64)
+    for _ in range(max(n, 1).bit_length() + 1):
+        next_jump = jump[jump]
+        if np.array_equal(next_jump, jump):
+            break
+        depth = depth + depth[jump]
+        jump = next_jump
+    if not is_root[jump].all():
+        raise CycleException(None, None, "The parent links contain a cycle")
+
+    has_parent = ~is_root
+    children = np.bincount(parents[has_parent], minlength=n)
+    size = np.ones(n, dtype=np.int64)
+    leaves = (children == 0).astype(np.int64)
+    order = np.argsort(depth, kind="stable")
+    bounds = np.searchsorted(depth[order], np.arange(depth.max(initial=0) + 2))
+    for generation in range(len(bounds) - 2, 0, -1):
+        rows = order[bounds[generation] : bounds[generation + 1]]
+        size += np.bincount(parents[rows], weights=size[rows], minlength=n).astype(
+            np.int64
+        )
+        leaves += np.bincount(parents[rows], weights=leaves[rows], minlength=n).astype(
+            np.int64
+        )
+    return ForestMetrics(pks, parents, depth, pks[jump], children, size, leaves)
+
+
+def forest_metrics(source: type[Model] | QuerySet) -> ForestMetrics:
+    """Loads a table with load_parents() and runs compute_metrics() on it."""
+
+    return compute_metrics(*load_parents(source))
+
+
+def write_metrics(
+    model: type[Model],
+    metrics: ForestMetrics,
+    fields: dict[str, str],
+    batch_size: int = 1000,
+    using: str | None = None,
+) -> int:
+    """Writes metrics back to the table with bulk updates.
+
+    Args:
+        model: The HierarchicalModel subclass to update.
+        metrics: Metrics from compute_metrics().
+        fields: Model field name by ForestMetrics attribute name, eg.
+          {"depth": "level", "descendants": "descendant_count"}.
+        batch_size: Number of rows per UPDATE.
+        using: Optional database alias.
+
+    Returns:
+        The number of rows updated.
+    """
+
+    _require_numpy()
+    columns = {field: getattr(metrics, metric) for metric, field in fields.items()}
+    manager = model._base_manager.db_manager(using)
+    updated = 0
+    for start in range(0, len(metrics.pks), batch_size):
+        stop = start + batch_size
+        chunk = {
+            field: values[start:stop].tolist() for field, values in columns.items()
+        }
+        instances = [
+            model(pk=pk, **{field: values[i] for field, values in chunk.items()})
+            for i, pk in enumerate(metrics.pks[start:stop].tolist())
+        ]
+        updated += manager.bulk_update(instances, list(columns))
+    return updated
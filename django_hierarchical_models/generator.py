@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Callable
+from typing import Any
+
+from django.db import NotSupportedError, connections, router, transaction
+
+from django_hierarchical_models.models import DescendantCountModel, HierarchicalModel
+
+# Number of children of every node of a "balanced" tree.
+BRANCHING = 4
+# One in this many nodes of a "forest" is a root.
+ROOT_EVERY = 10
+
+
+def _chain(n: int, rng: random.Random) -> list[int | None]:
+    return [None, *range(n - 1)][:n]
+
+
+def _star(n: int, rng: random.Random) -> list[int | None]:
+    return [None, *[0] * (n - 1)][:n]
+
+
+def _balanced(n: int, rng: random.Random) -> list[int | None]:
+    return [None, *((i - 1) // BRANCHING for i in range(1, n))][:n]
+
+
+def _skewed(n: int, rng: random.Random) -> list[int | None]:
+    # Mostly extends the latest branch: a few long chains with short spurs.
+    return [
+        None,
+        *(i - 1 if rng.random() < 0.8 else rng.randrange(i) for i in range(1, n)),
+    ][:n]
+
+
+def _forest(n: int, rng: random.Random) -> list[int | None]:
+    return [None if i % ROOT_EVERY == 0 else rng.randrange(i) for i in range(n)]
+
+
+SHAPES: dict[str, Callable[[int, random.Random], list[int | None]]] = {
+    "chain": _chain,
+    "star": _star,
+    "balanced": _balanced,
+    "skewed": _skewed,
+    "forest": _forest,
+}
+
+
+def forest_parents(n: int, shape: str = "forest", seed: int = 0) -> list[int | None]:
+    """The structure of a synthetic forest, without touching the database.
+
+    Args:
+        n: Number of nodes.
+        shape: One of SHAPES: "chain" (a single path), "star" (one root with
+          n - 1 children), "balanced" (a complete tree where every node has
+          BRANCHING children), "skewed" (long chains with short spurs) or
+          "forest" (random trees, one node in ROOT_EVERY being a root).
+        seed: Seed of the random choices, so the same arguments always give
+          the same forest.
+
+    Returns:
+        The index of the parent of each node, which always comes before it,
+        or None for roots.
+
+    Raises:
+        ValueError: If shape is unknown.
+    """
+
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape {shape!r}, expected one of {list(SHAPES)}")
+    return SHAPES[shape](n, random.Random(seed))
+
+
+def generate_forest(
+    model: type[HierarchicalModel],
+    n: int,
+    shape: str = "forest",
+    seed: int = 0,
+    fields: Callable[[int], dict[str, Any]] | None = None,
+    batch_size: int = 1000,
+    using: str | None = None,
+) -> list[Any]:
+    """Inserts a synthetic forest of model instances.
+
+    Instances are inserted generation by generation with bulk_create(), so
+    the parents of every batch already have primary keys, and a million
+    rows take seconds rather than the hours of one save() per row. Like
+    bulk_create(), no signals are sent and save() is not called, so caches
+    of the model are not invalidated. The descendant_count of
+    DescendantCountModels is computed from the generated structure.
+
+    The database backend must return primary keys from bulk inserts, as
+    PostgreSQL, SQLite and MariaDB do.
+
+    Args:
+        model: The HierarchicalModel subclass to create instances of.
+        n: Number of instances.
+        shape: Shape of the forest, see forest_parents().
+        seed: Seed of the random choices of the shape.
+        fields: Function returning the values of other fields of the
+          instance with the given index, eg. required fields without a
+          default.
+        batch_size: Number of rows per INSERT statement.
+        using: Database alias to write to.
+
+    Returns:
+        The primary key of each instance, in the order of forest_parents().
+
+    Raises:
+        ValueError: If shape is unknown.
+        NotSupportedError: If the backend does not return primary keys from
+          bulk inserts.
+    """
+
+    parents = forest_parents(n, shape, seed)
+    using = using or router.db_for_write(model)
+    if not connections[using].features.can_return_rows_from_bulk_insert:
+        raise NotSupportedError(
+            "generate_forest() requires a backend which returns primary keys "
+            "from bulk inserts"
+        )
+    depth: list[int] = []
+    for parent in parents:
+        depth.append(0 if parent is None else depth[parent] + 1)
+    generations: dict[int, list[int]] = {}
+    for i, d in enumerate(depth):
+        generations.setdefault(d, []).append(i)
+    counts = None
+    if issubclass(model, DescendantCountModel):
+        counts = [0] * n
+        for i in range(n - 1, -1, -1):
+            parent = parents[i]
+            if parent is not None:
+                counts[parent] += counts[i] + 1
+
+    pks: list[Any] = [None] * n
+    manager = model._base_manager.using(using)
+    with transaction.atomic(using=using):
+        for d in sorted(generations):
+            indices = generations[d]
+            instances = []
+            for i in indices:
+                values = fields(i) if fields is not None else {}
+                parent = parents[i]
+                if parent is not None:
+                    values["parent_id"] = pks[parent]
+                if counts is not None:
+                    values["descendant_count"] = counts[i]
+                instances.append(model(**values))
+            manager.bulk_create(instances, batch_size=batch_size)
+            for i, instance in zip(indices, instances):
+                pks[i] = instance.pk
+    return pks
@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import mmap
+from array import array
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Iterable, Iterator
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, NoReturn
+
+from django.db.models import Model, QuerySet
+
+from django_hierarchical_models.models.exceptions import CycleException
+
+_MAGIC = 0x48494458  # "HIDX"
+_HEADER = 3
+_ITEMSIZE = array("q").itemsize
+
+# Names of the shared memory blocks created by this process (or the process it
+# was forked from), whose resource tracker registration must be kept.
+_created: set[str] = set()
+
+
+class ForestIndex:
+    """Read-only snapshot of the parent links of a HierarchicalModel table.
+
+    The snapshot is a flat buffer of 64 bit integers: a header, the sorted
+    primary keys, the index of each row's parent, and optionally CSR child
+    offsets and child indices. The buffer can live in a shared memory block
+    or a memory-mapped file, so one process can build it and any number of
+    worker processes can map it without copying. Primary keys must be
+    integers.
+
+    All methods take and return primary keys. Model instances are accepted
+    wherever a primary key is expected. Traversals raise CycleException if
+    they run into a cycle.
+    """
+
+    def __init__(self, buffer, owner: Any = None):
+        view = memoryview(buffer).cast("B").cast("q")
+        if len(view) < _HEADER or view[0] != _MAGIC:
+            raise ValueError("buffer does not contain a ForestIndex")
+        n = view[1]
+        self.has_csr = bool(view[2])
+        self._view = view
+        self._pks = view[_HEADER : _HEADER + n]
+        self._parents = view[_HEADER + n : _HEADER + 2 * n]
+        if self.has_csr:
+            self._offsets = view[_HEADER + 2 * n : _HEADER + 3 * n + 1]
+            self._children = view[_HEADER + 3 * n + 1 : _HEADER + 4 * n + 1]
+        self._owner = owner
+
+    @staticmethod
+    def serialize(source: type[Model] | QuerySet, csr: bool = True) -> array:
+        """Builds the buffer of a ForestIndex.
+
+        Args:
+            source: A HierarchicalModel subclass or a QuerySet of one. Only
+              the primary key and parent_id columns are loaded.
+            csr: Whether to include child offsets, which are required for
+              children() and descendants().
+
+        Returns:
+            An array of 64 bit integers suitable for ForestIndex().
+        """
+
+        queryset = source._base_manager.all() if isinstance(source, type) else source
+        rows = queryset.order_by("pk").values_list("pk", "parent_id").iterator()
+        return ForestIndex.serialize_rows(rows, csr)
+
+    @staticmethod
+    def serialize_rows(
+        rows: Iterable[tuple[int, int | None]], csr: bool = True
+    ) -> array:
+        """Builds the buffer of a ForestIndex from (pk, parent_id) rows.
+
+        Args:
+            rows: Rows ordered by primary key.
+            csr: Whether to include child offsets.
+
+        Returns:
+            An array of 64 bit integers suitable for ForestIndex().
+
+        Raises:
+            ValueError: The primary keys are not strictly increasing.
+        """
+
+        pks = array("q")
+        parent_ids = array("q")
+        for pk, parent_id in rows:
+            if pks and pk <= pks[-1]:
+                raise ValueError(
+                    f"rows must be ordered by primary key, got {pk} after {pks[-1]}"
+                )
+            pks.append(pk)
+            parent_ids.append(-1 if parent_id is None else parent_id)
+        n = len(pks)
+        parents = array("q", bytes(n * _ITEMSIZE))
+        for i, parent_id in enumerate(parent_ids):
+            j = bisect_left(pks, parent_id) if parent_id != -1 else n
+            parents[i] = j if j < n and pks[j] == parent_id else -1
+        del parent_ids
+        buffer = array("q", (_MAGIC, n, int(csr)))
+        buffer.extend(pks)
+        buffer.extend(parents)
+        if csr:
+            offsets = array("q", bytes((n + 1) * _ITEMSIZE))
+            for parent in parents:
+                if parent != -1:
+                    offsets[parent + 1] += 1
+            for i in range(n):
+                offsets[i + 1] += offsets[i]
+            children = array("q", bytes(n * _ITEMSIZE))
+            fill = array("q", offsets[:-1])
+            for i, parent in enumerate(parents):
+                if parent != -1:
+                    children[fill[parent]] = i
+                    fill[parent] += 1
+            buffer.extend(offsets)
+            buffer.extend(children)
+        return buffer
+
+    @classmethod
+    def build(cls, source: type[Model] | QuerySet, csr: bool = True) -> ForestIndex:
+        """Builds a ForestIndex in private process memory."""
+
+        return cls(cls.serialize(source, csr))
+
+    @classmethod
+    def create_shared(
+        cls,
+        source: type[Model] | QuerySet,
+        name: str | None = None,
+        csr: bool = True,
+    ) -> ForestIndex:
+        """Builds a ForestIndex in a new shared memory block.
+
+        The calling process owns the block and must call unlink() once the
+        workers no longer need it. Pass shared_name to attach().
+        """
+
+        buffer = cls.serialize(source, csr)
+        shm = shared_memory.SharedMemory(
+            name=name, create=True, size=len(buffer) * _ITEMSIZE
+        )
+        shm.buf[: len(buffer) * _ITEMSIZE] = buffer.tobytes()
+        _created.add(shm.name)
+        return cls(shm.buf, shm)
+
+    @classmethod
+    def attach(cls, name: str) -> ForestIndex:
+        """Maps a ForestIndex from an existing shared memory block."""
+
+        shm = shared_memory.SharedMemory(name=name)
+        if shm.name not in _created:
+            # Only the creator should unlink the block when it exits.
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore
+        return cls(memoryview(shm.buf).toreadonly(), shm)
+
+    def save(self, path: str):
+        """Writes the buffer to a file which can be mapped with open()."""
+
+        with open(path, "wb") as f:
+            f.write(self._view.cast("B"))
+
+    @classmethod
+    def open(cls, path: str) -> ForestIndex:
+        """Maps a ForestIndex from a file written by save()."""
+
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, mapped)
+
+    @property
+    def shared_name(self) -> str | None:
+        """Name of the shared memory block, if the index lives in one."""
+
+        if isinstance(self._owner, shared_memory.SharedMemory):
+            return self._owner.name
+        return None
+
+    def close(self):
+        """Releases the buffer. The index must not be used afterwards."""
+
+        for attr in ("_children", "_offsets", "_parents", "_pks", "_view"):
+            view = self.__dict__.pop(attr, None)
+            if view is not None:
+                view.release()
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+    def unlink(self):
+        """Destroys the shared memory block. Only called by its creator."""
+
+        if isinstance(self._owner, shared_memory.SharedMemory):
+            shm = self._owner
+            self.close()
+            shm.unlink()
+            _created.discard(shm.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._pks)
+
+    def __contains__(self, pk) -> bool:
+        return self._find(pk) != -1
+
+    def parent(self, pk) -> int | None:
+        """Primary key of the parent, or None for a root."""
+
+        parent = self._parents[self._index(pk)]
+        return None if parent == -1 else self._pks[parent]
+
+    def ancestors(self, pk, max_level: int | None = None) -> list[int]:
+        """Primary keys of the ancestors, closest ancestor first."""
+
+        if max_level is None:
+            max_level = len(self) + 1
+        ancestors: list[int] = []
+        i = self._parents[self._index(pk)]
+        while i != -1 and len(ancestors) < max_level:
+            if len(ancestors) == len(self):
+                self._cycle(pk)
+            ancestors.append(self._pks[i])
+            i = self._parents[i]
+        return ancestors
+
+    def root(self, pk) -> int:
+        """Primary key of the top level root, which may be pk itself."""
+
+        i = self._index(pk)
+        for _ in range(len(self)):
+            parent = self._parents[i]
+            if parent == -1:
+                return self._pks[i]
+            i = parent
+        self._cycle(pk)
+
+    def is_child_of(self, pk, parent) -> bool:
+        """Whether pk is a child of parent at any level."""
+
+        target = self._index(parent)
+        i = self._parents[self._index(pk)]
+        for _ in range(len(self)):
+            if i == -1:
+                return False
+            if i == target:
+                return True
+            i = self._parents[i]
+        self._cycle(pk)
+
+    def children(self, pk) -> list[int]:
+        """Primary keys of the direct children, in primary key order."""
+
+        i = self._index(pk)
+        self._require_csr()
+        return [
+            self._pks[c]
+            for c in self._children[self._offsets[i] : self._offsets[i + 1]]
+        ]
+
+    def descendants(self, pk, max_generations: int | None = None) -> list[int]:
+        """Primary keys of all children at any level, in breadth first order."""
+
+        self._require_csr()
+        descendants: list[int] = []
+        queue = deque([(self._index(pk), 0)])
+        while queue:
+            i, generation = queue.popleft()
+            if max_generations is not None and generation >= max_generations:
+                continue
+            for c in self._children[self._offsets[i] : self._offsets[i + 1]]:
+                if len(descendants) == len(self):
+                    self._cycle(pk)
+                descendants.append(self._pks[c])
+                queue.append((c, generation + 1))
+        return descendants
+
+    def rows(self) -> Iterator[tuple[int, int | None]]:
+        """(pk, parent_id) rows in primary key order."""
+
+        pks = self._pks
+        for pk, parent in zip(pks, self._parents):
+            yield pk, None if parent == -1 else pks[parent]
+
+    def with_parents(self, changes: dict[int, int | None]) -> array | None:
+        """Builds a buffer with the parents of existing rows replaced.
+
+        The current buffer is copied and only the changed parent links and
+        child slices are patched, so no sorting or full rebuild is needed.
+
+        Args:
+            changes: New parent primary key (or None) by primary key.
+
+        Returns:
+            A buffer suitable for ForestIndex(), or None when a primary key
+            in changes is not in this index and a full rebuild is required.
+        """
+
+        n = len(self)
+        moves = []
+        for pk, parent_pk in changes.items():
+            i = self._find(pk)
+            if i == -1:
+                return None
+            j = -1 if parent_pk is None else self._find(parent_pk)
+            moves.append((i, j))
+        parents = array("q")
+        parents.frombytes(self._parents.cast("B"))
+        if self.has_csr:
+            offsets = array("q")
+            offsets.frombytes(self._offsets.cast("B"))
+            children = array("q")
+            children.frombytes(self._children.cast("B"))
+        for i, j in moves:
+            old = parents[i]
+            if old == j:
+                continue
+            parents[i] = j
+            if not self.has_csr:
+                continue
+            shift = 0
+            if old != -1:
+                start = offsets[old]
+                children.pop(start + children[start : offsets[old + 1]].index(i))
+                shift = 1 if old < j else 0
+            if j != -1:
+                start, end = offsets[j] - shift, offsets[j + 1] - shift
+                children.insert(bisect_left(children, i, start, end), i)
+            # Only the offsets between the old and new parent move.
+            o = n if old == -1 else old
+            t = n if j == -1 else j
+            for q in range(o + 1, t + 1):
+                offsets[q] -= 1
+            for q in range(t + 1, o + 1):
+                offsets[q] += 1
+        buffer = array("q", (_MAGIC, n, int(self.has_csr)))
+        buffer.frombytes(self._pks.cast("B"))
+        buffer.extend(parents)
+        if self.has_csr:
+            del children[n:]
+            children.extend([0] * (n - len(children)))
+            buffer.extend(offsets)
+            buffer.extend(children)
+        return buffer
+
+    def _find(self, pk) -> int:
+        if isinstance(pk, Model):
+            pk = pk.pk
+        if not isinstance(pk, int):
+            return -1
+        i = bisect_left(self._pks, pk)
+        return i if i < len(self._pks) and self._pks[i] == pk else -1
+
+    def _index(self, pk) -> int:
+        i = self._find(pk)
+        if i == -1:
+            raise KeyError(pk)
+        return i
+
+    def _cycle(self, pk) -> NoReturn:
+        raise CycleException(pk, pk, f"The parents of {pk} contain a cycle")
+
+    def _require_csr(self):
+        if not self.has_csr:
+            raise ValueError("ForestIndex was built without child offsets")
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.db import models
+from django.db.models import Model, QuerySet
+from django.utils import timezone
+
+
+@dataclass
+class HierarchyReport:
+    """Problems found in the parent links of a HierarchicalModel table.
+
+    Attributes:
+        rows: Number of rows checked.
+        self_parents: Primary keys of rows which are their own parent.
+        cycles: Primary keys of each cycle of two or more rows, starting at
+          its smallest primary key and following parent links.
+        dangling: (pk, parent_id) of rows whose parent does not exist.
+    """
+
+    rows: int = 0
+    self_parents: list[int] = field(default_factory=list)
+    cycles: list[list[int]] = field(default_factory=list)
+    dangling: list[tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.self_parents or self.cycles or self.dangling)
+
+
+def scan_parents(
+    source: type[Model] | QuerySet, chunk_size: int = 10000
+) -> Iterator[tuple[int, int | None]]:
+    """(pk, parent_id) of every row, ordered by primary key.
+
+    Rows are read in keyset chunks, so no cursor is held open between chunks
+    and no model instances are created.
+
+    Args:
+        source: A HierarchicalModel subclass or a QuerySet of one.
+        chunk_size: Number of rows per query.
+    """
+
+    queryset = source._base_manager.all() if isinstance(source, type) else source
+    queryset = queryset.order_by("pk").values_list("pk", "parent_id")
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(chunk[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][0]
+
+
+def check_rows(rows: Iterable[tuple[int, int | None]]) -> HierarchyReport:
+    """Finds self-parents, cycles and dangling parents.
+
+    The rows are held as two arrays of 64 bit integers, 16 bytes per row, and
+    each row is visited once: parent links are followed from every row not
+    visited yet until a root, a visited row, or a row on the current path,
+    which closes a cycle.
+
+    Args:
+        rows: (pk, parent_id) rows ordered by primary key, eg. from
+          scan_parents(). Primary keys must be integers.
+
+    Returns:
+        The problems found.
+
+    Raises:
+        ValueError: The primary keys are not strictly increasing.
+    """
+
+    report = HierarchyReport()
+    pks = array("q")
+    parents = array("q")
+    for pk, parent_id in rows:
+        if pks and pk <= pks[-1]:
+            raise ValueError(
+                f"rows must be ordered by primary key, got {pk} after {pks[-1]}"
+            )
+        pks.append(pk)
+        parents.append(-1 if parent_id is None else parent_id)
+    n = report.rows = len(pks)
+    # Replace parent ids with their index in pks.
+    for i in range(n):
+        parent_id = parents[i]
+        if parent_id == -1:
+            continue
+        j = bisect_left(pks, parent_id)
+        if j < n and pks[j] == parent_id:
+            parents[i] = j
+        else:
+            report.dangling.append((pks[i], parent_id))
+            parents[i] = -1
+
+    # 0: not visited, 1: on the current path, 2: done.
+    state = bytearray(n)
+    for start in range(n):
+        if state[start]:
+            continue
+        path = []
+        i = start
+        while i != -1 and not state[i]:
+            state[i] = 1
+            path.append(i)
+            i = parents[i]
+        if i != -1 and state[i] == 1:
+            cycle = path[path.index(i) :]
+            if len(cycle) == 1:
+                report.self_parents.append(pks[i])
+            else:
+                first = cycle.index(min(cycle))
+                report.cycles.append([pks[j] for j in cycle[first:] + cycle[:first]])
+        for i in path:
+            state[i] = 2
+    return report
+
+
+def check_hierarchy(
+    source: type[Model] | QuerySet, chunk_size: int = 10000
+) -> HierarchyReport:
+    """Runs check_rows() on the rows of scan_parents()."""
+
+    return check_rows(scan_parents(source, chunk_size))
+
+
+def break_cycles(
+    model: type[Model],
+    report: HierarchyReport,
+    batch_size: int = 1000,
+    using: str | None = None,
+) -> list[int]:
+    """Makes one row of every cycle of report a root, with bulk updates.
+
+    The row with the smallest primary key of each cycle, and every
+    self-parent, gets a null parent. Fields with auto_now=True are set too,
+    as by set_parent().
+
+    Args:
+        model: The HierarchicalModel subclass the report is of.
+        report: Result of check_hierarchy().
+        batch_size: Number of rows per UPDATE.
+        using: Optional database alias.
+
+    Returns:
+        The primary keys of the rows made roots.
+    """
+
+    pks = [*report.self_parents, *(cycle[0] for cycle in report.cycles)]
+    values: dict[str, Any] = {"parent": None}
+    now = timezone.now()
+    for model_field in model._meta.fields:
+        if getattr(model_field, "auto_now", False):
+            if isinstance(model_field, models.DateTimeField):
+                values[model_field.name] = now
+            elif isinstance(model_field, models.DateField):
+                values[model_field.name] = now.date()
+            else:
+                values[model_field.name] = now.time()
+    manager = model._base_manager.db_manager(using)
+    for i in range(0, len(pks), batch_size):
+        manager.filter(pk__in=pks[i : i + batch_size]).update(**values)
+    return pks
@@ -0,0 +1,16 @@
+from django.apps import apps
+from django.core.management.base import CommandError
+
+from django_hierarchical_models.models import HierarchicalModel
+
+
+def get_hierarchical_model(label: str) -> type[HierarchicalModel]:
+    """Resolves an "app_label.ModelName" label to a HierarchicalModel."""
+
+    try:
+        model = apps.get_model(label)
+    except (LookupError, ValueError) as e:
+        raise CommandError(str(e)) from e
+    if not issubclass(model, HierarchicalModel):
+        raise CommandError(f"{label} is not a HierarchicalModel")
+    return model
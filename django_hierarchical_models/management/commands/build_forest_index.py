@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from django_hierarchical_models.index import ForestIndex
+from django_hierarchical_models.management.commands._utils import (
+    get_hierarchical_model,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a ForestIndex snapshot of a HierarchicalModel table to a file "
+        "which worker processes can map with ForestIndex.open()."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Model label, eg. app_label.ModelName.")
+        parser.add_argument("path", help="File to write the snapshot to.")
+        parser.add_argument(
+            "--no-csr",
+            action="store_true",
+            help="Omit child offsets. children()/descendants() will not work.",
+        )
+        parser.add_argument("--database", default=None)
+
+    def handle(self, *args, **options):
+        model = get_hierarchical_model(options["model"])
+        queryset = model._base_manager.using(options["database"])
+        with ForestIndex.build(queryset, csr=not options["no_csr"]) as index:
+            index.save(options["path"])
+            self.stdout.write(f"Wrote {len(index)} rows to {options['path']}")
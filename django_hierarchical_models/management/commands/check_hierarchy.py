@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_hierarchical_models.integrity import break_cycles, check_hierarchy
+from django_hierarchical_models.management.commands._utils import (
+    get_hierarchical_model,
+)
+from django_hierarchical_models.models.descendant_count import DescendantCountModel
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks the parent links of a HierarchicalModel table for self-parents, "
+        "cycles and dangling parents, reading (pk, parent_id) in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Model label, eg. app_label.ModelName.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Number of rows read per query.",
+        )
+        parser.add_argument(
+            "--break-cycles",
+            action="store_true",
+            help="Make the smallest primary key of every cycle, and every "
+            "self-parent, a root.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Maximum number of problems listed of each kind.",
+        )
+        parser.add_argument("--database", default=None)
+
+    def handle(self, *args, **options):
+        model = get_hierarchical_model(options["model"])
+        queryset = model._base_manager.using(options["database"])
+        report = check_hierarchy(queryset, options["chunk_size"])
+        limit = options["limit"]
+        self.stdout.write(f"Checked {report.rows} rows")
+        self._list("Self-parents", [str(pk) for pk in report.self_parents], limit)
+        self._list(
+            "Cycles",
+            [" -> ".join(map(str, [*cycle, cycle[0]])) for cycle in report.cycles],
+            limit,
+        )
+        self._list(
+            "Dangling parents",
+            [f"{pk} -> {parent_id}" for pk, parent_id in report.dangling],
+            limit,
+        )
+        problems = len(report.self_parents) + len(report.cycles)
+        if options["break_cycles"] and problems:
+            pks = break_cycles(model, report, using=options["database"])
+            self.stdout.write(f"Made {len(pks)} rows roots to break cycles")
+            if issubclass(model, DescendantCountModel):
+                self.stdout.write(
+                    "Run recompute_descendant_count to repair descendant_count"
+                )
+            problems = 0
+        problems += len(report.dangling)
+        if problems:
+            raise CommandError(f"Found {problems} problems in {model._meta.label}")
+
+    def _list(self, title: str, items: list[str], limit: int):
+        self.stdout.write(f"{title}: {len(items)}")
+        for item in items[:limit]:
+            self.stdout.write(f"  {item}")
+        if len(items) > limit:
+            self.stdout.write(f"  ... and {len(items) - limit} more")
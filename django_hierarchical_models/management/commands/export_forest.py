@@ -0,0 +1,57 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from django_hierarchical_models.management.commands._utils import (
+    get_hierarchical_model,
+)
+from django_hierarchical_models.transfer import export_csv, export_jsonl
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a forest or subtree of a HierarchicalModel table as JSON lines "
+        "or CSV, parents before children, for import_forest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Model label, eg. app_label.ModelName.")
+        parser.add_argument(
+            "--output", default="-", help="File to write, or - for stdout."
+        )
+        parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+        parser.add_argument(
+            "--root", default=None, help="Primary key of the subtree to export."
+        )
+        parser.add_argument(
+            "--field",
+            dest="fields",
+            nargs="+",
+            action="extend",
+            default=None,
+            help="Names of the fields to export, defaults to all of them.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of parents whose children are read per query.",
+        )
+        parser.add_argument("--database", default=None)
+
+    def handle(self, *args, **options):
+        model = get_hierarchical_model(options["model"])
+        queryset = model._base_manager.using(options["database"])
+        export = export_csv if options["format"] == "csv" else export_jsonl
+        arguments = (
+            queryset,
+            options["root"],
+            options["fields"],
+            options["batch_size"],
+        )
+        if options["output"] == "-":
+            count = export(self.stdout, *arguments)
+        else:
+            with open(options["output"], "w", newline="") as f:
+                count = export(f, *arguments)
+        sys.stderr.write(f"Exported {count} rows of {model._meta.label}\n")
@@ -0,0 +1,57 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.db import NotSupportedError
+
+from django_hierarchical_models.generator import SHAPES, generate_forest
+from django_hierarchical_models.management.commands._utils import (
+    get_hierarchical_model,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Inserts a synthetic forest of a HierarchicalModel, one generation per "
+        "batch of bulk inserts, for tests and benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Model label, eg. app_label.ModelName.")
+        parser.add_argument("n", type=int, help="Number of instances.")
+        parser.add_argument("--shape", choices=list(SHAPES), default="forest")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--index-field",
+            action="append",
+            default=[],
+            help="Field set to the index of each instance, eg. a required "
+            "integer field. Can be repeated.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows per INSERT statement.",
+        )
+        parser.add_argument("--database", default=None)
+
+    def handle(self, *args, **options):
+        model = get_hierarchical_model(options["model"])
+        names = options["index_field"]
+        for name in names:
+            try:
+                model._meta.get_field(name)
+            except FieldDoesNotExist as e:
+                raise CommandError(str(e)) from e
+        try:
+            pks = generate_forest(
+                model,
+                options["n"],
+                shape=options["shape"],
+                seed=options["seed"],
+                fields=lambda i: {name: i for name in names},
+                batch_size=options["batch_size"],
+                using=options["database"],
+            )
+        except NotSupportedError as e:
+            raise CommandError(str(e)) from e
+        self.stdout.write(f"Generated {len(pks)} {model._meta.label} rows")
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_hierarchical_models.management.commands._utils import (
+    get_hierarchical_model,
+)
+from django_hierarchical_models.models.descendant_count import DescendantCountModel
+from django_hierarchical_models.transfer import import_csv, import_jsonl
+
+
+class Command(BaseCommand):
+    help = (
+        "Inserts rows written by export_forest into a HierarchicalModel table "
+        "under new primary keys, in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Model label, eg. app_label.ModelName.")
+        parser.add_argument("input", help="File written by export_forest.")
+        parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+        parser.add_argument(
+            "--parent",
+            default=None,
+            help="Primary key of the row under which to insert the roots.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows per INSERT.",
+        )
+        parser.add_argument("--database", default=None)
+
+    def handle(self, *args, **options):
+        model = get_hierarchical_model(options["model"])
+        load = import_csv if options["format"] == "csv" else import_jsonl
+        try:
+            with open(options["input"], newline="") as f:
+                count = load(
+                    f,
+                    model,
+                    options["parent"],
+                    options["batch_size"],
+                    options["database"],
+                )
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+        self.stdout.write(f"Imported {count} rows into {model._meta.label}")
+        if issubclass(model, DescendantCountModel):
+            self.stdout.write(
+                "Run recompute_descendant_count to repair descendant_count"
+            )
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_hierarchical_models.management.commands._utils import (
+    get_hierarchical_model,
+)
+from django_hierarchical_models.rebuild import METRICS, RebuildResult, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds denormalized depth, root and subtree size columns of a "
+        "HierarchicalModel table, one root subtree at a time, optionally in a "
+        "process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Model label, eg. app_label.ModelName.")
+        parser.add_argument(
+            "--field",
+            action="extend",
+            nargs="+",
+            required=True,
+            metavar="METRIC=FIELD",
+            help=f"Field to write a metric to, one of {', '.join(METRICS)}, "
+            "eg. depth=level.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Number of worker processes, 0 to rebuild in this process.",
+        )
+        parser.add_argument(
+            "--roots-per-task",
+            type=int,
+            default=100,
+            help="Number of root subtrees per task.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows updated per statement.",
+        )
+        parser.add_argument(
+            "--state-file",
+            default=None,
+            help="File recording completed roots, so an interrupted rebuild "
+            "resumes where it stopped.",
+        )
+        parser.add_argument("--database", default=None)
+
+    def handle(self, *args, **options):
+        model = get_hierarchical_model(options["model"])
+        fields = {}
+        for item in options["field"]:
+            metric, _, name = item.partition("=")
+            if not name:
+                raise CommandError(f"Expected METRIC=FIELD, got {item!r}")
+            fields[metric] = name
+        try:
+            result = rebuild(
+                model._base_manager.using(options["database"]),
+                fields,
+                workers=options["workers"],
+                roots_per_task=options["roots_per_task"],
+                batch_size=options["batch_size"],
+                state_path=options["state_file"],
+                progress=self._progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+        if result.skipped:
+            self.stdout.write(f"Skipped {result.skipped} roots completed earlier")
+        self.stdout.write(f"Rebuilt {result.rows} rows under {result.roots} roots")
+        if result.unreachable:
+            self.stdout.write(
+                f"Left {result.unreachable} rows in or below cycles unchanged, "
+                "see check_hierarchy"
+            )
+
+    def _progress(self, result: RebuildResult, total: int):
+        done = result.skipped + result.roots
+        self.stdout.write(f"{done}/{total} roots, {result.rows} rows")
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.db.models.functions import Coalesce
+
+from django_hierarchical_models.management.commands._utils import (
+    get_hierarchical_model,
+)
+from django_hierarchical_models.models.descendant_count import DescendantCountModel
+from django_hierarchical_models.models.query import subtree_aggregate
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes descendant_count of every row of a DescendantCountModel "
+        "table, in batches of primary keys."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Model label, eg. app_label.ModelName.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows updated per statement.",
+        )
+        parser.add_argument("--database", default=None)
+
+    def handle(self, *args, **options):
+        model = get_hierarchical_model(options["model"])
+        if not issubclass(model, DescendantCountModel):
+            raise CommandError(f"{options['model']} is not a DescendantCountModel")
+        queryset = model._base_manager.using(options["database"])
+        count = Coalesce(subtree_aggregate(model, Count("pk"), include_self=False), 0)
+        batch_size = options["batch_size"]
+        updated = 0
+        last = None
+        while True:
+            # Keyset batches, so no cursor is held open while updating.
+            batch = queryset.order_by("pk")
+            if last is not None:
+                batch = batch.filter(pk__gt=last)
+            pks = list(batch.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            updated += queryset.filter(pk__in=pks).update(descendant_count=count)
+            last = pks[-1]
+        self.stdout.write(f"Recomputed descendant_count of {updated} rows")
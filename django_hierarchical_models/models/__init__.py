@@ -1,9 +1,39 @@
+from django_hierarchical_models.models.cache import TreeCache
+from django_hierarchical_models.models.denormalized import DenormalizedColumns
+from django_hierarchical_models.models.descendant_count import DescendantCountModel
 from django_hierarchical_models.models.exceptions import CycleException
 from django_hierarchical_models.models.hierarchical_model import HierarchicalModel
+from django_hierarchical_models.models.instrumentation import (
+    CallStats,
+    HierarchyStats,
+    hierarchy_stats,
+    traversal_finished,
+)
+from django_hierarchical_models.models.lazy import LazyNode
 from django_hierarchical_models.models.node import Node
+from django_hierarchical_models.models.ordered import OrderedHierarchicalModel
+from django_hierarchical_models.models.query import (
+    AncestorIds,
+    DescendantIds,
+    HierarchicalManager,
+    HierarchicalQuerySet,
+)
 
 __all__ = (
     "HierarchicalModel",
     "Node",
+    "LazyNode",
     "CycleException",
+    "TreeCache",
+    "DescendantCountModel",
+    "OrderedHierarchicalModel",
+    "DenormalizedColumns",
+    "AncestorIds",
+    "DescendantIds",
+    "HierarchicalManager",
+    "HierarchicalQuerySet",
+    "CallStats",
+    "HierarchyStats",
+    "hierarchy_stats",
+    "traversal_finished",
 )
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from django_hierarchical_models.models.node import Node
+
+
+@dataclass
+class _Entry:
+    tree: Any
+    version: tuple[Any, Any]
+    value: Any
+    size: int
+
+
+class TreeCache:
+    """Opt-in cache for children() and ancestors() results.
+
+    Assign an instance to the tree_cache attribute of a concrete
+    HierarchicalModel subclass to enable it. Proxy and multi-table
+    subclasses of that model share the cache. Results are held in an
+    in-process LRU, and optionally in a Django cache backend shared between
+    processes. Every entry remembers the tree (top level root) it was
+    computed from along with that tree's version. Saves which change a
+    parent, creations with a parent and deletions bump the versions of the
+    affected trees, so only entries from those trees are invalidated.
+
+    Changes to fields other than parent never invalidate entries, so cached
+    instances may hold stale field values. Every result is built from copies
+    of the cached instances, but instances reached through their relations
+    (eg. .parent) are shared and should be treated as read-only.
+
+    Queryset update() and bulk_update() do not send signals, so call
+    invalidate() or clear() after using them to change parents.
+
+    Attributes:
+        max_size: Maximum number of model instances held by the in-process
+          LRU, summed over all entries.
+        backend: Optional alias of a Django cache to also store entries and
+          tree versions in.
+        timeout: Timeout of entries stored in the Django cache backend.
+          Defaults to the backend's default timeout.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        backend: str | None = None,
+        timeout: Any = DEFAULT_TIMEOUT,
+    ):
+        self.max_size = max_size
+        self.backend = backend
+        self.timeout = timeout
+        self.model: Any = None
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._versions: dict[Any, int] = {}
+        self._generation = 0
+        self._invalidations = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def contribute_to_class(self, cls, name):
+        if cls._meta.abstract:
+            raise ImproperlyConfigured(
+                f"TreeCache can not be used on abstract model {cls.__name__}, "
+                "assign one to each concrete subclass instead"
+            )
+        if self.model is not None:
+            raise ImproperlyConfigured(
+                f"TreeCache is already used by {self.model.__name__}"
+            )
+        self.model = cls
+        setattr(cls, name, self)
+        # Connected without a sender so saves through proxy and multi-table
+        # subclasses are seen as well.
+        pre_save.connect(self._pre_save, weak=False)
+        post_save.connect(self._post_save, weak=False)
+        post_delete.connect(self._post_delete, weak=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fetch(
+        self,
+        instance,
+        method: str,
+        args: tuple,
+        compute: Callable[[], Any],
+    ) -> Any:
+        """Returns a cached result, computing and storing it on a miss.
+
+        Args:
+            instance: The instance the traversal starts from.
+            method: Name of the traversal method.
+            args: Hashable traversal arguments.
+            compute: Callable producing the result on a miss.
+
+        Returns:
+            The result, built from copies of the cached instances.
+        """
+
+        key = (instance._meta.label, method, instance.pk, args)
+        entry = self._get(key)
+        if entry is not None and entry.version == self._version(entry.tree):
+            return self._copy(entry.value)
+        invalidations = self._invalidations
+        value = compute()
+        # After computing, the parent chain is usually already loaded, which
+        # makes root() free for ancestors().
+        tree = instance.root().pk
+        version = self._version(tree)
+        if invalidations == self._invalidations:
+            self._set(
+                key, _Entry(tree, version, self._copy(value), self._sizeof(value))
+            )
+        return value
+
+    def invalidate(self, tree):
+        """Invalidates all entries computed from a tree.
+
+        Args:
+            tree: The primary key of the root of the tree.
+        """
+
+        with self._lock:
+            self._versions[tree] = self._versions.get(tree, 0) + 1
+            self._invalidations += 1
+        if self.backend is not None:
+            caches[self.backend].set(
+                self._backend_key("version", tree), uuid.uuid4().hex, None
+            )
+
+    def clear(self):
+        """Invalidates every entry, including those held by the backend."""
+
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._generation += 1
+            self._invalidations += 1
+            self._size = 0
+        if self.backend is not None:
+            caches[self.backend].set(
+                self._backend_key("generation", None), uuid.uuid4().hex, None
+            )
+
+    def _get(self, key) -> _Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if self.backend is None:
+            return None
+        entry = caches[self.backend].get(self._backend_key("entry", key))
+        if entry is not None:
+            self._set_local(key, entry)
+        return entry
+
+    def _set(self, key, entry: _Entry):
+        self._set_local(key, entry)
+        if self.backend is not None:
+            caches[self.backend].set(
+                self._backend_key("entry", key), entry, self.timeout
+            )
+
+    def _set_local(self, key, entry: _Entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+            self._entries[key] = entry
+            self._size += entry.size
+            while self._size > self.max_size and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+
+    def _version(self, tree) -> tuple[Any, Any]:
+        if self.backend is None:
+            return self._generation, self._versions.get(tree, 0)
+        # Versions are random tokens rather than counters, so a token which
+        # was evicted from the backend is replaced by one no entry matches.
+        backend = caches[self.backend]
+        keys = (
+            self._backend_key("generation", None),
+            self._backend_key("version", tree),
+        )
+        values = backend.get_many(keys)
+        for key in keys:
+            if key not in values:
+                backend.add(key, uuid.uuid4().hex, None)
+                values[key] = backend.get(key)
+        return values[keys[0]], values[keys[1]]
+
+    def _backend_key(self, kind: str, key) -> str:
+        digest = hashlib.md5(repr(key).encode(), usedforsecurity=False).hexdigest()
+        return f"hierarchical_models:{self.model._meta.label}:{kind}:{digest}"
+
+    def _tree_of(self, pk) -> Any:
+        return self.model._base_manager.get(pk=pk).root().pk
+
+    def _handles(self, sender) -> bool:
+        return isinstance(sender, type) and issubclass(sender, self.model)
+
+    def _pre_save(self, sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or instance._state.adding or not self._handles(sender):
+            return
+        if update_fields is not None and "parent" not in update_fields:
+            return
+        instance._tree_cache_parent_id = (
+            self.model._base_manager.filter(pk=instance.pk)
+            .values_list("parent_id", flat=True)
+            .first()
+        )
+
+    def _post_save(self, sender, instance, created, raw=False, **kwargs):
+        if raw or not self._handles(sender):
+            return
+        if created:
+            if instance.parent_id is not None:
+                self.invalidate(self._tree_of(instance.parent_id))
+            return
+        if not hasattr(instance, "_tree_cache_parent_id"):
+            return
+        old_parent_id = instance.__dict__.pop("_tree_cache_parent_id")
+        if old_parent_id == instance.parent_id:
+            return
+        for parent_id in (old_parent_id, instance.parent_id):
+            if parent_id is None:
+                self.invalidate(instance.pk)
+            else:
+                self.invalidate(self._tree_of(parent_id))
+
+    def _post_delete(self, sender, instance, **kwargs):
+        if not self._handles(sender):
+            return
+        if instance.parent_id is None:
+            self.invalidate(instance.pk)
+            return
+        try:
+            tree = self._tree_of(instance.parent_id)
+        except self.model.DoesNotExist:
+            self.clear()
+        else:
+            self.invalidate(tree)
+
+    @staticmethod
+    def _copy(value):
+        if isinstance(value, Node):
+            root = Node(copy.copy(value.instance), has_more=value.has_more)
+            stack = [(value, root)]
+            while stack:
+                node, node_copy = stack.pop()
+                for child in node.children:
+                    child_copy = Node(
+                        copy.copy(child.instance), has_more=child.has_more
+                    )
+                    node_copy.children.append(child_copy)
+                    stack.append((child, child_copy))
+            return root
+        return [copy.copy(instance) for instance in value]
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        if isinstance(value, Node):
+            return sum(1 for _ in value.preorder())
+        return max(len(value), 1)
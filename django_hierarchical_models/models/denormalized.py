@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, router, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, Substr
+from django.db.models.signals import post_save
+
+from django_hierarchical_models.models.exceptions import CycleException
+from django_hierarchical_models.models.query import DescendantIds
+
+# Values which can be denormalized. Each is computed from the parent's value
+# alone, so columns can be filled top-down, one generation at a time.
+COLUMNS = ("depth", "root", "path")
+
+
+def _root_values(fields: dict[str, str]) -> dict[str, Any]:
+    values = {
+        "depth": Value(0),
+        "root": F("pk"),
+        "path": Cast("pk", output_field=models.CharField()),
+    }
+    return {field: values[column] for column, field in fields.items()}
+
+
+def _child_values(model, fields: dict[str, str], separator: str) -> dict[str, Any]:
+    def parent(field: str) -> Subquery:
+        return Subquery(
+            model._base_manager.filter(pk=OuterRef("parent_id")).values(field)[:1]
+        )
+
+    values = {
+        "depth": (lambda field: parent(field) + 1),  # type: ignore[operator]
+        "root": parent,
+        "path": lambda field: Concat(
+            parent(field),
+            Value(separator),
+            Cast("pk", output_field=models.CharField()),
+            output_field=models.CharField(),
+        ),
+    }
+    return {field: values[column](field) for column, field in fields.items()}
+
+
+def _check_columns(fields: dict[str, str]):
+    unknown = set(fields) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown columns {sorted(unknown)}, expected {COLUMNS}")
+
+
+def fill_down(
+    model,
+    fields: dict[str, str],
+    pks: Iterable[Any],
+    separator: str = "/",
+    batch_size: int = 1000,
+    pause: float = 0.0,
+    using: str | None = None,
+) -> int:
+    """Fills the columns of the descendants of pks, one generation at a time.
+
+    Each batch of children is updated from the values stored in their
+    parents by a single UPDATE with a correlated subquery, in its own
+    transaction, so the parents must already be filled. Since the parent is
+    read when the row is written, rows moved while filling get the values of
+    their new parent.
+
+    Args:
+        model: The HierarchicalModel subclass, or a historical model.
+        fields: Model field name by COLUMNS name.
+        pks: Primary keys of filled rows whose descendants to fill.
+        separator: Separator of the primary keys in path.
+        batch_size: Number of rows per UPDATE, and of parents per query
+          finding their children.
+        pause: Seconds to sleep after each UPDATE, to throttle the load.
+        using: Optional database alias.
+
+    Returns:
+        The number of rows updated.
+
+    Raises:
+        CycleException: One of pks is its own descendant.
+    """
+
+    manager = model._base_manager.db_manager(using)
+    values = _child_values(model, fields, separator)
+    start = set(pks)
+    generation = list(start)
+    updated = 0
+    while generation:
+        children: list[Any] = []
+        for i in range(0, len(generation), batch_size):
+            children.extend(
+                manager.filter(
+                    parent_id__in=generation[i : i + batch_size]
+                ).values_list("pk", flat=True)
+            )
+        if not start.isdisjoint(children):
+            raise CycleException(None, None, "The parent links contain a cycle")
+        for i in range(0, len(children), batch_size):
+            with transaction.atomic(using=manager.db):
+                updated += manager.filter(pk__in=children[i : i + batch_size]).update(
+                    **values
+                )
+            if pause:
+                time.sleep(pause)
+        generation = children
+    return updated
+
+
+def backfill(
+    model,
+    fields: dict[str, str],
+    separator: str = "/",
+    batch_size: int = 1000,
+    pause: float = 0.0,
+    using: str | None = None,
+) -> int:
+    """Fills denormalized columns of a whole table in small batches.
+
+    Roots are read in keyset batches of batch_size. Each batch of roots is
+    filled, then their subtrees with fill_down(), generation by generation.
+    No transaction spans more than one UPDATE, so the table stays writable
+    and no long locks are held. Rows in or below a cycle are left unchanged.
+    Filling is idempotent, so it can be interrupted and run again.
+
+    Args:
+        model: The HierarchicalModel subclass, or a historical model.
+        fields: Model field name by COLUMNS name, eg. {"depth": "level"}.
+        separator: Separator of the primary keys in path.
+        batch_size: Number of rows per UPDATE.
+        pause: Seconds to sleep after each UPDATE.
+        using: Optional database alias.
+
+    Returns:
+        The number of rows updated.
+
+    Raises:
+        ValueError: fields names an unknown column.
+    """
+
+    _check_columns(fields)
+    manager = model._base_manager.db_manager(using)
+    roots = manager.filter(parent__isnull=True).order_by("pk")
+    values = _root_values(fields)
+    updated = 0
+    last = None
+    while True:
+        batch = roots if last is None else roots.filter(pk__gt=last)
+        pks = list(batch.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return updated
+        with transaction.atomic(using=manager.db):
+            updated += manager.filter(pk__in=pks).update(**values)
+        if pause:
+            time.sleep(pause)
+        updated += fill_down(model, fields, pks, separator, batch_size, pause, using)
+        last = pks[-1]
+
+
+class DenormalizedColumns:
+    """Dual-write of depth, root and path columns of a HierarchicalModel.
+
+    Assign an instance to an attribute of a concrete HierarchicalModel
+    subclass, naming the field of each column, eg.
+    DenormalizedColumns(depth="level", root="tree_id"). The fields must be
+    nullable, and path must be a CharField. Every save which creates a row
+    or may change its parent sets the columns of the row from those stored
+    in its parent, and updates its subtree if the row moved.
+
+    Rows whose parent is not filled yet are left alone, so the columns
+    converge while backfill(), or the BackfillHierarchy migration operation,
+    fills the table top-down. Queryset update(), bulk_create() and
+    bulk_update() bypass it.
+
+    Attributes:
+        fields: Model field name by COLUMNS name.
+        separator: Separator of the primary keys in path, which lists the
+          primary keys from the top level root to the row itself.
+    """
+
+    def __init__(
+        self,
+        depth: str | None = None,
+        root: str | None = None,
+        path: str | None = None,
+        separator: str = "/",
+    ):
+        self.fields = {
+            column: field
+            for column, field in (("depth", depth), ("root", root), ("path", path))
+            if field is not None
+        }
+        if not self.fields:
+            raise ImproperlyConfigured("DenormalizedColumns needs at least one column")
+        self.separator = separator
+        self.model: Any = None
+
+    def contribute_to_class(self, cls, name):
+        if cls._meta.abstract:
+            raise ImproperlyConfigured(
+                f"DenormalizedColumns can not be used on abstract model "
+                f"{cls.__name__}, assign one to each concrete subclass instead"
+            )
+        self.model = cls
+        setattr(cls, name, self)
+        # Connected without a sender so saves through proxy and multi-table
+        # subclasses are seen as well.
+        post_save.connect(self._post_save, weak=False)
+
+    def _handles(self, sender) -> bool:
+        return isinstance(sender, type) and issubclass(sender, self.model)
+
+    def _post_save(
+        self, sender, instance, created, raw=False, update_fields=None, **kwargs
+    ):
+        if raw or not self._handles(sender):
+            return
+        if not created and update_fields is not None and "parent" not in update_fields:
+            return
+        self.refresh(instance)
+
+    def refresh(self, instance):
+        """Sets the columns of instance and its subtree from its parent.
+
+        Costs one query when nothing changed, two when instance has no
+        children or its columns were filled, and one per generation of its
+        subtree otherwise.
+        """
+
+        using = instance._state.db or router.db_for_write(self.model)
+        manager = self.model._base_manager.db_manager(using)
+        names = list(self.fields.values())
+        stored = {
+            row["pk"]: row
+            for row in manager.filter(pk__in=[instance.pk, instance.parent_id]).values(
+                "pk", *names
+            )
+        }
+        parent = stored.get(instance.parent_id)
+        if instance.parent_id is not None and (
+            parent is None or any(parent[name] is None for name in names)
+        ):
+            return
+        new = self._values(instance.pk, parent)
+        old = stored.get(instance.pk)
+        if old is None or all(old[name] == new[name] for name in names):
+            return
+        with transaction.atomic(using=using):
+            if all(old[name] is not None for name in names):
+                # Shift the whole subtree relative to the old values.
+                manager.filter(
+                    pk__in=DescendantIds(self.model, instance.pk, include_self=True)
+                ).update(**self._shifted(old, new))
+            else:
+                manager.filter(pk=instance.pk).update(**new)
+                fill_down(
+                    self.model, self.fields, [instance.pk], self.separator, using=using
+                )
+        for name in names:
+            setattr(instance, name, new[name])
+
+    def _values(self, pk, parent: dict | None) -> dict[str, Any]:
+        values = {}
+        for column, name in self.fields.items():
+            if column == "depth":
+                values[name] = 0 if parent is None else parent[name] + 1
+            elif column == "root":
+                values[name] = pk if parent is None else parent[name]
+            else:
+                values[name] = (
+                    str(pk) if parent is None else f"{parent[name]}{self.separator}{pk}"
+                )
+        return values
+
+    def _shifted(self, old: dict, new: dict) -> dict[str, Any]:
+        values: dict[str, Any] = {}
+        for column, name in self.fields.items():
+            if column == "depth":
+                values[name] = F(name) + (new[name] - old[name])
+            elif column == "root":
+                values[name] = Value(new[name])
+            else:
+                values[name] = Concat(
+                    Value(new[name]),
+                    Substr(name, len(old[name]) + 1),
+                    output_field=models.CharField(),
+                )
+        return values
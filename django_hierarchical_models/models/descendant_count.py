@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import TypeVar
+
+from django.db import models, router, transaction
+from django.db.models import Case, F, Q, Subquery, Value, When
+
+from django_hierarchical_models.models.hierarchical_model import HierarchicalModel
+from django_hierarchical_models.models.instrumentation import instrumented
+from django_hierarchical_models.models.query import AncestorIds
+
+T = TypeVar("T", bound="DescendantCountModel")
+
+
+class DescendantCountModel(HierarchicalModel):
+    """A HierarchicalModel which stores the number of its descendants.
+
+    Creating an instance with a parent, deleting an instance and
+    set_parent() each update the affected ancestor chains with a single
+    UPDATE using F() expressions, so descendant_count can be read, filtered
+    and ordered on without any traversal. Instances already in memory are
+    not updated, and save() never writes descendant_count of an existing
+    row, so a stale value can not overwrite the stored one.
+
+    Assigning parent and calling save(), queryset update(), bulk_create()
+    and queryset delete() bypass the counter. Run the
+    recompute_descendant_count management command to repair it afterwards.
+
+    Attributes:
+        descendant_count: Number of children at any level.
+    """
+
+    descendant_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @instrumented
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding and not args and kwargs.get("update_fields") is None:
+            if not kwargs.get("force_insert"):
+                deferred = self.get_deferred_fields()
+                kwargs["update_fields"] = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.name != "descendant_count"
+                    and field.attname not in deferred
+                ]
+        using = kwargs.get("using") or router.db_for_write(
+            self.__class__, instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if adding and self.parent_id is not None:
+                self._shift(using, AncestorIds(self.__class__, self.pk), Value(1))
+
+    save.alters_data = True  # type: ignore
+
+    @instrumented
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using):
+            self._shift(
+                using, AncestorIds(self.__class__, self.pk), -self._subtree_size()
+            )
+            return super().delete(using, keep_parents)
+
+    delete.alters_data = True  # type: ignore
+
+    @instrumented
+    def set_parent(self: T, parent: T | None):
+        using = router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using):
+            old = AncestorIds(self.__class__, self.pk)
+            if parent is None:
+                self._shift(using, old, -self._subtree_size())
+            else:
+                # Ancestors shared by both chains are left unchanged.
+                new = AncestorIds(self.__class__, parent.pk, include_self=True)
+                size = self._subtree_size()
+                self.__class__._base_manager.using(using).filter(
+                    Q(pk__in=old) | Q(pk__in=new)
+                ).update(
+                    descendant_count=F("descendant_count")
+                    + Case(
+                        When(Q(pk__in=new) & ~Q(pk__in=old), then=size),
+                        When(Q(pk__in=old) & ~Q(pk__in=new), then=-size),
+                        default=Value(0),
+                    )
+                )
+            # Raises CycleException before saving, which rolls back the UPDATE.
+            super().set_parent(parent)
+
+    def _subtree_size(self):
+        count = self.__class__._base_manager.filter(pk=self.pk).values(
+            "descendant_count"
+        )
+        return Subquery(count) + 1
+
+    def _shift(self, using, chain: AncestorIds, delta):
+        self.__class__._base_manager.using(using).filter(pk__in=chain).update(
+            descendant_count=F("descendant_count") + delta
+        )
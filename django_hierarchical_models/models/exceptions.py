@@ -2,7 +2,8 @@ class CycleException(Exception):
     """Raised when setting a model parent would cause a cycle.
 
     While representable, cycles can cause infinite loops in many of the
-    HierarchicalModel methods.
+    HierarchicalModel methods. Also raised, with a message, by traversals
+    which run into an existing cycle.
 
     Attributes:
         parent: The instance which would have been the parent.
@@ -15,4 +16,6 @@ class CycleException(Exception):
         self.child = child
 
     def __str__(self):
+        if self.args:
+            return str(self.args[0])
         return f"Making {self.child} a child of {self.parent} would create a cycle"
@@ -1,29 +1,61 @@
 from collections import deque
 from collections.abc import Callable
-from typing import TypeVar
+from typing import TYPE_CHECKING, ClassVar, TypeVar
 
 from django.db import models
-from django.db.models import QuerySet
+from django.db.models import Q, QuerySet
 from django.db.models.manager import BaseManager
 
 from django_hierarchical_models.models.exceptions import CycleException
+from django_hierarchical_models.models.instrumentation import instrumented, record
+from django_hierarchical_models.models.lazy import LazyNode, _Loader
 from django_hierarchical_models.models.node import Node
+from django_hierarchical_models.models.pagination import descendants_page
+from django_hierarchical_models.models.query import (
+    DescendantIds,
+    HierarchicalManager,
+    HierarchicalQuerySet,
+    has_children,
+)
+from django_hierarchical_models.models.routing import (
+    db_for_read,
+    note_write,
+    parent_on,
+)
+
+if TYPE_CHECKING:
+    from django_hierarchical_models.models.cache import TreeCache
 
 T = TypeVar("T", bound="HierarchicalModel")
 
 
+def _labelled(queryset: QuerySet[T], method: str) -> QuerySet[T]:
+    """Instruments fetching queryset under the name of method."""
+
+    if isinstance(queryset, HierarchicalQuerySet):
+        queryset._hm_method = method
+    return queryset
+
+
 class HierarchicalModel(models.Model):
     """An abstract Django model supporting hierarchical data.
 
     Attributes:
         parent: ForeignKey to self.
+        tree_cache: Optional TreeCache used to cache the results of
+          ancestors() and children().
     """
 
     parent = models.ForeignKey("self", on_delete=models.SET_NULL, blank=True, null=True)
 
+    tree_cache: ClassVar["TreeCache | None"] = None
+
+    objects = HierarchicalManager()
+
     class Meta:
         abstract = True
 
+    @instrumented
     def set_parent(self: T, parent: T | None):
         """Set the parent of this instance and checks for cycles.
 
@@ -31,6 +63,12 @@ class HierarchicalModel(models.Model):
             parent: The new parent of this instance, or None to make this
               instance an orphan.
 
+        Fields with auto_now=True are saved along with the parent, so they
+        can be used to find moved instances. When the
+        HIERARCHICAL_MODELS_READ_YOUR_WRITES setting holds a number of
+        seconds, traversals of the model read from the database written to
+        for that long afterwards, whatever their using argument.
+
         Raises:
             CycleException: This operation would create a cycle.
         """
@@ -38,8 +76,20 @@ class HierarchicalModel(models.Model):
         if parent is not None and (parent == self or parent.is_child_of(self)):
             raise CycleException(parent, self)
         self.parent = parent
-        self.save(update_fields=("parent",))
-
+        record(rows=1)
+        self.save(
+            update_fields=[
+                "parent",
+                *(
+                    field.name
+                    for field in self._meta.fields
+                    if getattr(field, "auto_now", False)
+                ),
+            ]
+        )
+        note_write(self.__class__, self._state.db)
+
+    @instrumented
     def is_child_of(self: T, parent: T) -> bool:
         """Checks if this instance is a child of parent.
 
@@ -51,59 +101,90 @@ class HierarchicalModel(models.Model):
             false when checked against itself.
         """
 
+        depth = 1
         ancestor = self.parent
         while ancestor is not None:
+            record(rows=1, depth=depth)
             if ancestor == parent:
                 return True
             ancestor = ancestor.parent
+            depth += 1
         return False
 
-    def root(self: T) -> T:
+    @instrumented
+    def root(self: T, using: str | None = None) -> T:
         """Root of this instance.
 
+        Args:
+            using: Optional database alias to read the ancestors from, eg. a
+              replica. Defaults to the database of each instance.
+
         Returns:
             The top level root of this instance. Will return self if an orphan.
         """
 
+        using = db_for_read(self.__class__, using)
         root = self
-        while root.parent is not None:
-            root = root.parent  # type: ignore
+        depth = 0
+        while (parent := parent_on(root, using)) is not None:
+            root = parent
+            depth += 1
+        record(rows=depth, depth=depth)
         return root
 
+    @instrumented
     def ancestors(
         self: T,
         max_level: int | None = None,
+        using: str | None = None,
     ) -> list[T]:
         """Ancestors of this instance.
 
         Args:
             max_level: Optional maximum number of ancestors.
+            using: Optional database alias to read the ancestors from, eg. a
+              replica. Defaults to the database of each instance.
 
         Returns:
             An ordered list of ancestors instances, with the closest ancestor
             at the lowest index of the list.
         """
 
+        using = db_for_read(self.__class__, using)
+        if self.tree_cache is not None:
+            return self.tree_cache.fetch(
+                self,
+                "ancestors",
+                (max_level,),
+                lambda: self._ancestors(max_level, using),
+            )
+        return self._ancestors(max_level, using)
+
+    def _ancestors(self: T, max_level: int | None, using: str | None) -> list[T]:
         if max_level is None:
             max_level = -1
         ancestors = []
         ancestor: T | None
-        ancestor = self.parent  # type: ignore
+        ancestor = parent_on(self, using)
         while ancestor is not None and max_level != 0:
             ancestors.append(ancestor)
-            ancestor = ancestor.parent  # type: ignore
+            ancestor = parent_on(ancestor, using)
             max_level -= 1
+        record(rows=len(ancestors), depth=len(ancestors))
         return ancestors
 
     def direct_children(
         self: T,
         object_manager: BaseManager[T] | None = None,
+        using: str | None = None,
     ) -> QuerySet[T]:
         """The direct children of this instance.
 
         Args:
             object_manager: An optional object manager to use to query. Uses
               model's default object manager when none is provided.
+            using: Optional database alias to query, eg. a replica. Defaults
+              to the one chosen by the database routers.
 
         Returns:
             An unordered QuerySet containing all the direct children of this
@@ -112,14 +193,21 @@ class HierarchicalModel(models.Model):
 
         if object_manager is None:
             object_manager = self.__class__._default_manager
-        return object_manager.filter(parent=self)
+        queryset = object_manager.filter(parent=self)
+        using = db_for_read(self.__class__, using)
+        if using is not None:
+            queryset = queryset.using(using)
+        return _labelled(queryset, "direct_children")
 
+    @instrumented
     def children(
         self: T,
         max_generations: int | None = None,
         max_siblings: int | None = None,
         max_total: int | None = None,
         sibling_transform: Callable[[QuerySet[T]], QuerySet[T]] | None = None,
+        prune: Q | None = None,
+        using: str | None = None,
     ) -> Node[T]:
         """Get all children of this instance.
 
@@ -136,27 +224,233 @@ class HierarchicalModel(models.Model):
               will affect the order the children will appear in each returned
               node. It is applied before the number of siblings is limited, if
               applicable, so it will also determine which siblings are taken.
+            prune: Optional Q object. Children matching it are left out along
+              with their own children, by excluding them from each sibling
+              query.
+            using: Optional database alias to query, eg. a replica. Defaults
+              to the one chosen by the database routers.
 
         Returns:
             An instance of Node, containing a reference to this instance, and
             an ordered list of Nodes for the children taken for this instance.
         """
 
+        using = db_for_read(self.__class__, using)
+        if self.tree_cache is not None and sibling_transform is None and not prune:
+            return self.tree_cache.fetch(
+                self,
+                "children",
+                (max_generations, max_siblings, max_total),
+                lambda: self._children(
+                    max_generations, max_siblings, max_total, using=using
+                ),
+            )
+        return self._children(
+            max_generations, max_siblings, max_total, sibling_transform, prune, using
+        )
+
+    def descendants(
+        self: T,
+        max_generations: int | None = None,
+        prune: Q | None = None,
+        filter: Q | None = None,
+        include_self: bool = False,
+    ) -> QuerySet[T]:
+        """The children of this instance at any level, as a QuerySet.
+
+        The subtree is walked by a recursive CTE in a single query.
+
+        Args:
+            max_generations: Optional maximum number of generations to find,
+              eg. 1 would only find direct children.
+            prune: Optional Q object. Children matching it are left out along
+              with their own children. It is applied in the recursive term of
+              the CTE, so pruned branches are never scanned.
+            filter: Optional Q object applied to the result only. Children not
+              matching it are left out, but their children are still found.
+            include_self: Whether to include this instance.
+
+        Returns:
+            An unordered QuerySet of the descendants.
+        """
+
+        return self._descendants(
+            DescendantIds(
+                self.__class__,
+                self.pk,
+                include_self=include_self,
+                prune=prune,
+                max_generations=max_generations,
+            ),
+            filter,
+        )
+
+    def descendants_at_depth(
+        self: T,
+        depth: int,
+        prune: Q | None = None,
+        filter: Q | None = None,
+    ) -> QuerySet[T]:
+        """The children of this instance exactly depth generations below it.
+
+        Eg. 1 finds direct children and 2 grandchildren. See
+        descendants_between_depths().
+        """
+
+        return self.descendants_between_depths(depth, depth, prune, filter)
+
+    def descendants_between_depths(
+        self: T,
+        min_depth: int,
+        max_depth: int,
+        prune: Q | None = None,
+        filter: Q | None = None,
+    ) -> QuerySet[T]:
+        """The children of this instance between two generations below it.
+
+        The recursive CTE tracks the depth of each row and stops at
+        max_depth, and only rows at min_depth or below are selected.
+
+        Args:
+            min_depth: First generation to include, 0 being this instance.
+            max_depth: Last generation to include.
+            prune: Optional Q object, as for descendants().
+            filter: Optional Q object, as for descendants().
+
+        Returns:
+            An unordered QuerySet of the descendants.
+        """
+
+        if min_depth > max_depth:
+            return self.__class__._default_manager.none()
+        return self._descendants(
+            DescendantIds(
+                self.__class__,
+                self.pk,
+                include_self=min_depth <= 0,
+                prune=prune,
+                max_generations=max_depth,
+                min_generations=min_depth,
+            ),
+            filter,
+        )
+
+    def _descendants(self: T, ids: DescendantIds, filter: Q | None) -> QuerySet[T]:
+        queryset = self.__class__._default_manager.filter(pk__in=ids)
+        if filter is not None:
+            queryset = queryset.filter(filter)
+        return _labelled(queryset, "descendants")
+
+    @instrumented
+    def descendants_page(
+        self: T,
+        cursor: str | None = None,
+        page_size: int = 100,
+    ) -> tuple[list[T], str | None]:
+        """A page of the descendants of this instance, in depth first order.
+
+        Siblings are ordered by primary key. The cursor holds the primary keys
+        leading to the last instance of the page, so the next page resumes
+        right after it using the index on parent, and costs the same however
+        far into the subtree it is. Rows inserted, moved or deleted between
+        pages do not invalidate the cursor.
+
+        Args:
+            cursor: The cursor returned with the previous page, or None for
+              the first page.
+            page_size: Maximum number of instances per page.
+
+        Returns:
+            A tuple of the instances of the page, and the cursor of the next
+            page or None once the subtree is exhausted. The last page may be
+            empty.
+
+        Raises:
+            ValueError: The cursor is not valid.
+        """
+
+        items, next_cursor = descendants_page(self, cursor, page_size)
+        record(rows=len(items))
+        return items, next_cursor
+
+    def lazy_children(
+        self: T,
+        sibling_transform: Callable[[QuerySet[T]], QuerySet[T]] | None = None,
+        batch_size: int = 1000,
+    ) -> LazyNode[T]:
+        """Get the children of this instance, loaded on demand.
+
+        Unlike children(), nothing is fetched up front. The children of a
+        LazyNode are loaded when first accessed, together with those of the
+        other unloaded nodes fetched by the same query, so only the visited
+        parts of the tree are loaded and each level costs one query.
+
+        Args:
+            sibling_transform: A callable applied to each query, eg. to order
+              siblings. It receives the children of several instances at
+              once, so it must not limit the number of rows.
+            batch_size: Maximum number of nodes expanded by one query.
+
+        Returns:
+            An instance of LazyNode for this instance.
+        """
+
+        return LazyNode(self, _Loader(self.__class__, sibling_transform, batch_size))
+
+    def _children(
+        self: T,
+        max_generations: int | None,
+        max_siblings: int | None,
+        max_total: int | None,
+        sibling_transform: Callable[[QuerySet[T]], QuerySet[T]] | None = None,
+        prune: Q | None = None,
+        using: str | None = None,
+    ) -> Node[T]:
         if max_total is None:
             max_total = -1
-        root = Node[T](self)
+        root = Node[T](self, has_more=True)
         queue: deque[tuple[Node[T], Node[T], int]]
         queue = deque([(Node[T](None), root, 0)])  # type: ignore
         while queue and max_total != 0:
             parent, node, generation = queue.popleft()
             parent.children.append(node)
             max_total -= 1
+            record(depth=generation)
             if max_generations is None or generation < max_generations:
-                children = node.instance.direct_children()
+                node.has_more = False
+                children = node.instance.direct_children(using=using)
+                if prune is not None:
+                    children = children.exclude(prune)
+                if max_generations is not None and generation + 1 == max_generations:
+                    # These will not be expanded, so find out in the same query
+                    # whether they have children.
+                    children = children.annotate(
+                        hm_has_children=has_children(self.__class__, prune)
+                    )
                 if sibling_transform is not None:
                     children = sibling_transform(children)
                 if max_siblings is not None:
-                    children = children[:max_siblings]
-                for child in children:
-                    queue.append((node, Node[T](child), generation + 1))
+                    children = children[: max_siblings + 1]
+                for i, child in enumerate(children):
+                    if i == max_siblings:
+                        node.has_more = True
+                        break
+                    queue.append(
+                        (
+                            node,
+                            Node[T](
+                                child,
+                                has_more=child.__dict__.pop("hm_has_children", False),
+                            ),
+                            generation + 1,
+                        )
+                    )
+        # Queued nodes which were not taken are children missing from parent.
+        for parent, _, _ in queue:
+            parent.has_more = True
+        if root.has_more:
+            children = self.direct_children(using=using)
+            if prune is not None:
+                children = children.exclude(prune)
+            root.has_more = children.exists()
         return root
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import functools
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Model
+from django.dispatch import Signal
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Sent after every instrumented call, with sender the model class and stats
+# the CallStats of the call.
+traversal_finished = Signal()
+
+
+@dataclass(slots=True)
+class CallStats:
+    """Measurements of one call of a traversal or write method.
+
+    Queries made by nested instrumented calls, eg. the direct_children()
+    queries of children(), are counted by the outermost call only.
+
+    Attributes:
+        model: Label of the model, eg. "app_label.ModelName".
+        method: Name of the method, eg. "ancestors".
+        queries: Number of queries executed.
+        rows: Number of instances fetched or written.
+        depth: Number of generations walked, if the method walks any.
+        elapsed: Wall clock time of the call, in seconds.
+    """
+
+    model: str
+    method: str
+    queries: int = 0
+    rows: int = 0
+    depth: int | None = None
+    elapsed: float = 0.0
+
+
+@dataclass
+class HierarchyStats:
+    """The calls made within a hierarchy_stats() block.
+
+    Attributes:
+        calls: CallStats of every call, in the order they finished.
+    """
+
+    calls: list[CallStats] = field(default_factory=list)
+
+    @property
+    def queries(self) -> int:
+        return sum(call.queries for call in self.calls)
+
+    @property
+    def rows(self) -> int:
+        return sum(call.rows for call in self.calls)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(call.elapsed for call in self.calls)
+
+    def by_method(self) -> dict[str, list[CallStats]]:
+        """The calls grouped by "model.method"."""
+
+        grouped: dict[str, list[CallStats]] = {}
+        for call in self.calls:
+            grouped.setdefault(f"{call.model}.{call.method}", []).append(call)
+        return grouped
+
+
+_collectors: ContextVar[tuple[HierarchyStats, ...]] = ContextVar(
+    "hm_collectors", default=()
+)
+_active: ContextVar[CallStats | None] = ContextVar("hm_active", default=None)
+
+
+@contextmanager
+def hierarchy_stats() -> Iterator[HierarchyStats]:
+    """Collects the CallStats of the calls made within the block.
+
+    Blocks can be nested, and each collects every call made within it. Only
+    calls made in the same thread or task are collected.
+    """
+
+    stats = HierarchyStats()
+    token = _collectors.set((*_collectors.get(), stats))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+def _sql_comments() -> bool:
+    return getattr(settings, "HIERARCHICAL_MODELS_SQL_COMMENTS", False)
+
+
+def _enabled() -> bool:
+    return bool(
+        _collectors.get() or traversal_finished.has_listeners() or _sql_comments()
+    )
+
+
+def record(rows: int = 0, depth: int | None = None):
+    """Adds to the rows and depth of the instrumented call in progress."""
+
+    stats = _active.get()
+    if stats is None:
+        return
+    stats.rows += rows
+    if depth is not None:
+        stats.depth = depth if stats.depth is None else max(stats.depth, depth)
+
+
+def _execute_wrapper(stats: CallStats, comment: str | None):
+    def wrapper(execute, sql, params, many, context):
+        stats.queries += 1
+        if comment is not None:
+            sql = f"{comment} {sql}"
+        return execute(sql, params, many, context)
+
+    return wrapper
+
+
+def measure(model: type[Model], method: str, call: Callable[[], Any]) -> Any:
+    """Calls call() as an instrumented call of method, returning its result."""
+
+    if _active.get() is not None or not _enabled():
+        return call()
+    stats = CallStats(model._meta.label, method)
+    comment = None
+    if _sql_comments():
+        comment = f"/* django_hierarchical_models {stats.model}.{method} */"
+    wrapper = _execute_wrapper(stats, comment)
+    # Outermost, so that other wrappers see the comment as well.
+    for connection in connections.all():
+        connection.execute_wrappers.insert(0, wrapper)
+    token = _active.set(stats)
+    start = time.perf_counter()
+    try:
+        return call()
+    finally:
+        stats.elapsed = time.perf_counter() - start
+        _active.reset(token)
+        for connection in connections.all():
+            connection.execute_wrappers.remove(wrapper)
+        for collector in _collectors.get():
+            collector.calls.append(stats)
+        traversal_finished.send(sender=model, stats=stats)
+
+
+def instrumented(method: F) -> F:
+    """Decorates a method of a model, or of an object with a model attribute.
+
+    Calls are measured, reported to hierarchy_stats() blocks and
+    traversal_finished receivers, and their SQL is prefixed with a comment
+    naming the method when the HIERARCHICAL_MODELS_SQL_COMMENTS setting is
+    True. When none of these is in use, the method is called directly.
+    """
+
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        model = type(self) if isinstance(self, Model) else self.model
+        return measure(model, name, lambda: method(self, *args, **kwargs))
+
+    return wrapper  # type: ignore
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any, Generic, TypeVar
+
+from django.db.models import QuerySet
+
+from django_hierarchical_models.models.instrumentation import measure, record
+from django_hierarchical_models.models.query import has_children
+
+T = TypeVar("T")
+
+
+class LazyNode(Generic[T]):
+    """Node whose children are loaded from the database when first accessed.
+
+    Nodes created by the same query form a batch. Accessing the children of
+    any unloaded node of a batch loads the children of up to batch_size
+    unloaded nodes of that batch in one parent_id__in query, so walking a
+    tree level by level costs one query per level rather than one per node.
+    Every query also finds out which of the loaded nodes have no children,
+    so accessing their children costs nothing.
+
+    LazyNodes are not thread safe.
+
+    Attributes:
+        instance: The HierarchicalModel instance for this node.
+    """
+
+    __slots__ = ("instance", "_children", "_loader", "_batch")
+
+    def __init__(
+        self,
+        instance: T,
+        loader: _Loader,
+        batch: list[LazyNode[T]] | None = None,
+    ):
+        self.instance = instance
+        self._children: list[LazyNode[T]] | None = None
+        self._loader = loader
+        self._batch = batch if batch is not None else [self]
+
+    @property
+    def children(self) -> list[LazyNode[T]]:
+        """An ordered list of LazyNodes for the children of this instance."""
+
+        if self._children is None:
+            self._loader.load(self)
+        assert self._children is not None
+        return self._children
+
+    @property
+    def loaded(self) -> bool:
+        """Whether children can be accessed without a query."""
+
+        return self._children is not None
+
+    @property
+    def has_more(self) -> bool:
+        """Whether the instance has children which are not loaded yet."""
+
+        return self._children is None
+
+    def __repr__(self):
+        return f"LazyNode({self.instance!r})"
+
+
+class _Loader:
+    def __init__(
+        self,
+        model,
+        sibling_transform: Callable[[QuerySet], QuerySet] | None,
+        batch_size: int,
+    ):
+        self.model = model
+        self.sibling_transform = sibling_transform
+        self.batch_size = batch_size
+
+    def load(self, node: LazyNode):
+        measure(self.model, "lazy_children", lambda: self._load(node))
+
+    def _load(self, node: LazyNode):
+        batch = node._batch
+        nodes = [node]
+        for other in batch:
+            if len(nodes) == self.batch_size:
+                break
+            if other._children is None and other is not node:
+                nodes.append(other)
+        children: dict[Any, list[LazyNode]] = {n.instance.pk: [] for n in nodes}
+        queryset = self.model._default_manager.filter(
+            parent_id__in=list(children)
+        ).annotate(hm_has_children=has_children(self.model))
+        if self.sibling_transform is not None:
+            queryset = self.sibling_transform(queryset)
+        new_batch: list[LazyNode] = []
+        for child in queryset:
+            child_node = LazyNode(child, self, new_batch)
+            if child.__dict__.pop("hm_has_children"):
+                new_batch.append(child_node)
+            else:
+                child_node._children = []
+            children[child.parent_id].append(child_node)
+        for n in nodes:
+            n._children = children[n.instance.pk]
+        record(rows=sum(len(c) for c in children.values()))
+        batch[:] = [n for n in batch if n._children is None]
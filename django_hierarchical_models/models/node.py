@@ -1,33 +1,143 @@
 from __future__ import annotations
 
-import copy
+from collections import deque
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass, field
 from typing import Generic, TypeVar
 
 T = TypeVar("T")
 
 
-@dataclass
+@dataclass(slots=True, eq=False, repr=False)
 class Node(Generic[T]):
     """Structured representation of an instance's children.
 
+    Nodes are slotted, and every method walks the tree iteratively, so very
+    deep trees neither hit the recursion limit nor take quadratic time to
+    print.
+
     Attributes:
         instance: The HierarchicalModel instance for this node.
         children: An ordered list of Nodes for the children of this instance.
+        has_more: Whether the instance has children which are not in
+          children, because it was not expanded or its children were
+          truncated. Lazy tree widgets can use it to render an expand arrow
+          without querying.
     """
 
     instance: T
     children: list[Node[T]] = field(default_factory=list)
+    has_more: bool = False
+
+    def preorder(self) -> Iterator[Node[T]]:
+        """Iterates over this node and its descendants, parents first."""
+
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def postorder(self) -> Iterator[Node[T]]:
+        """Iterates over this node and its descendants, children first."""
+
+        stack: list[tuple[Node[T], bool]] = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                yield node
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+
+    def level_order(self) -> Iterator[Node[T]]:
+        """Iterates over this node and its descendants, generation by generation."""
+
+        queue = deque([self])
+        while queue:
+            node = queue.popleft()
+            yield node
+            queue.extend(node.children)
+
+    def flatten(self) -> list[T]:
+        """The instances of this node and its descendants, in preorder."""
+
+        return [node.instance for node in self.preorder()]
+
+    def find(self, match: T | Callable[[T], bool]) -> Node[T] | None:
+        """The first node in preorder whose instance matches.
+
+        Args:
+            match: An instance to compare with, or a predicate taking an
+              instance.
+
+        Returns:
+            The matching node, or None.
+        """
+
+        for node in self.preorder():
+            if callable(match):
+                if match(node.instance):
+                    return node
+            elif node.instance == match:
+                return node
+        return None
+
+    def depth(self) -> int:
+        """Number of generations below this node, 0 for a node without children."""
+
+        depth = 0
+        stack = [(self, 0)]
+        while stack:
+            node, d = stack.pop()
+            depth = max(depth, d)
+            stack.extend((child, d + 1) for child in node.children)
+        return depth
+
+    def __eq__(self, other):
+        if not isinstance(other, Node):
+            return NotImplemented
+        stack = [(self, other)]
+        while stack:
+            a, b = stack.pop()
+            if a.instance != b.instance or len(a.children) != len(b.children):
+                return False
+            stack.extend(zip(a.children, b.children))
+        return True
 
     def __copy__(self):
-        return Node(self.instance, [copy.copy(child) for child in self.children])
+        root = Node(self.instance, has_more=self.has_more)
+        stack = [(self, root)]
+        while stack:
+            node, node_copy = stack.pop()
+            for child in node.children:
+                child_copy = Node(child.instance, has_more=child.has_more)
+                node_copy.children.append(child_copy)
+                stack.append((child, child_copy))
+        return root
 
-    def _child_printer(self, s, indent=0, dash=False):
-        s[0] += f"\n{' ' * indent}{'- ' if dash else ''}{self.instance}"
-        for child in self.children:
-            child._child_printer(s, indent + 2, True)
+    def __repr__(self) -> str:
+        parts = []
+        stack: list[Node[T] | str] = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            parts.append(f"Node(instance={item.instance!r}, children=[")
+            stack.append("])")
+            for i, child in enumerate(reversed(item.children)):
+                if i:
+                    stack.append(", ")
+                stack.append(child)
+        return "".join(parts)
 
     def __str__(self):
-        s = [""]
-        self._child_printer(s)
-        return s[0]
+        lines = [""]
+        stack = [(self, 0)]
+        while stack:
+            node, indent = stack.pop()
+            dash = "- " if indent else ""
+            lines.append(f"{' ' * indent}{dash}{node.instance}")
+            stack.extend((child, indent + 2) for child in reversed(node.children))
+        return "\n".join(lines)
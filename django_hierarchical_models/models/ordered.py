@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from typing import TypeVar
+
+from django.db import models, router, transaction
+from django.db.models import QuerySet, Subquery
+
+from django_hierarchical_models.models.hierarchical_model import HierarchicalModel
+
+T = TypeVar("T", bound="OrderedHierarchicalModel")
+
+# Distance between the positions of siblings after renumbering, which leaves
+# room for 16 moves between the same two siblings before the next renumbering.
+POSITION_GAP = 1 << 16
+
+
+def _auto_now_fields(model) -> list[str]:
+    return [
+        field.name for field in model._meta.fields if getattr(field, "auto_now", False)
+    ]
+
+
+def _renumber(siblings: QuerySet, batch_size: int = 1000) -> int:
+    """Spreads the positions of siblings POSITION_GAP apart, keeping their order."""
+
+    instances = list(siblings.order_by("position", "pk").only("pk"))
+    for i, instance in enumerate(instances):
+        instance.position = i * POSITION_GAP
+    return siblings.bulk_update(instances, ["position"], batch_size=batch_size)
+
+
+def _position_next_to(siblings: QuerySet, anchor_pk, after: bool) -> int | None:
+    """A free position right after or before anchor_pk, or None if there is
+    no room left and the siblings need renumbering."""
+
+    anchor = Subquery(siblings.filter(pk=anchor_pk).values("position")[:1])
+    if after:
+        rows = siblings.filter(position__gte=anchor).order_by("position", "pk")
+    else:
+        rows = siblings.filter(position__lte=anchor).order_by("-position", "-pk")
+    neighbours = list(rows.values_list("pk", "position")[:2])
+    if not neighbours or neighbours[0][0] != anchor_pk:
+        # The anchor shares its position with a sibling.
+        return None
+    near = neighbours[0][1]
+    if len(neighbours) == 1:
+        return near + POSITION_GAP if after else near - POSITION_GAP
+    far = neighbours[1][1]
+    if abs(far - near) < 2:
+        return None
+    return (near + far) // 2
+
+
+class OrderedHierarchicalModel(HierarchicalModel):
+    """A HierarchicalModel which stores the order of siblings.
+
+    Siblings are ordered by position. Positions are spread out, so
+    move_before() and move_after() usually write a single row, at the
+    midpoint of its new neighbours. Once two siblings have no room left
+    between them, the sibling group is renumbered with bulk_update().
+    direct_children() and children() return siblings in this order, using
+    the index on (parent, position).
+
+    An instance saved without a position, or moved by set_parent(), is
+    placed after its last sibling. bulk_create() does not fill in position,
+    so it must be given.
+
+    The index is named after the app label and model. Subclasses whose
+    label and name are too long for it, or which declare their own Meta
+    without inheriting OrderedHierarchicalModel.Meta, declare it themselves.
+
+    Attributes:
+        position: Order of this instance among its siblings.
+    """
+
+    position = models.BigIntegerField(blank=True)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(
+                fields=["parent", "position"], name="%(app_label)s_%(class)s_pos"
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.position is None:
+            using = kwargs.get("using") or router.db_for_write(
+                self.__class__, instance=self
+            )
+            last = (
+                self._siblings(self.parent_id, using)
+                .order_by("-position")
+                .values_list("position", flat=True)
+                .first()
+            )
+            self.position = 0 if last is None else last + POSITION_GAP
+        update_fields = kwargs.get("update_fields")
+        if (
+            update_fields is not None
+            and "parent" in update_fields
+            and "position" not in update_fields
+        ):
+            # The position is only meaningful among the siblings it was
+            # computed for.
+            kwargs["update_fields"] = [*update_fields, "position"]
+        super().save(*args, **kwargs)
+
+    save.alters_data = True  # type: ignore
+
+    def set_parent(self: T, parent: T | None):
+        """Set the parent of this instance, after its last new sibling.
+
+        See HierarchicalModel.set_parent(). The position is kept if parent
+        is the current parent.
+        """
+
+        if getattr(parent, "pk", None) == self.parent_id:  # type: ignore[attr-defined]
+            super().set_parent(parent)
+            return
+        position = self.position
+        self.position = None  # type: ignore[assignment]
+        try:
+            super().set_parent(parent)
+        except BaseException:
+            self.position = position
+            raise
+
+    def move_before(self, sibling: OrderedHierarchicalModel):
+        """Moves this instance right before sibling, under its parent.
+
+        Raises:
+            CycleException: sibling is a descendant of this instance.
+            ValueError: sibling is this instance, or does not exist.
+        """
+
+        self._move_next_to(sibling, after=False)
+
+    def move_after(self, sibling: OrderedHierarchicalModel):
+        """Moves this instance right after sibling, under its parent.
+
+        Raises:
+            CycleException: sibling is a descendant of this instance.
+            ValueError: sibling is this instance, or does not exist.
+        """
+
+        self._move_next_to(sibling, after=True)
+
+    def _move_next_to(self, sibling, after: bool):
+        if sibling.pk == self.pk:
+            raise ValueError(f"{self} can not be moved next to itself")
+        using = router.db_for_write(self.__class__, instance=self)
+        siblings = self._siblings(sibling.parent_id, using).exclude(pk=self.pk)
+        old = self.position
+        with transaction.atomic(using=using):
+            position = _position_next_to(siblings, sibling.pk, after)
+            if position is None:
+                _renumber(siblings)
+                position = _position_next_to(siblings, sibling.pk, after)
+                if position is None:
+                    raise ValueError(f"{sibling} does not exist")
+            self.position = position
+            try:
+                if sibling.parent_id == self.parent_id:  # type: ignore[attr-defined]
+                    self.save(
+                        update_fields=["position", *_auto_now_fields(self.__class__)]
+                    )
+                else:
+                    super().set_parent(sibling.parent)
+            except BaseException:
+                self.position = old
+                raise
+
+    def renumber_children(self, batch_size: int = 1000) -> int:
+        """Spreads the positions of the children of this instance apart.
+
+        Moves renumber siblings when needed, so this is only useful after
+        positions were written in bulk.
+
+        Returns:
+            The number of rows updated.
+        """
+
+        using = router.db_for_write(self.__class__, instance=self)
+        return _renumber(self._siblings(self.pk, using), batch_size)
+
+    def direct_children(self, object_manager=None, using=None):
+        """See HierarchicalModel.direct_children(), ordered by position."""
+
+        return super().direct_children(object_manager, using).order_by("position", "pk")
+
+    def _siblings(self, parent_id, using: str) -> QuerySet:
+        return self.__class__._base_manager.db_manager(using).filter(
+            parent_id=parent_id
+        )
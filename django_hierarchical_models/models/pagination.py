@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import base64
+import json
+from collections import deque
+from typing import Any
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from django_hierarchical_models.models.query import has_children
+
+
+def encode_cursor(path: list[Any]) -> str:
+    """Encodes the primary keys leading to a node as an opaque cursor."""
+
+    data = json.dumps(path, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """Decodes a cursor made by encode_cursor()."""
+
+    try:
+        path = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+    if not isinstance(path, list) or not path:
+        raise ValueError(f"Invalid cursor {cursor!r}")
+    return path
+
+
+class _Frame:
+    __slots__ = ("parent", "after", "buffer", "exhausted")
+
+    def __init__(self, parent: Any, after: Any = None):
+        self.parent = parent
+        self.after = after
+        self.buffer: deque = deque()
+        self.exhausted = False
+
+
+def descendants_page(instance, cursor: str | None, page_size: int) -> tuple:
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    model = instance.__class__
+    manager = model._default_manager
+    # One frame per level between instance and the last node returned, which
+    # resumes the siblings after that level's node on the path.
+    frames = [_Frame(instance.pk)]
+    if cursor is not None:
+        for pk in decode_cursor(cursor):
+            frames[-1].after = pk
+            frames.append(_Frame(pk))
+    items: list = []
+    while frames and len(items) < page_size:
+        frame = frames[-1]
+        if not frame.buffer:
+            if frame.exhausted:
+                frames.pop()
+                continue
+            limit = page_size - len(items)
+            queryset = manager.filter(parent_id=frame.parent)
+            if frame.after is not None:
+                queryset = queryset.filter(pk__gt=frame.after)
+            queryset = queryset.annotate(hm_has_children=has_children(model))
+            frame.buffer.extend(queryset.order_by("pk")[:limit])
+            frame.exhausted = len(frame.buffer) < limit
+            if not frame.buffer:
+                frames.pop()
+                continue
+        child = frame.buffer.popleft()
+        frame.after = child.pk
+        items.append(child)
+        if child.__dict__.pop("hm_has_children"):
+            frames.append(_Frame(child.pk))
+    path = [frame.after for frame in frames if frame.after is not None]
+    return items, encode_cursor(path) if frames and path else None
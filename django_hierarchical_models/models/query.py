@@ -0,0 +1,523 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any
+
+from django.core.exceptions import EmptyResultSet
+from django.db import models
+from django.db.models import (
+    Aggregate,
+    Count,
+    Exists,
+    Expression,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
+
+from django_hierarchical_models.models.exceptions import CycleException
+from django_hierarchical_models.models.instrumentation import (
+    instrumented,
+    measure,
+    record,
+)
+
+if TYPE_CHECKING:
+    from django_hierarchical_models.index import ForestIndex
+
+
+def _from_where(model, q: Q | None, alias: str, connection):
+    """Compiles q against model aliased as alias, for use in a raw query.
+
+    Returns the FROM clause, including any joins q needs, its parameters,
+    the WHERE condition and its parameters.
+    """
+
+    query = model._base_manager.filter(q if q is not None else Q()).query
+    base = query.get_initial_alias()
+    # Every alias is renamed, so joins follow the base table's new alias and
+    # can not clash with aliases of an enclosing query.
+    query.change_aliases(
+        {
+            old: alias if old == base else f"{alias}_{i}"
+            for i, old in enumerate(query.alias_map)
+        }
+    )
+    compiler = query.get_compiler(connection=connection)
+    from_parts, from_params = compiler.get_from_clause()
+    if q is None or not query.where:
+        return " ".join(from_parts), list(from_params), "1 = 1", []
+    where, where_params = compiler.compile(query.where)
+    return " ".join(from_parts), list(from_params), where, list(where_params)
+
+
+def _pk(instance: Any) -> Any:
+    return instance.pk if isinstance(instance, models.Model) else instance
+
+
+class _RelativeIds(Expression):
+    def __init__(self, model, node: Any, include_self: bool = False):
+        super().__init__(output_field=model._meta.pk)
+        self.model = model
+        self.many = isinstance(node, (list, tuple, set, frozenset))
+        self.nodes = [self._expression(n) for n in (node if self.many else [node])]
+        self.include_self = include_self
+
+    @staticmethod
+    def _expression(node):
+        if isinstance(node, models.Model):
+            node = node.pk
+        return node if hasattr(node, "resolve_expression") else Value(node)
+
+    def get_source_expressions(self):
+        return self.nodes
+
+    def set_source_expressions(self, exprs):
+        self.nodes = list(exprs)
+
+    def as_sql(self, compiler, connection):
+        if not self.nodes:
+            raise EmptyResultSet
+        compiled = [compiler.compile(node) for node in self.nodes]
+        node_sql = ", ".join(sql for sql, _ in compiled)
+        node_params = [param for _, params in compiled for param in params]
+        match = f"IN ({node_sql})" if self.many else f"= {node_sql}"
+        sql, params = self.recursive_sql(connection, match, node_params)
+        if self.include_self:
+            for self_sql, self_params in compiled:
+                sql += f" UNION SELECT {self_sql}"
+                params.extend(self_params)
+        return f"({sql})", params
+
+    def recursive_sql(
+        self, connection, match: str, node_params: list
+    ) -> tuple[str, list]:
+        raise NotImplementedError
+
+
+class DescendantIds(_RelativeIds):
+    """Subquery selecting the primary keys of the descendants of a node.
+
+    Compiles to a recursive CTE which walks down from node, so it can be
+    used with an __in lookup, eg. filter(pk__in=DescendantIds(Model, pk)).
+    node may be a value or an expression such as OuterRef("pk"), which
+    makes the subquery correlated.
+
+    Attributes:
+        model: The HierarchicalModel subclass.
+        node: Primary key, or expression resolving to one, of the node, or
+          a list of them to select the union over several nodes.
+        include_self: Whether node itself is selected.
+        prune: Optional Q object. Descendants matching it are skipped along
+          with their own descendants, inside the recursive term, so pruned
+          branches are never scanned.
+        max_generations: Optional maximum number of generations to walk.
+        min_generations: Optional number of generations below node to
+          start selecting descendants from, eg. 2 skips direct children.
+          Requires max_generations.
+    """
+
+    def __init__(
+        self,
+        model,
+        node: Any,
+        include_self: bool = False,
+        prune: Q | None = None,
+        max_generations: int | None = None,
+        min_generations: int | None = None,
+    ):
+        if min_generations is not None and max_generations is None:
+            raise ValueError("min_generations requires max_generations")
+        super().__init__(model, node, include_self)
+        self.prune = prune
+        self.max_generations = max_generations
+        self.min_generations = min_generations
+
+    def recursive_sql(
+        self, connection, match: str, node_params: list
+    ) -> tuple[str, list]:
+        qn = connection.ops.quote_name
+        pk = qn(self.model._meta.pk.column)
+        parent = qn(self.model._meta.get_field("parent").column)
+        keep = ~self.prune if self.prune is not None else None
+        n_from, n_from_params, n_where, n_where_params = _from_where(
+            self.model, keep, "hm_n", connection
+        )
+        c_from, c_from_params, c_where, c_where_params = _from_where(
+            self.model, keep, "hm_c", connection
+        )
+        columns, depth, next_depth, bound = "id", "", "", ""
+        bound_params = []
+        if self.max_generations is not None:
+            # Only tracked when bounded, since it defeats UNION's protection
+            # against cycles.
+            columns, depth, next_depth = "id, depth", ", 1", ", hm_subtree.depth + 1"
+            bound = " AND hm_subtree.depth < %s"
+            bound_params = [self.max_generations]
+        sql = (
+            f"WITH RECURSIVE hm_subtree({columns}) AS ("
+            f"SELECT hm_n.{pk}{depth} FROM {n_from} "
+            f"WHERE hm_n.{parent} {match} AND {n_where} "
+            f"UNION SELECT hm_c.{pk}{next_depth} FROM hm_subtree, {c_from} "
+            f"WHERE hm_c.{parent} = hm_subtree.id AND {c_where}{bound}"
+            f") SELECT id FROM hm_subtree"
+        )
+        params = [
+            *n_from_params,
+            *node_params,
+            *n_where_params,
+            *c_from_params,
+            *c_where_params,
+            *bound_params,
+        ]
+        if self.max_generations is not None and self.max_generations < 1:
+            sql += " WHERE 1 = 0"
+        elif self.min_generations is not None and self.min_generations > 1:
+            sql += " WHERE depth >= %s"
+            params.append(self.min_generations)
+        return sql, params
+
+
+class AncestorIds(_RelativeIds):
+    """Subquery selecting the primary keys of the ancestors of a node.
+
+    The counterpart of DescendantIds, walking up from node. Parents are read
+    from the database, not from any instance in memory.
+
+    Attributes:
+        model: The HierarchicalModel subclass.
+        node: Primary key, or expression resolving to one, of the node, or
+          a list of them to select the union over several nodes.
+        include_self: Whether node itself is selected.
+    """
+
+    def recursive_sql(
+        self, connection, match: str, node_params: list
+    ) -> tuple[str, list]:
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        pk = qn(self.model._meta.pk.column)
+        parent = qn(self.model._meta.get_field("parent").column)
+        sql = (
+            f"WITH RECURSIVE hm_chain(id) AS ("
+            f"SELECT hm_n.{parent} FROM {table} hm_n WHERE hm_n.{pk} {match} "
+            f"UNION SELECT hm_p.{parent} FROM {table} hm_p "
+            f"JOIN hm_chain ON hm_p.{pk} = hm_chain.id"
+            f") SELECT id FROM hm_chain WHERE id IS NOT NULL"
+        )
+        return sql, node_params
+
+
+def has_children(model, prune: Q | None = None) -> Exists:
+    """Exists() expression which is true when the row pk has children.
+
+    Children matching prune, if given, are not counted.
+    """
+
+    children = model._base_manager.filter(parent=OuterRef("pk"))
+    if prune is not None:
+        children = children.exclude(prune)
+    return Exists(children)
+
+
+def subtree_aggregate(
+    model, aggregate: Aggregate, include_self: bool = True
+) -> Subquery:
+    """Correlated subquery computing an aggregate over the subtree of pk."""
+
+    subtree = (
+        model._base_manager.filter(
+            pk__in=DescendantIds(model, OuterRef("pk"), include_self)
+        )
+        .order_by()
+        .annotate(hm_group=Value(1))
+        .values("hm_group")
+        .annotate(hm_aggregate=aggregate)
+        .values("hm_aggregate")
+    )
+    return Subquery(subtree)
+
+
+class HierarchicalQuerySet(QuerySet):
+    """QuerySet of a HierarchicalModel with subtree annotations."""
+
+    # Name of the traversal method which made this QuerySet, under which
+    # fetching it is instrumented.
+    _hm_method: str | None = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._hm_method = self._hm_method
+        return clone
+
+    def _fetch_all(self):
+        if self._result_cache is not None or self._hm_method is None:
+            return super()._fetch_all()
+
+        def fetch():
+            super(HierarchicalQuerySet, self)._fetch_all()
+            record(rows=len(self._result_cache))
+
+        measure(self.model, self._hm_method, fetch)
+
+    def with_subtree_aggregate(
+        self, *aggregates: Aggregate, include_self: bool = True, **named: Aggregate
+    ) -> HierarchicalQuerySet:
+        """Annotates aggregates over the subtree of every row.
+
+        Aggregates are passed like to QuerySet.aggregate(), eg.
+        with_subtree_aggregate(Sum("stock")) annotates stock__sum and
+        with_subtree_aggregate(stock=Sum("stock")) annotates stock. Each one
+        is computed in SQL by a correlated subquery, so the whole page of
+        results is still fetched in one query.
+
+        Args:
+            *aggregates: Aggregates annotated under their default alias.
+            include_self: Whether each row is part of its own subtree.
+            **named: Aggregates by annotation name.
+
+        Returns:
+            The annotated QuerySet. Aggregates other than Count are None over
+            an empty subtree.
+        """
+
+        for aggregate in aggregates:
+            named[aggregate.default_alias] = aggregate  # type: ignore
+        return self.annotate(
+            **{
+                name: subtree_aggregate(self.model, aggregate, include_self)
+                for name, aggregate in named.items()
+            }
+        )
+
+    def with_descendant_count(
+        self, name: str = "descendant_count"
+    ) -> HierarchicalQuerySet:
+        """Annotates the number of children at any level of every row."""
+
+        count = subtree_aggregate(self.model, Count("pk"), include_self=False)
+        return self.annotate(**{name: Coalesce(count, 0)})
+
+    def with_has_children(self, name: str = "has_children") -> HierarchicalQuerySet:
+        """Annotates whether every row has any children.
+
+        Uses an EXISTS subquery on the indexed parent column, so a whole page
+        of rows costs one query.
+        """
+
+        return self.annotate(**{name: has_children(self.model)})
+
+    def leaves(self) -> HierarchicalQuerySet:
+        """Filters on rows without children."""
+
+        return self.filter(~has_children(self.model))
+
+    @instrumented
+    def common_ancestor(self, a: Any, b: Any, index: ForestIndex | None = None):
+        """The lowest common ancestor of two instances.
+
+        Args:
+            a: An instance or primary key.
+            b: An instance or primary key.
+            index: Optional ForestIndex to read the parent links from instead
+              of the database. Only the instances are then queried.
+
+        Returns:
+            The closest instance which is a or one of its ancestors and is b
+            or one of its ancestors, or None if they are in different trees
+            or either does not exist.
+
+        Raises:
+            CycleException: The ancestors of a or b contain a cycle.
+        """
+
+        return self.common_ancestors([(a, b)], index)[0]
+
+    @instrumented
+    def common_ancestors(
+        self, pairs: Iterable[tuple[Any, Any]], index: ForestIndex | None = None
+    ) -> list:
+        """common_ancestor() of many pairs, in one query.
+
+        The ancestors of all instances are loaded together by a single
+        recursive CTE, so ancestors shared by several instances are only
+        loaded once.
+
+        Args:
+            pairs: (a, b) tuples of instances or primary keys.
+            index: Optional ForestIndex to read the parent links from.
+
+        Returns:
+            The lowest common ancestor, or None, of each pair.
+        """
+
+        pairs = [(_pk(a), _pk(b)) for a, b in pairs]
+        instances = self._load_ancestor_chains(
+            [pk for pair in pairs for pk in pair], index
+        )
+        ancestors = []
+        for a, b in pairs:
+            b_chain = {
+                instance.pk for instance in self._ancestor_chain(instances, b, index)
+            }
+            ancestors.append(
+                next(
+                    (
+                        instance
+                        for instance in self._ancestor_chain(instances, a, index)
+                        if instance.pk in b_chain
+                    ),
+                    None,
+                )
+            )
+        return ancestors
+
+    @instrumented
+    def path_between(
+        self, a: Any, b: Any, index: ForestIndex | None = None
+    ) -> list | None:
+        """The instances on the path from a to b, in one query.
+
+        Args:
+            a: An instance or primary key.
+            b: An instance or primary key.
+            index: Optional ForestIndex to read the parent links from.
+
+        Returns:
+            The instances from a up to their lowest common ancestor and down
+            to b, both included, or None if they are in different trees or
+            either does not exist. The number of hops between a and b is one
+            less than its length.
+
+        Raises:
+            CycleException: The ancestors of a or b contain a cycle.
+        """
+
+        a, b = _pk(a), _pk(b)
+        instances = self._load_ancestor_chains([a, b], index)
+        a_chain = self._ancestor_chain(instances, a, index)
+        b_chain = self._ancestor_chain(instances, b, index)
+        b_positions = {instance.pk: i for i, instance in enumerate(b_chain)}
+        for i, instance in enumerate(a_chain):
+            j = b_positions.get(instance.pk)
+            if j is not None:
+                return a_chain[: i + 1] + b_chain[:j][::-1]
+        return None
+
+    @instrumented
+    def is_child_of_many(
+        self,
+        children: Iterable[Any],
+        parents: Iterable[Any],
+        index: ForestIndex | None = None,
+    ) -> set[tuple[Any, Any]]:
+        """is_child_of() for every combination of children and parents.
+
+        The parent links of all the ancestors of children are loaded by one
+        recursive CTE, and the ancestors found for an instance are reused by
+        every instance below it, so shared chains are only walked once.
+
+        Args:
+            children: Instances or primary keys to check.
+            parents: Instances or primary keys of potential ancestors.
+            index: Optional ForestIndex to read the parent links from, in
+              which case no query is made.
+
+        Returns:
+            The (child pk, parent pk) pairs where child is a child of parent
+            at any level.
+
+        Raises:
+            CycleException: The ancestors of a child contain a cycle.
+        """
+
+        children = list(dict.fromkeys(_pk(child) for child in children))
+        parents = {_pk(parent) for parent in parents}
+        if index is not None:
+
+            def parent_of(pk):
+                return index.parent(pk) if pk in index else None
+
+        else:
+            chains = AncestorIds(self.model, children, include_self=True)
+            parents_by_pk = dict(
+                self.model._base_manager.using(self.db)
+                .filter(pk__in=chains)
+                .values_list("pk", "parent_id")
+            )
+            record(rows=len(parents_by_pk))
+            parent_of = parents_by_pk.get
+        # Candidate parents among the ancestors of each pk, nearest first.
+        found: dict[Any, tuple] = {}
+        for child in children:
+            path = []
+            on_path = set()
+            pk = child
+            while pk is not None and pk not in found:
+                if pk in on_path:
+                    raise CycleException(
+                        child, child, f"The parents of {child} contain a cycle"
+                    )
+                path.append(pk)
+                on_path.add(pk)
+                pk = parent_of(pk)
+            above = pk
+            for pk in reversed(path):
+                if above is None:
+                    found[pk] = ()
+                else:
+                    found[pk] = ((above,) if above in parents else ()) + found[above]
+                above = pk
+        return {(child, parent) for child in children for parent in found[child]}
+
+    def _load_ancestor_chains(self, pks: list, index: ForestIndex | None) -> dict:
+        """Instances of pks and all of their ancestors, by primary key."""
+
+        manager = self.model._base_manager.using(self.db)
+        if index is not None:
+            wanted = set(pks)
+            for pk in pks:
+                if pk in index:
+                    wanted.update(index.ancestors(pk))
+            instances = manager.in_bulk(wanted)
+        else:
+            chains = AncestorIds(self.model, list(set(pks)), include_self=True)
+            instances = {
+                instance.pk: instance for instance in manager.filter(pk__in=chains)
+            }
+        record(rows=len(instances))
+        return instances
+
+    def _ancestor_chain(
+        self, instances: dict, pk: Any, index: ForestIndex | None
+    ) -> list:
+        """pk's instance and its ancestors, closest first, with parents cached."""
+
+        if index is not None:
+            pks = [pk, *index.ancestors(pk)] if pk in index else [pk]
+        else:
+            pks = []
+            seen = set()
+            while pk is not None and pk in instances:
+                if pk in seen:
+                    raise CycleException(
+                        pk, pk, f"The parents of {pks[0]} contain a cycle"
+                    )
+                seen.add(pk)
+                pks.append(pk)
+                pk = instances[pk].parent_id
+        chain = [instances[pk] for pk in pks if pk in instances]
+        parent_field = self.model._meta.get_field("parent")
+        for child, parent in zip(chain, chain[1:]):
+            if child.parent_id == parent.pk:
+                parent_field.set_cached_value(child, parent)
+        return chain
+
+
+class HierarchicalManager(
+    models.Manager.from_queryset(HierarchicalQuerySet)  # type: ignore[misc]
+):
+    """Default manager of HierarchicalModel."""
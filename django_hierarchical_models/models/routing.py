@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+
+# Database written to, and monotonic time until which reads of each model are
+# sent to it, by model label.
+_pinned: dict[str, tuple[str, float]] = {}
+
+
+def _window() -> float:
+    return getattr(settings, "HIERARCHICAL_MODELS_READ_YOUR_WRITES", 0)
+
+
+def note_write(model, using: str | None):
+    """Starts the read-your-writes window of model after a move on using.
+
+    Does nothing unless the HIERARCHICAL_MODELS_READ_YOUR_WRITES setting
+    holds a number of seconds.
+    """
+
+    window = _window()
+    if window and using is not None:
+        _pinned[model._meta.label] = (using, time.monotonic() + window)
+
+
+def db_for_read(model, using: str | None) -> str | None:
+    """The database a traversal of model asked to read from using reads from.
+
+    Within the read-your-writes window of a set_parent() of model, that is
+    the database written to, whatever using is. Otherwise it is using, which
+    may be None to leave the choice to the database routers.
+    """
+
+    pinned = _pinned.get(model._meta.label)
+    if pinned is not None:
+        if time.monotonic() < pinned[1]:
+            return pinned[0]
+        _pinned.pop(model._meta.label, None)
+    return using
+
+
+def parent_on(instance, using: str | None):
+    """The parent of instance, read from using.
+
+    Reads through the parent foreign key, so its cache is used, unless using
+    names another database than the one instance was loaded from. A parent
+    read from another database is not cached on instance, and if it is not
+    there yet, eg. because of replication lag, the foreign key is used.
+    """
+
+    if using is None or using == instance._state.db or instance.parent_id is None:
+        return instance.parent
+    parent = (
+        instance.__class__._base_manager.using(using)
+        .filter(pk=instance.parent_id)
+        .first()
+    )
+    return instance.parent if parent is None else parent
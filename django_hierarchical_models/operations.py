@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from django.db import router
+from django.db.migrations.operations.base import Operation
+
+from django_hierarchical_models.models.denormalized import COLUMNS, backfill
+
+
+class BackfillHierarchy(Operation):
+    """Migration operation filling denormalized columns of an existing table.
+
+    Runs backfill(): roots first, then their subtrees one generation at a
+    time, in throttled batches which each commit on their own. The
+    migration must set atomic = False, otherwise every batch would run in
+    one long transaction. Add the columns as nullable in an earlier
+    migration, and deploy a DenormalizedColumns on the model before running
+    this one, so rows written while it runs are filled as well. Reversing
+    it does nothing.
+
+    Args:
+        model_name: Name of the HierarchicalModel subclass.
+        fields: Model field name by column, one of COLUMNS, eg.
+          {"depth": "level", "root": "tree_id"}.
+        separator: Separator of the primary keys in path.
+        batch_size: Number of rows per UPDATE.
+        pause: Seconds to sleep after each UPDATE.
+    """
+
+    reversible = True
+    reduces_to_sql = False
+    atomic = False
+
+    def __init__(
+        self,
+        model_name: str,
+        fields: dict[str, str],
+        separator: str = "/",
+        batch_size: int = 1000,
+        pause: float = 0.0,
+    ):
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns {sorted(unknown)}, expected {COLUMNS}")
+        self.model_name = model_name
+        self.fields = fields
+        self.separator = separator
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def deconstruct(self):
+        kwargs = {"model_name": self.model_name, "fields": self.fields}
+        if self.separator != "/":
+            kwargs["separator"] = self.separator
+        if self.batch_size != 1000:
+            kwargs["batch_size"] = self.batch_size
+        if self.pause:
+            kwargs["pause"] = self.pause
+        return self.__class__.__qualname__, [], kwargs
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.atomic_migration:
+            raise ValueError(
+                "BackfillHierarchy must run in a migration with atomic = False"
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        alias = schema_editor.connection.alias
+        if not router.allow_migrate_model(alias, model):
+            return
+        backfill(model, self.fields, self.separator, self.batch_size, self.pause, alias)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        pass
+
+    def describe(self):
+        columns = ", ".join(self.fields.values())
+        return f"Backfill {columns} of {self.model_name}"
+
+    @property
+    def migration_name_fragment(self):
+        return f"backfill_{self.model_name.lower()}"
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import Model, QuerySet
+
+from django_hierarchical_models.index import ForestIndex
+
+# Values which can be rebuilt, see subtree_metrics().
+METRICS = ("depth", "root", "children", "size", "leaves", "descendants")
+
+
+def subtree_metrics(index: ForestIndex, root: int) -> dict[int, dict[str, int]]:
+    """Metrics of every row of the subtree of root, by primary key.
+
+    Attributes are named like those of analytics.ForestMetrics: depth is the
+    number of ancestors, root the primary key of the top level root,
+    children the number of direct children, size the number of rows in the
+    subtree including itself, leaves the number of leaves in it and
+    descendants size - 1.
+
+    Raises:
+        CycleException: The subtree contains a cycle.
+    """
+
+    top = index.root(root)
+    metrics: dict[int, dict[str, int]] = {}
+    order = []
+    stack = [(root, len(index.ancestors(root)))]
+    while stack:
+        pk, depth = stack.pop()
+        children = index.children(pk)
+        metrics[pk] = {
+            "depth": depth,
+            "root": top,
+            "children": len(children),
+            "size": 1,
+            "leaves": 0 if children else 1,
+        }
+        order.append(pk)
+        stack.extend((child, depth + 1) for child in children)
+    for pk in reversed(order):
+        parent = index.parent(pk)
+        if pk != root and parent is not None:
+            metrics[parent]["size"] += metrics[pk]["size"]
+            metrics[parent]["leaves"] += metrics[pk]["leaves"]
+    for values in metrics.values():
+        values["descendants"] = values["size"] - 1
+    return metrics
+
+
+def rebuild_roots(
+    model: type[Model],
+    index: ForestIndex,
+    roots: Iterable[int],
+    fields: dict[str, str],
+    batch_size: int = 1000,
+    using: str | None = None,
+) -> int:
+    """Writes the subtree_metrics() of roots back with chunked bulk updates.
+
+    Args:
+        model: The HierarchicalModel subclass to update.
+        index: ForestIndex of the table, with child offsets.
+        roots: Primary keys of the roots of the subtrees to rebuild.
+        fields: Model field name by metric name, eg. {"depth": "level"}.
+        batch_size: Number of rows per UPDATE.
+        using: Optional database alias.
+
+    Returns:
+        The number of rows updated.
+    """
+
+    manager = model._base_manager.db_manager(using)
+    updated = 0
+    instances: list[Model] = []
+    for root in roots:
+        for pk, values in subtree_metrics(index, root).items():
+            instances.append(
+                model(pk=pk, **{field: values[m] for m, field in fields.items()})
+            )
+            if len(instances) == batch_size:
+                updated += manager.bulk_update(instances, list(fields.values()))
+                instances = []
+    if instances:
+        updated += manager.bulk_update(instances, list(fields.values()))
+    return updated
+
+
+def _rebuild_task(
+    label: str,
+    shared_name: str,
+    roots: list[int],
+    fields: dict[str, str],
+    batch_size: int,
+    using: str | None,
+) -> tuple[list[int], int]:
+    index = ForestIndex.attach(shared_name)
+    try:
+        return roots, rebuild_roots(
+            apps.get_model(label), index, roots, fields, batch_size, using
+        )
+    finally:
+        index.close()
+        connections.close_all()
+
+
+def _init_worker():
+    if not apps.ready:  # pragma: no cover
+        # Spawned rather than forked.
+        import django
+
+        django.setup()
+
+
+@dataclass
+class RebuildResult:
+    """Outcome of rebuild().
+
+    Attributes:
+        roots: Number of roots rebuilt by this run.
+        skipped: Number of roots completed by an earlier run.
+        rows: Number of rows updated by this run.
+        unreachable: Number of rows which are not below any root, ie. in or
+          below a cycle, and were left unchanged.
+    """
+
+    roots: int = 0
+    skipped: int = 0
+    rows: int = 0
+    unreachable: int = 0
+
+
+def rebuild(
+    source: type[Model] | QuerySet,
+    fields: dict[str, str],
+    workers: int = 0,
+    roots_per_task: int = 100,
+    batch_size: int = 1000,
+    state_path: str | None = None,
+    progress: Callable[[RebuildResult, int], None] | None = None,
+) -> RebuildResult:
+    """Rebuilds denormalized hierarchy columns, partitioned by root.
+
+    The parent links are loaded once into a ForestIndex. Roots are split
+    into tasks of roots_per_task roots, and the subtrees of each task are
+    rebuilt and written with rebuild_roots(). With workers, tasks run in a
+    process pool, each worker mapping the index from shared memory and
+    using its own database connections.
+
+    Args:
+        source: A HierarchicalModel subclass or a QuerySet of one, whose
+          database is written to. Primary keys must be integers.
+        fields: Model field name by METRICS name, eg.
+          {"depth": "level", "descendants": "descendant_count"}.
+        workers: Number of worker processes, or 0 to run tasks in this
+          process.
+        roots_per_task: Number of roots per task.
+        batch_size: Number of rows per UPDATE.
+        state_path: Optional file to which the roots of every completed task
+          are appended. Roots listed in it are skipped, so an interrupted
+          rebuild resumes where it stopped. Delete it to start over.
+        progress: Optional callable receiving the result so far and the
+          total number of roots after every task.
+
+    Returns:
+        What was rebuilt.
+
+    Raises:
+        ValueError: fields names an unknown metric.
+    """
+
+    unknown = set(fields) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics {sorted(unknown)}, expected {METRICS}")
+    if isinstance(source, type):
+        source = source._base_manager.all()
+    model = source.model
+    using = source.db
+    done: set[int] = set()
+    if state_path is not None and os.path.exists(state_path):
+        with open(state_path) as f:
+            for line in f:
+                if line.strip():
+                    done.update(json.loads(line))
+
+    result = RebuildResult()
+    index = ForestIndex.create_shared(source) if workers else ForestIndex.build(source)
+    try:
+        all_roots = [pk for pk, parent in index.rows() if parent is None]
+        reachable = len(all_roots) + sum(
+            len(index.descendants(root)) for root in all_roots
+        )
+        result.unreachable = len(index) - reachable
+        roots = [root for root in all_roots if root not in done]
+        result.skipped = len(all_roots) - len(roots)
+        tasks = [
+            roots[i : i + roots_per_task] for i in range(0, len(roots), roots_per_task)
+        ]
+
+        def complete(task_roots: list[int], rows: int):
+            if state_path is not None:
+                with open(state_path, "a") as f:
+                    f.write(json.dumps(task_roots) + "\n")
+            result.roots += len(task_roots)
+            result.rows += rows
+            if progress is not None:
+                progress(result, len(all_roots))
+
+        if not workers:
+            for task in tasks:
+                complete(
+                    task, rebuild_roots(model, index, task, fields, batch_size, using)
+                )
+            return result
+
+        shared_name = index.shared_name
+        assert shared_name is not None
+        # Forked workers must not share the connections of this process.
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            pending = {
+                pool.submit(
+                    _rebuild_task,
+                    model._meta.label,
+                    shared_name,
+                    task,
+                    fields,
+                    batch_size,
+                    using,
+                )
+                for task in tasks
+            }
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    complete(*future.result())
+        return result
+    finally:
+        if workers:
+            index.unlink()
+        else:
+            index.close()
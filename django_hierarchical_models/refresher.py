@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import os
+import threading
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+from django.db.models import Model, QuerySet
+
+from django_hierarchical_models.index import ForestIndex
+
+logger = logging.getLogger(__name__)
+
+
+class IndexRefresher:
+    """Keeps a ForestIndex current by polling for changed rows.
+
+    Each refresh loads the rows whose updated_field is at or past the high
+    water mark of the previous refresh (less overlap) and compares them with
+    the current snapshot. When parents have changed, they are patched into a
+    copy of the current buffer, which is swapped into index. Readers never
+    block and always see a complete snapshot; an index which has been
+    swapped out stays valid for as long as a reader holds on to it. New rows
+    can not be patched in, so they cause the buffer to be rebuilt from the
+    current snapshot merged with the new rows.
+
+    updated_field must change whenever a row's parent does. set_parent()
+    saves auto_now fields along with parent, but queryset update(),
+    bulk_update() and the SET_NULL performed when a parent is deleted do
+    not. Deleted rows are not seen by polling either, so every
+    full_refresh_every refreshes the whole table is reloaded.
+
+    When path is set, every new snapshot is also written to that file with
+    an atomic rename, so worker processes can map it with ForestIndex.open()
+    and reopen it when the file changes.
+
+    Attributes:
+        index: The current snapshot, or None before the first refresh.
+        source: A HierarchicalModel subclass or a QuerySet of one.
+        updated_field: Name of a field which increases whenever a row's parent
+          changes, typically a DateTimeField with auto_now=True.
+        interval: Seconds between refreshes when running in the background.
+        overlap: Amount subtracted from the high water mark when polling, eg.
+          a timedelta, to pick up transactions which committed late with an
+          older updated_field value.
+        full_refresh_every: Number of refreshes between full reloads, or None
+          to never reload.
+        csr: Whether snapshots include child offsets.
+        path: Optional file each new snapshot is published to.
+    """
+
+    def __init__(
+        self,
+        source: type[Model] | QuerySet,
+        updated_field: str,
+        interval: float = 5.0,
+        overlap: Any = None,
+        full_refresh_every: int | None = 60,
+        csr: bool = True,
+        path: str | None = None,
+    ):
+        self.source = source
+        self.updated_field = updated_field
+        self.interval = interval
+        self.overlap = overlap
+        self.full_refresh_every = full_refresh_every
+        self.csr = csr
+        self.path = path
+        self.index: ForestIndex | None = None
+        self._high_water_mark: Any = None
+        self._refreshes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def _queryset(self) -> QuerySet:
+        if isinstance(self.source, type):
+            return self.source._base_manager.all()
+        return self.source.all()
+
+    def refresh(self, full: bool = False) -> int:
+        """Picks up changed rows and swaps in a new snapshot if needed.
+
+        Args:
+            full: Reload the whole table rather than only changed rows.
+
+        Returns:
+            The number of rows whose parent changed, or the number of rows
+            loaded by a full reload.
+        """
+
+        with self._lock:
+            full = (
+                full
+                or self.index is None
+                or (
+                    self.full_refresh_every is not None
+                    and self._refreshes % self.full_refresh_every == 0
+                )
+            )
+            if full:
+                return self._full_refresh()
+            return self._incremental_refresh()
+
+    def _full_refresh(self) -> int:
+        high_water_mark = None
+        rows = []
+        for pk, parent_id, updated in (
+            self._queryset.order_by("pk")
+            .values_list("pk", "parent_id", self.updated_field)
+            .iterator()
+        ):
+            rows.append((pk, parent_id))
+            if updated is not None and (
+                high_water_mark is None or updated > high_water_mark
+            ):
+                high_water_mark = updated
+        self._swap(ForestIndex.serialize_rows(rows, self.csr))
+        self._high_water_mark = high_water_mark
+        self._refreshes += 1
+        return len(rows)
+
+    def _incremental_refresh(self) -> int:
+        index = self.index
+        assert index is not None
+        queryset = self._queryset
+        high_water_mark = self._high_water_mark
+        if high_water_mark is not None:
+            since = high_water_mark
+            if self.overlap is not None:
+                since = since - self.overlap
+            queryset = queryset.filter(**{f"{self.updated_field}__gte": since})
+        changes: dict[int, int | None] = {}
+        added: dict[int, int | None] = {}
+        for pk, parent_id, updated in queryset.values_list(
+            "pk", "parent_id", self.updated_field
+        ).iterator():
+            if pk not in index:
+                added[pk] = parent_id
+            elif index.parent(pk) != parent_id:
+                changes[pk] = parent_id
+            if updated is not None and (
+                high_water_mark is None or updated > high_water_mark
+            ):
+                high_water_mark = updated
+        if added:
+            rows = heapq.merge(
+                ((pk, changes.get(pk, parent)) for pk, parent in index.rows()),
+                sorted(added.items()),
+            )
+            self._swap(ForestIndex.serialize_rows(rows, self.csr))
+        elif changes:
+            buffer = index.with_parents(changes)
+            assert buffer is not None
+            self._swap(buffer)
+        self._high_water_mark = high_water_mark
+        self._refreshes += 1
+        return len(changes) + len(added)
+
+    def _swap(self, buffer):
+        index = ForestIndex(buffer)
+        if self.path is not None:
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            index.save(tmp)
+            os.replace(tmp, self.path)
+        self.index = index
+
+    def start(self):
+        """Refreshes in a daemon thread every interval seconds."""
+
+        if self._thread is not None:
+            raise RuntimeError("IndexRefresher is already running")
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="IndexRefresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        """Stops the background thread started by start()."""
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                if self.index is not None and self._stop.wait(self.interval):
+                    break
+                close_old_connections()
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("Failed to refresh ForestIndex")
+                    if self.index is None and self._stop.wait(self.interval):
+                        break
+        finally:
+            connections.close_all()
+
+    async def run(self):
+        """Refreshes every interval seconds until the task is cancelled."""
+
+        while True:
+            try:
+                await sync_to_async(self.refresh)()
+            except Exception:
+                logger.exception("Failed to refresh ForestIndex")
+            await asyncio.sleep(self.interval)
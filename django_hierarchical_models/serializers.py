@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Iterator, Sequence
+from typing import IO, Any
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from django_hierarchical_models.models.node import Node
+
+# Number of pieces buffered before each write to the file.
+_CHUNK = 1024
+
+
+def _values(fields: Sequence[str]) -> Callable[[Any], dict[str, Any]]:
+    return lambda instance: {name: getattr(instance, name) for name in fields}
+
+
+class _Writer:
+    def __init__(self, fp: IO[str]):
+        self.fp = fp
+        self.parts: list[str] = []
+
+    def write(self, part: str):
+        self.parts.append(part)
+        if len(self.parts) >= _CHUNK:
+            self.flush()
+
+    def flush(self):
+        self.fp.write("".join(self.parts))
+        self.parts.clear()
+
+
+def dump_json(
+    node: Node,
+    fp: IO[str],
+    fields: Sequence[str] = ("pk",),
+    children_key: str = "children",
+    encoder: type[json.JSONEncoder] = DjangoJSONEncoder,
+):
+    """Writes a Node tree to fp as nested JSON objects.
+
+    The tree is walked iteratively and written in chunks, so no nested dicts
+    are built and trees of any depth can be written.
+
+    Args:
+        node: The root of the tree.
+        fp: Text file-like object to write to.
+        fields: Names of the instance attributes written for each node.
+        children_key: Key holding the list of children of each object.
+        encoder: JSONEncoder class for the field values.
+    """
+
+    encode = encoder().encode
+    values = _values(fields)
+    children = f"{encode(children_key)}: ["
+    writer = _Writer(fp)
+    stack: list[Node | str] = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            writer.write(item)
+            continue
+        head = encode(values(item.instance))[:-1]
+        writer.write(f"{head}, {children}" if len(head) > 1 else f"{{{children}")
+        stack.append("]}")
+        for i, child in enumerate(reversed(item.children)):
+            if i:
+                stack.append(", ")
+            stack.append(child)
+    writer.flush()
+
+
+def flat_rows(node: Node, fields: Sequence[str] = ()) -> Iterator[tuple[Any, ...]]:
+    """(pk, parent_pk, *fields) tuples of a Node tree, parents first.
+
+    The parent_pk of the root of the tree is None, so the rows describe the
+    tree on their own and can be turned back into a tree in one pass.
+    """
+
+    values = _values(fields)
+    stack: list[tuple[Node, Any]] = [(node, None)]
+    while stack:
+        item, parent_pk = stack.pop()
+        pk = item.instance.pk
+        yield (pk, parent_pk, *values(item.instance).values())
+        stack.extend((child, pk) for child in reversed(item.children))
+
+
+def dump_jsonl(
+    node: Node,
+    fp: IO[str],
+    fields: Sequence[str] = (),
+    parent_key: str = "parent",
+    encoder: type[json.JSONEncoder] = DjangoJSONEncoder,
+):
+    """Writes a Node tree to fp as JSON lines, one object per node.
+
+    Objects hold pk, parent_key and the given fields, and are written in
+    preorder, so every parent comes before its children.
+    """
+
+    encode = encoder().encode
+    keys = ("pk", parent_key, *fields)
+    writer = _Writer(fp)
+    for row in flat_rows(node, fields):
+        writer.write(encode(dict(zip(keys, row))))
+        writer.write("\n")
+    writer.flush()
+
+
+def dump_flat(
+    node: Node,
+    fp: IO[str],
+    fields: Sequence[str] = (),
+    encoder: type[json.JSONEncoder] = DjangoJSONEncoder,
+):
+    """Writes the rows of flat_rows() to fp as a JSON array of arrays."""
+
+    encode = encoder().encode
+    writer = _Writer(fp)
+    writer.write("[")
+    for i, row in enumerate(flat_rows(node, fields)):
+        if i:
+            writer.write(", ")
+        writer.write(encode(row))
+    writer.write("]")
+    writer.flush()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+from django_hierarchical_models.models import (
+    AncestorIds,
+    DescendantIds,
+    HierarchicalModel,
+)
+
+
+@dataclass(frozen=True)
+class TreeFacts:
+    """Size of the parts of a tree a traversal of an instance can reach.
+
+    Attributes:
+        depth: Number of ancestors of the instance.
+        size: Number of descendants of the instance, at any level.
+    """
+
+    depth: int
+    size: int
+
+
+def tree_facts(instance: HierarchicalModel) -> TreeFacts:
+    """TreeFacts of instance, in two queries."""
+
+    manager = instance.__class__._base_manager
+    model = instance.__class__
+    return TreeFacts(
+        depth=manager.filter(pk__in=AncestorIds(model, instance.pk)).count(),
+        size=manager.filter(pk__in=DescendantIds(model, instance.pk)).count(),
+    )
+
+
+# Maximum number of queries of each public method of HierarchicalModel, and
+# of the traversal methods of HierarchicalQuerySet, given the TreeFacts of the
+# instance it is called on (the new parent for set_parent()), with nothing
+# cached. Methods which follow the parent foreign key make one query per
+# ancestor, children() one per node it expands, and everything else a
+# constant number.
+QUERY_BUDGETS: dict[str, Callable[[TreeFacts], int]] = {
+    "parent": lambda facts: 1,
+    "ancestors": lambda facts: facts.depth,
+    "root": lambda facts: facts.depth,
+    "is_child_of": lambda facts: facts.depth,
+    # The cycle check walks the ancestors of the new parent, then one UPDATE.
+    "set_parent": lambda facts: facts.depth + 1,
+    "direct_children": lambda facts: 1,
+    # One per expanded node, and one to find out whether the instance has
+    # children left out by max_total.
+    "children": lambda facts: facts.size + 2,
+    "descendants": lambda facts: 1,
+    "descendants_at_depth": lambda facts: 1,
+    "descendants_between_depths": lambda facts: 1,
+    # The first page: one for the instance, and one per instance of the page
+    # with children.
+    "descendants_page": lambda facts: facts.size + 1,
+    # Per generation accessed.
+    "lazy_children": lambda facts: 1,
+    "common_ancestor": lambda facts: 1,
+    "common_ancestors": lambda facts: 1,
+    "path_between": lambda facts: 1,
+    "is_child_of_many": lambda facts: 1,
+}
+
+
+def query_budget(method: str, instance: HierarchicalModel) -> int:
+    """The QUERY_BUDGETS entry of method, for instance.
+
+    Raises:
+        KeyError: method has no budget.
+    """
+
+    return QUERY_BUDGETS[method](tree_facts(instance))
+
+
+class HierarchyAssertionsMixin:
+    """TestCase mixin with assertions on the cost of traversals."""
+
+    @contextmanager
+    def assertTraversalQueries(
+        self, max: int, using: str = DEFAULT_DB_ALIAS
+    ) -> Iterator[CaptureQueriesContext]:
+        """Fails if the block executes more than max queries.
+
+        Unlike assertNumQueries(), fewer queries pass, so the budget is an
+        upper bound such as a QUERY_BUDGETS entry.
+        """
+
+        with CaptureQueriesContext(connections[using]) as captured:
+            yield captured
+        if len(captured) > max:
+            queries = "\n".join(
+                f"{i}. {query['sql']}" for i, query in enumerate(captured, start=1)
+            )
+            self.fail(  # type: ignore[attr-defined]
+                f"{len(captured)} queries executed, at most {max} expected\n"
+                f"Captured queries were:\n{queries}"
+            )
+
+    def assertWithinBudget(
+        self, method: str, instance: HierarchicalModel, using: str = DEFAULT_DB_ALIAS
+    ):
+        """assertTraversalQueries() with the QUERY_BUDGETS entry of method.
+
+        Use as a context manager around a call of method on instance. The
+        budget is computed before the block, so its queries are not counted.
+        """
+
+        return self.assertTraversalQueries(query_budget(method, instance), using)
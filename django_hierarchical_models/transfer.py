@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import csv
+import json
+from collections.abc import Iterable, Iterator, Sequence
+from typing import IO, Any
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import NotSupportedError, connections, router
+from django.db.models import Model, QuerySet
+
+from django_hierarchical_models.models.exceptions import CycleException
+from django_hierarchical_models.serializers import _Writer
+
+
+def _queryset(source: type[Model] | QuerySet) -> QuerySet:
+    return source._base_manager.all() if isinstance(source, type) else source
+
+
+def _fields(model: type[Model], fields: Sequence[str] | None) -> list:
+    if fields is None:
+        return [
+            field
+            for field in model._meta.fields
+            if field.concrete and not field.primary_key and field.name != "parent"
+        ]
+    return [model._meta.get_field(name) for name in fields]
+
+
+def export_rows(
+    source: type[Model] | QuerySet,
+    root: Any = None,
+    fields: Sequence[str] | None = None,
+    batch_size: int = 1000,
+) -> Iterator[dict[str, Any]]:
+    """Rows of a forest or subtree, one generation at a time.
+
+    Every row comes after its parent, and rows of a generation come after
+    all rows of the previous one, so import_rows() can insert them in large
+    batches. Only the primary keys of one generation are held in memory.
+
+    Args:
+        source: A HierarchicalModel subclass or a QuerySet of one. Rows
+          outside of it are left out along with their subtrees.
+        root: Optional instance or primary key whose subtree to export, in
+          which case it is exported as a root.
+        fields: Names of the fields to export. Defaults to every concrete
+          field but the primary key and parent.
+        batch_size: Number of parents whose children are read per query.
+
+    Returns:
+        An iterator of dicts holding "pk", "parent" (the parent's pk or
+        None) and the attname of every field.
+    """
+
+    queryset = _queryset(source)
+    names = [field.attname for field in _fields(queryset.model, fields)]
+    columns = ["pk", "parent_id", *names]
+    if root is None:
+        first = queryset.filter(parent__isnull=True)
+    else:
+        root = getattr(root, "pk", root)
+        first = queryset.filter(pk=root)
+    generation: Iterable[tuple] = (
+        first.order_by("pk").values_list(*columns).iterator(chunk_size=batch_size)
+    )
+    top = True
+    while True:
+        pks = []
+        for pk, parent_id, *values in generation:
+            if pk == root and not top:
+                raise CycleException(root, root, f"{root} is its own descendant")
+            pks.append(pk)
+            yield {
+                "pk": pk,
+                "parent": None if top else parent_id,
+                **dict(zip(names, values)),
+            }
+        if not pks:
+            return
+        top = False
+        generation = _children(queryset, columns, pks, batch_size)
+
+
+def _children(
+    queryset: QuerySet, columns: list[str], parents: list, batch_size: int
+) -> Iterator[tuple]:
+    for i in range(0, len(parents), batch_size):
+        batch = queryset.filter(parent_id__in=parents[i : i + batch_size])
+        yield from batch.order_by("pk").values_list(*columns)
+
+
+def export_jsonl(
+    fp: IO[str],
+    source: type[Model] | QuerySet,
+    root: Any = None,
+    fields: Sequence[str] | None = None,
+    batch_size: int = 1000,
+    encoder: type[json.JSONEncoder] = DjangoJSONEncoder,
+) -> int:
+    """Writes export_rows() to fp as JSON lines.
+
+    Returns:
+        The number of rows written.
+    """
+
+    encode = encoder().encode
+    writer = _Writer(fp)
+    count = 0
+    for row in export_rows(source, root, fields, batch_size):
+        writer.write(encode(row))
+        writer.write("\n")
+        count += 1
+    writer.flush()
+    return count
+
+
+def export_csv(
+    fp: IO[str],
+    source: type[Model] | QuerySet,
+    root: Any = None,
+    fields: Sequence[str] | None = None,
+    batch_size: int = 1000,
+) -> int:
+    """Writes export_rows() to fp as CSV with a header row.
+
+    None is written as an empty string.
+
+    Returns:
+        The number of rows written.
+    """
+
+    queryset = _queryset(source)
+    header = ["pk", "parent", *(f.attname for f in _fields(queryset.model, fields))]
+    writer = csv.writer(fp)
+    writer.writerow(header)
+    count = 0
+    for row in export_rows(queryset, root, fields, batch_size):
+        writer.writerow(["" if row[key] is None else row[key] for key in header])
+        count += 1
+    return count
+
+
+def import_rows(
+    model: type[Model],
+    rows: Iterable[dict[str, Any]],
+    parent: Any = None,
+    batch_size: int = 1000,
+    using: str | None = None,
+) -> int:
+    """Inserts rows exported by export_rows() under new primary keys.
+
+    Rows are inserted with bulk_create() in batches of up to batch_size, cut
+    short wherever a row's parent is in the batch, so rows exported a
+    generation at a time are inserted in full batches. Parents are remapped
+    to the new primary keys. Only the primary keys of the last two
+    generations are held in memory. Like bulk_create(), no signals are sent
+    and save() is not called.
+
+    Args:
+        model: The HierarchicalModel subclass to insert into.
+        rows: Dicts holding "pk", "parent" and field attnames, parents
+          first and generation by generation.
+        parent: Optional instance or primary key under which to insert the
+          rows without a parent.
+        batch_size: Number of rows per INSERT.
+        using: Database alias to write to.
+
+    Returns:
+        The number of rows inserted.
+
+    Raises:
+        ValueError: A row's parent is neither in the previous generation nor
+          in the current one.
+        NotSupportedError: The backend does not return primary keys from
+          bulk inserts.
+    """
+
+    using = using or router.db_for_write(model)
+    if not connections[using].features.can_return_rows_from_bulk_insert:
+        raise NotSupportedError(
+            "import_rows() requires a backend which returns primary keys from "
+            "bulk inserts"
+        )
+    parent = getattr(parent, "pk", parent)
+    manager = model._base_manager.db_manager(using)
+    fields = {field.attname: field for field in model._meta.fields}
+    # New primary keys of the previous and current generation by old ones.
+    previous: dict[Any, Any] = {}
+    current: dict[Any, Any] = {}
+    batch: list[tuple[Any, Model]] = []
+    in_batch: set[Any] = set()
+    count = 0
+
+    def flush():
+        nonlocal count
+        manager.bulk_create([instance for _, instance in batch])
+        for old_pk, instance in batch:
+            current[old_pk] = instance.pk
+        count += len(batch)
+        batch.clear()
+        in_batch.clear()
+
+    for row in rows:
+        old_parent = row["parent"]
+        if old_parent in in_batch:
+            flush()
+        if old_parent is None:
+            new_parent = parent
+        elif old_parent in previous:
+            new_parent = previous[old_parent]
+        elif old_parent in current:
+            # The first row of the next generation.
+            previous, current = current, {}
+            new_parent = previous[old_parent]
+        else:
+            raise ValueError(
+                f"The parent {old_parent} of {row['pk']} does not come in the "
+                "previous generation"
+            )
+        values = {
+            name: fields[name].to_python(value)
+            for name, value in row.items()
+            if name not in ("pk", "parent")
+        }
+        batch.append((row["pk"], model(parent_id=new_parent, **values)))
+        in_batch.add(row["pk"])
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return count
+
+
+def import_jsonl(
+    fp: IO[str],
+    model: type[Model],
+    parent: Any = None,
+    batch_size: int = 1000,
+    using: str | None = None,
+) -> int:
+    """import_rows() of JSON lines written by export_jsonl()."""
+
+    rows = (json.loads(line) for line in fp if line.strip())
+    return import_rows(model, rows, parent, batch_size, using)
+
+
+def import_csv(
+    fp: IO[str],
+    model: type[Model],
+    parent: Any = None,
+    batch_size: int = 1000,
+    using: str | None = None,
+) -> int:
+    """import_rows() of CSV written by export_csv().
+
+    Empty strings are read as None for the parent and nullable fields.
+    """
+
+    fields = {field.attname: field for field in model._meta.fields}
+
+    def convert(row: dict[str, str]) -> dict[str, Any]:
+        return {
+            name: (
+                None
+                if value == "" and (name == "parent" or fields[name].null)
+                else value
+            )
+            for name, value in row.items()
+        }
+
+    return import_rows(
+        model, map(convert, csv.DictReader(fp)), parent, batch_size, using
+    )
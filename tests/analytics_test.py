@@ -0,0 +1,91 @@
+from unittest import skipIf
+
+from django.test import TestCase
+
+from django_hierarchical_models.models import CycleException
+from tests.models import ExampleModel
+
+try:
+    import numpy as np
+
+    from django_hierarchical_models.analytics import (
+        compute_metrics,
+        forest_metrics,
+        write_metrics,
+    )
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+
+def create(num: int, **kwargs) -> ExampleModel:
+    return ExampleModel.objects.create(num=num, **kwargs)
+
+
+@skipIf(np is None, "numpy is not installed")
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.n1 = create(1)
+        self.n2 = create(2, parent=self.n1)
+        self.n3 = create(3, parent=self.n1)
+        self.n4 = create(4, parent=self.n2)
+        self.n5 = create(5, parent=self.n4)
+        self.n6 = create(6, parent=self.n4)
+        self.n7 = create(7)
+        self.instances = [
+            self.n1,
+            self.n2,
+            self.n3,
+            self.n4,
+            self.n5,
+            self.n6,
+            self.n7,
+        ]
+
+    def test_metrics(self):
+        with self.assertNumQueries(1):
+            metrics = forest_metrics(ExampleModel)
+        self.assertListEqual(
+            metrics.pks.tolist(), [instance.pk for instance in self.instances]
+        )
+        for i, instance in enumerate(self.instances):
+            descendants = []
+            stack = [instance.children()]
+            while stack:
+                node = stack.pop()
+                descendants.append(node)
+                stack.extend(node.children)
+            self.assertEqual(metrics.depth[i], len(instance.ancestors()))
+            self.assertEqual(metrics.root[i], instance.root().pk)
+            self.assertEqual(metrics.children[i], instance.direct_children().count())
+            self.assertEqual(metrics.size[i], len(descendants))
+            self.assertEqual(metrics.descendants[i], len(descendants) - 1)
+            self.assertEqual(
+                metrics.leaves[i],
+                sum(1 for node in descendants if not node.children),
+            )
+
+    def test_queryset(self):
+        metrics = forest_metrics(ExampleModel.objects.exclude(pk=self.n2.pk))
+        self.assertEqual(len(metrics.pks), 6)
+        self.assertEqual(metrics.size[0], 2)
+        self.assertEqual(metrics.depth[2], 0)
+
+    def test_empty(self):
+        metrics = compute_metrics(
+            np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        )
+        self.assertEqual(len(metrics.size), 0)
+
+    def test_cycle(self):
+        with self.assertRaises(CycleException):
+            compute_metrics(np.arange(4), np.array([2, 0, 1, -1]))
+
+    def test_write_metrics(self):
+        metrics = forest_metrics(ExampleModel)
+        self.assertEqual(
+            write_metrics(ExampleModel, metrics, {"size": "num"}, batch_size=3), 7
+        )
+        self.assertListEqual(
+            list(ExampleModel.objects.order_by("pk").values_list("num", flat=True)),
+            [6, 4, 1, 3, 1, 1, 1],
+        )
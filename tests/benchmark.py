@@ -1,77 +1,152 @@
-from itertools import pairwise
-
+"""Benchmarks of the traversal APIs over a matrix of tree shapes.
+
+Run with pytest, eg. SQLITE=1 python -m pytest tests/benchmark.py. Every API is
+called on a deterministic sample of instances of every shape, recording the
+number of queries and the p50/p95 latency of each call. The results are written
+as JSON to BENCHMARK_OUTPUT, and when BENCHMARK_BASELINE names the output of an
+earlier run, any API which needs more queries, or whose p95 latency grew by more
+than BENCHMARK_TOLERANCE (a fraction, 1.0 by default), fails.
+
+Environment variables:
+    BENCHMARK_N: Number of instances of each tree, 1000 by default.
+    BENCHMARK_SAMPLES: Number of calls of each API, 30 by default.
+    BENCHMARK_OUTPUT: File the results are written to, bench_output.json by
+      default.
+    BENCHMARK_BASELINE: Optional results of an earlier run to compare with.
+    BENCHMARK_TOLERANCE: Allowed relative growth of p95 latency.
+"""
+
+import json
+import os
+import random
+import time
+from collections.abc import Callable
+from typing import Any
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from parameterized import (  # type: ignore[import-untyped]
+    parameterized,
+    parameterized_class,
+)
 
+from django_hierarchical_models.generator import SHAPES, generate_forest
 from tests.models import ExampleModel
 
-
-class QueryBenchmark(TestCase):
-    n: int
-    density: int
+N = int(os.environ.get("BENCHMARK_N", 1000))
+SAMPLES = int(os.environ.get("BENCHMARK_SAMPLES", 30))
+OUTPUT = os.environ.get("BENCHMARK_OUTPUT", "bench_output.json")
+BASELINE = os.environ.get("BENCHMARK_BASELINE")
+TOLERANCE = float(os.environ.get("BENCHMARK_TOLERANCE", 1.0))
+# Absolute slack on top of the tolerance, so the timer noise of calls which
+# take a millisecond or two does not fail the comparison.
+SLACK_MS = 1.0
+SEED = 31
+
+
+def walk_lazy(instance: ExampleModel):
+    for child in instance.lazy_children().children:
+        _ = child.children
+
+
+APIS: dict[str, Callable[[ExampleModel, ExampleModel], Any]] = {
+    "parent": lambda a, b: a.parent,
+    "root": lambda a, b: a.root(),
+    "ancestors": lambda a, b: a.ancestors(),
+    "is_child_of": lambda a, b: a.is_child_of(b),
+    "direct_children": lambda a, b: list(a.direct_children()),
+    "children": lambda a, b: a.children(),
+    "children_2_generations": lambda a, b: a.children(max_generations=2),
+    "lazy_children_2_generations": lambda a, b: walk_lazy(a),
+    "descendants": lambda a, b: list(a.descendants()),
+    "descendants_page": lambda a, b: a.descendants_page(page_size=50),
+    "common_ancestor": lambda a, b: ExampleModel.objects.common_ancestor(a, b),
+    "is_child_of_many": lambda a, b: ExampleModel.objects.is_child_of_many(
+        [a, b], [a, b]
+    ),
+}
+
+results: dict[str, dict[str, dict[str, float]]] = {}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+def load_baseline() -> dict[str, Any]:
+    if BASELINE is None:
+        return {}
+    with open(BASELINE) as f:
+        return json.load(f)["results"]
+
+
+def tearDownModule():
+    with open(OUTPUT, "w") as f:
+        json.dump(
+            {
+                "meta": {
+                    "n": N,
+                    "samples": SAMPLES,
+                    "database": connection.vendor,
+                },
+                "results": results,
+            },
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+
+
+@parameterized_class(("shape",), [(shape,) for shape in SHAPES])
+class TraversalBenchmark(TestCase):
+    shape: str
+    pks: list[int]
+    pairs: list[tuple[int, int]]
+    baseline: dict[str, Any]
 
     @classmethod
     def setUpTestData(cls):
-        cls.instances = []
-        for i in range(cls.n):
-            if i % cls.density == 0:
-                cls.instances.append(ExampleModel.objects.create(num=i))
-            else:
-                cls.instances.append(
-                    ExampleModel.objects.create(
-                        num=i, parent=cls.instances[(i * 31) % len(cls.instances)]
-                    )
-                )
-
-    def test_get_parent(self):
-        for instance in self.instances:
-            _ = instance.parent
-
-    def test_get_ancestors(self):
-        for instance in self.instances:
-            _ = instance.ancestors()
-
-    def test_get_direct_children(self):
-        for instance in self.instances:
-            _ = instance.direct_children()
-
-    def test_get_children(self):
-        for instance in self.instances:
-            _ = instance.children()
-
-    def test_get_root(self):
-        for instance in self.instances:
-            _ = instance.root()
-
-    def test_is_child_of(self):
-        for instance_1, instance_2 in pairwise(self.instances):
-            _ = instance_1.is_child_of(instance_2)
-
-
-class ATest(QueryBenchmark):
-    n = 10000
-    density = 2
-
-
-class BTest(QueryBenchmark):
-    n = 10000
-    density = 10
-
-
-class CTest(QueryBenchmark):
-    n = 100000
-    density = 2
-
-
-class DTest(QueryBenchmark):
-    n = 100000
-    density = 10
-
-
-class ETest(QueryBenchmark):
-    n = 1000000
-    density = 2
-
-
-class FTest(QueryBenchmark):
-    n = 1000000
-    density = 10
+        cls.pks = generate_forest(
+            ExampleModel, N, cls.shape, SEED, fields=lambda i: {"num": i}
+        )
+        rng = random.Random(SEED)
+        cls.pairs = [(rng.choice(cls.pks), rng.choice(cls.pks)) for _ in range(SAMPLES)]
+        cls.baseline = load_baseline().get(cls.shape, {})
+
+    @parameterized.expand(list(APIS))
+    def test_api(self, api: str):
+        call = APIS[api]
+        queries = []
+        latencies = []
+        for a_pk, b_pk in self.pairs:
+            # Fresh instances, so nothing is cached from an earlier call.
+            instances = ExampleModel.objects.in_bulk([a_pk, b_pk])
+            a, b = instances[a_pk], instances[b_pk]
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                call(a, b)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+        result = {
+            "queries_mean": sum(queries) / len(queries),
+            "queries_max": max(queries),
+            "p50_ms": percentile(latencies, 0.5),
+            "p95_ms": percentile(latencies, 0.95),
+        }
+        results.setdefault(self.shape, {})[api] = result
+
+        baseline = self.baseline.get(api)
+        if baseline is None:
+            return
+        self.assertLessEqual(
+            result["queries_max"],
+            baseline["queries_max"],
+            f"{api} on {self.shape} needs more queries than the baseline",
+        )
+        self.assertLessEqual(
+            result["p95_ms"],
+            baseline["p95_ms"] * (1 + TOLERANCE) + SLACK_MS,
+            f"{api} on {self.shape} is slower than the baseline",
+        )
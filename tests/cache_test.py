@@ -0,0 +1,155 @@
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.test import TestCase
+
+from django_hierarchical_models.models import HierarchicalModel, Node, TreeCache
+from tests.models import CachedExampleModel, CachedExampleProxy
+
+
+def create(num: int, **kwargs) -> CachedExampleModel:
+    return CachedExampleModel.objects.create(num=num, **kwargs)
+
+
+class TreeCacheTests(TestCase):
+    def setUp(self):
+        CachedExampleModel.tree_cache.clear()
+        self.n1 = create(1)
+        self.n2 = create(2, parent=self.n1)
+        self.n3 = create(3, parent=self.n2)
+        self.n4 = create(4)
+        self.n5 = create(5, parent=self.n4)
+
+    def tearDown(self):
+        CachedExampleModel.tree_cache.backend = None
+
+    def fresh(self, instance: CachedExampleModel) -> CachedExampleModel:
+        return CachedExampleModel.objects.get(pk=instance.pk)
+
+    def test_children_hit(self):
+        expected = Node(self.n1, [Node(self.n2, [Node(self.n3)])])
+        self.assertEqual(self.n1.children(), expected)
+        n1 = self.fresh(self.n1)
+        with self.assertNumQueries(0):
+            self.assertEqual(n1.children(), expected)
+
+    def test_ancestors_hit(self):
+        self.assertListEqual(self.n3.ancestors(), [self.n2, self.n1])
+        n3 = self.fresh(self.n3)
+        with self.assertNumQueries(0):
+            self.assertListEqual(n3.ancestors(), [self.n2, self.n1])
+
+    def test_results_are_copies(self):
+        self.n1.children().children.clear()
+        self.n3.ancestors().clear()
+        self.assertEqual(len(self.n1.children().children), 1)
+        self.assertEqual(len(self.n3.ancestors()), 2)
+        self.n3.ancestors()[0].num = 100
+        self.n1.children().children[0].instance.num = 100
+        self.assertEqual(self.n3.ancestors()[0].num, 2)
+        self.assertEqual(self.n1.children().children[0].instance.num, 2)
+
+    def test_ancestors_miss_queries(self):
+        n3 = self.fresh(self.n3)
+        with self.assertNumQueries(2):
+            n3.ancestors()
+
+    def test_proxy_invalidates(self):
+        self.n1.children()
+        CachedExampleProxy.objects.get(pk=self.n2.pk).set_parent(self.n4)
+        self.assertEqual(self.fresh(self.n1).children(), Node(self.n1))
+
+    def test_proxy_results_are_separate(self):
+        self.n1.children()
+        proxy = CachedExampleProxy.objects.get(pk=self.n1.pk)
+        self.assertIsInstance(proxy.children().children[0].instance, CachedExampleProxy)
+
+    def test_abstract_model_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+
+            class AbstractCachedModel(HierarchicalModel):
+                tree_cache = TreeCache()
+
+                class Meta:
+                    abstract = True
+                    app_label = "tests"
+
+        with self.assertRaises(ImproperlyConfigured):
+
+            class ReusedCacheModel(HierarchicalModel):
+                num = models.IntegerField()
+                tree_cache = CachedExampleModel.tree_cache
+
+                class Meta:
+                    app_label = "tests"
+
+    def test_set_parent_invalidates(self):
+        self.n1.children()
+        self.n4.children()
+        self.n5.set_parent(self.n3)
+        self.assertEqual(
+            self.fresh(self.n1).children(),
+            Node(self.n1, [Node(self.n2, [Node(self.n3, [Node(self.n5)])])]),
+        )
+        self.assertEqual(self.fresh(self.n4).children(), Node(self.n4))
+        self.assertListEqual(
+            self.fresh(self.n5).ancestors(), [self.n3, self.n2, self.n1]
+        )
+
+    def test_unrelated_tree_stays_cached(self):
+        self.n4.children()
+        create(6, parent=self.n2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.n4.children(), Node(self.n4, [Node(self.n5)]))
+
+    def test_parent_assignment_invalidates(self):
+        self.n1.children()
+        self.n3.parent = None
+        self.n3.save()
+        self.assertEqual(self.fresh(self.n1).children(), Node(self.n1, [Node(self.n2)]))
+
+    def test_delete_invalidates(self):
+        self.n1.children()
+        self.n3.delete()
+        self.assertEqual(self.fresh(self.n1).children(), Node(self.n1, [Node(self.n2)]))
+
+    def test_sibling_transform_bypasses_cache(self):
+        self.n1.children(sibling_transform=lambda x: x.order_by("num"))
+        self.assertEqual(len(CachedExampleModel.tree_cache), 0)
+
+    def test_lru_eviction(self):
+        cache = CachedExampleModel.tree_cache
+        for _ in range(8):
+            self.n1.children()
+            self.n4.children()
+            self.n3.ancestors()
+        self.assertEqual(len(cache), 3)
+        for instance in [create(100 + i) for i in range(20)]:
+            instance.children()
+        self.assertEqual(len(cache), 20)
+        self.assertEqual(cache._size, 20)
+        with self.assertNumQueries(3):
+            self.n1.children()
+
+    def test_backend(self):
+        cache = CachedExampleModel.tree_cache
+        cache.backend = "default"
+        self.n1.children()
+        cache._entries.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.n1.children(),
+                Node(self.n1, [Node(self.n2, [Node(self.n3)])]),
+            )
+        self.n3.set_parent(None)
+        cache._entries.clear()
+        self.assertEqual(self.n1.children(), Node(self.n1, [Node(self.n2)]))
+
+    def test_backend_evicted_version(self):
+        cache = CachedExampleModel.tree_cache
+        cache.backend = "default"
+        self.n1.children()
+        cache._entries.clear()
+        caches["default"].delete(cache._backend_key("version", self.n1.pk))
+        with self.assertNumQueries(3):
+            self.n1.children()
@@ -0,0 +1,155 @@
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.db import connection
+from django.db.migrations.state import ProjectState
+from django.test import TestCase
+
+from django_hierarchical_models.models.denormalized import backfill, fill_down
+from django_hierarchical_models.models.exceptions import CycleException
+from django_hierarchical_models.operations import BackfillHierarchy
+from tests.models import DualWriteExampleModel
+
+FIELDS = {"depth": "depth", "root": "tree", "path": "path"}
+
+
+def create(num: int, **kwargs) -> DualWriteExampleModel:
+    return DualWriteExampleModel.objects.create(num=num, **kwargs)
+
+
+class DenormalizedTestCase(TestCase):
+    def setUp(self):
+        #   a     e
+        #  / \
+        # b   c
+        # |
+        # d
+        self.a = create(1)
+        self.b = create(2, parent=self.a)
+        self.c = create(3, parent=self.a)
+        self.d = create(4, parent=self.b)
+        self.e = create(5)
+
+    def columns(self) -> dict:
+        return {
+            row[0]: row[1:]
+            for row in DualWriteExampleModel.objects.values_list(
+                "num", "depth", "tree", "path"
+            )
+        }
+
+    def expected(self) -> dict:
+        a, b, c, d, e = (x.pk for x in (self.a, self.b, self.c, self.d, self.e))
+        return {
+            1: (0, a, f"{a}"),
+            2: (1, a, f"{a}/{b}"),
+            3: (1, a, f"{a}/{c}"),
+            4: (2, a, f"{a}/{b}/{d}"),
+            5: (0, e, f"{e}"),
+        }
+
+    def clear(self):
+        DualWriteExampleModel.objects.update(depth=None, tree=None, path=None)
+
+
+class BackfillTests(DenormalizedTestCase):
+    def test_backfill(self):
+        self.clear()
+        self.assertEqual(backfill(DualWriteExampleModel, FIELDS, batch_size=1), 5)
+        self.assertEqual(self.columns(), self.expected())
+
+    def test_top_down(self):
+        self.clear()
+        # A query finding each generation, and an UPDATE in a savepoint for
+        # roots, children and grandchildren.
+        with self.assertNumQueries(5 + 3 * 3):
+            backfill(DualWriteExampleModel, FIELDS, batch_size=10)
+
+    def test_partial_columns(self):
+        self.clear()
+        backfill(DualWriteExampleModel, {"depth": "depth"})
+        self.assertEqual(self.columns()[4], (2, None, None))
+
+    def test_unknown_column(self):
+        with self.assertRaises(ValueError):
+            backfill(DualWriteExampleModel, {"height": "depth"})
+
+    def test_cycle(self):
+        DualWriteExampleModel.objects.filter(pk=self.a.pk).update(parent=self.d)
+        with self.assertRaises(CycleException):
+            fill_down(DualWriteExampleModel, FIELDS, [self.a.pk])
+        self.clear()
+        self.assertEqual(backfill(DualWriteExampleModel, FIELDS), 1)
+
+    def test_operation(self):
+        self.clear()
+        operation = BackfillHierarchy("DualWriteExampleModel", FIELDS, batch_size=2)
+        state = ProjectState.from_apps(apps)
+        editor = SimpleNamespace(connection=connection, atomic_migration=False)
+        operation.database_forwards("tests", editor, state, state)
+        self.assertEqual(self.columns(), self.expected())
+        editor.atomic_migration = True
+        with self.assertRaises(ValueError):
+            operation.database_forwards("tests", editor, state, state)
+
+    def test_operation_deconstruct(self):
+        operation = BackfillHierarchy("Node", {"depth": "level"}, pause=0.5)
+        self.assertEqual(
+            operation.deconstruct(),
+            (
+                "BackfillHierarchy",
+                [],
+                {"model_name": "Node", "fields": {"depth": "level"}, "pause": 0.5},
+            ),
+        )
+        self.assertEqual(operation.describe(), "Backfill level of Node")
+        with self.assertRaises(ValueError):
+            BackfillHierarchy("Node", {"height": "level"})
+
+
+class DualWriteTests(DenormalizedTestCase):
+    def test_create(self):
+        self.assertEqual(self.columns(), self.expected())
+        self.assertEqual(self.d.path, f"{self.a.pk}/{self.b.pk}/{self.d.pk}")
+
+    def test_set_parent_shifts_subtree(self):
+        # One UPDATE of the subtree, in a savepoint.
+        with self.assertNumQueries(2 + 3):
+            self.b.set_parent(self.e)
+        b, d, e = self.b.pk, self.d.pk, self.e.pk
+        expected = self.expected()
+        expected[2] = (1, e, f"{e}/{b}")
+        expected[4] = (2, e, f"{e}/{b}/{d}")
+        self.assertEqual(self.columns(), expected)
+        self.b.set_parent(None)
+        expected[2] = (0, b, f"{b}")
+        expected[4] = (1, b, f"{b}/{d}")
+        self.assertEqual(self.columns(), expected)
+        self.assertEqual(self.b.depth, 0)
+
+    def test_unchanged(self):
+        self.d.num = 9
+        with self.assertNumQueries(2):
+            self.d.save()
+        with self.assertNumQueries(1):
+            self.d.save(update_fields=["num"])
+
+    def test_parent_not_filled(self):
+        self.clear()
+        f = create(6, parent=self.b)
+        f.refresh_from_db()
+        self.assertIsNone(f.depth)
+        backfill(DualWriteExampleModel, FIELDS)
+        f.refresh_from_db()
+        self.assertEqual(f.depth, 2)
+
+    def test_fills_unfilled_subtree(self):
+        DualWriteExampleModel.objects.filter(pk__in=[self.b.pk, self.d.pk]).update(
+            depth=None, tree=None, path=None
+        )
+        self.b.set_parent(self.c)
+        a, b, c, d = self.a.pk, self.b.pk, self.c.pk, self.d.pk
+        expected = self.expected()
+        expected[2] = (2, a, f"{a}/{c}/{b}")
+        expected[4] = (3, a, f"{a}/{c}/{b}/{d}")
+        self.assertEqual(self.columns(), expected)
@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from django_hierarchical_models.models.exceptions import CycleException
+from tests.models import CountedExampleModel
+
+
+def create(num: int, **kwargs) -> CountedExampleModel:
+    return CountedExampleModel.objects.create(num=num, **kwargs)
+
+
+class DescendantCountTests(TestCase):
+    def assertCounts(self, expected: dict[int, int]):
+        self.assertEqual(
+            dict(CountedExampleModel.objects.values_list("num", "descendant_count")),
+            expected,
+        )
+        computed = CountedExampleModel.objects.with_descendant_count("computed")
+        for instance in computed:
+            self.assertEqual(instance.descendant_count, instance.computed)
+
+    def test_create(self):
+        a = create(1)
+        b = create(2, parent=a)
+        create(3, parent=b)
+        create(4, parent=a)
+        self.assertCounts({1: 3, 2: 1, 3: 0, 4: 0})
+
+    def test_create_is_one_update(self):
+        a = create(1)
+        b = create(2, parent=a)
+        # SAVEPOINT, INSERT, UPDATE, RELEASE SAVEPOINT
+        with self.assertNumQueries(4):
+            create(3, parent=b)
+
+    def test_delete(self):
+        a = create(1)
+        b = create(2, parent=a)
+        create(3, parent=b)
+        create(4, parent=a)
+        b.refresh_from_db()
+        b.delete()
+        self.assertCounts({1: 1, 3: 0, 4: 0})
+
+    def test_delete_with_stale_instance(self):
+        a = create(1)
+        b = create(2, parent=a)
+        create(3, parent=b)
+        # b.descendant_count is 0 in memory, the stored value is used
+        b.delete()
+        self.assertCounts({1: 0, 3: 0})
+
+    def test_set_parent(self):
+        a = create(1)
+        b = create(2, parent=a)
+        c = create(3, parent=b)
+        create(4, parent=c)
+        d = create(5)
+        c.set_parent(d)
+        self.assertCounts({1: 1, 2: 0, 3: 1, 4: 0, 5: 2})
+        c.set_parent(None)
+        self.assertCounts({1: 1, 2: 0, 3: 1, 4: 0, 5: 0})
+        c.set_parent(b)
+        self.assertCounts({1: 3, 2: 2, 3: 1, 4: 0, 5: 0})
+
+    def test_set_parent_within_tree(self):
+        a = create(1)
+        b = create(2, parent=a)
+        c = create(3, parent=b)
+        create(4, parent=c)
+        c.set_parent(a)
+        self.assertCounts({1: 3, 2: 0, 3: 1, 4: 0})
+        b.set_parent(c)
+        self.assertCounts({1: 3, 2: 0, 3: 2, 4: 0})
+
+    def test_set_parent_cycle_rolls_back(self):
+        a = create(1)
+        b = create(2, parent=a)
+        with self.assertRaises(CycleException):
+            a.set_parent(b)
+        self.assertCounts({1: 1, 2: 0})
+
+    def test_save_keeps_stored_count(self):
+        a = create(1)
+        create(2, parent=a)
+        a.num = 10
+        a.save()
+        self.assertCounts({10: 1, 2: 0})
+
+    def test_recompute_command(self):
+        a = create(1)
+        b = create(2, parent=a)
+        create(3, parent=b)
+        create(4)
+        CountedExampleModel.objects.update(descendant_count=7)
+        out = StringIO()
+        call_command(
+            "recompute_descendant_count",
+            "tests.CountedExampleModel",
+            batch_size=3,
+            stdout=out,
+        )
+        self.assertCounts({1: 2, 2: 1, 3: 0, 4: 0})
+        self.assertIn("4 rows", out.getvalue())
+
+    def test_recompute_command_rejects_model(self):
+        with self.assertRaises(CommandError):
+            call_command("recompute_descendant_count", "tests.ExampleModel")
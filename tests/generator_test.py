@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.test import TestCase
+
+from django_hierarchical_models.generator import (
+    BRANCHING,
+    SHAPES,
+    forest_parents,
+    generate_forest,
+)
+from django_hierarchical_models.models.query import subtree_aggregate
+from tests.models import CountedExampleModel, ExampleModel
+
+
+def num(i: int) -> dict:
+    return {"num": i}
+
+
+class ForestParentsTests(TestCase):
+    def test_parents_come_first(self):
+        for shape in SHAPES:
+            parents = forest_parents(200, shape, seed=3)
+            self.assertEqual(len(parents), 200)
+            self.assertIsNone(parents[0])
+            for i, parent in enumerate(parents):
+                self.assertTrue(parent is None or parent < i, shape)
+
+    def test_shapes(self):
+        self.assertEqual(forest_parents(4, "chain"), [None, 0, 1, 2])
+        self.assertEqual(forest_parents(4, "star"), [None, 0, 0, 0])
+        balanced = forest_parents(1 + BRANCHING + BRANCHING**2, "balanced")
+        self.assertEqual(balanced.count(0), BRANCHING)
+        self.assertEqual(balanced[-1], BRANCHING)
+
+    def test_deterministic(self):
+        self.assertEqual(forest_parents(100, seed=7), forest_parents(100, seed=7))
+        self.assertNotEqual(forest_parents(100, seed=7), forest_parents(100, seed=8))
+
+    def test_empty(self):
+        for shape in SHAPES:
+            self.assertEqual(forest_parents(0, shape), [])
+
+    def test_unknown_shape(self):
+        with self.assertRaises(ValueError):
+            forest_parents(10, "spiral")
+
+
+class GenerateForestTests(TestCase):
+    def test_generate_forest(self):
+        parents = forest_parents(100, "skewed", seed=5)
+        pks = generate_forest(ExampleModel, 100, "skewed", seed=5, fields=num)
+        rows = dict(ExampleModel.objects.values_list("pk", "parent_id"))
+        self.assertEqual(len(rows), 100)
+        for i, parent in enumerate(parents):
+            expected = None if parent is None else pks[parent]
+            self.assertEqual(rows[pks[i]], expected)
+        self.assertEqual(ExampleModel.objects.get(pk=pks[42]).num, 42)
+
+    def test_one_insert_per_generation(self):
+        with self.assertNumQueries(3 + 2):
+            generate_forest(ExampleModel, 13, "balanced", fields=num)
+
+    def test_batch_size(self):
+        with self.assertNumQueries(4 + 2):
+            generate_forest(ExampleModel, 10, "star", fields=num, batch_size=3)
+
+    def test_descendant_count(self):
+        generate_forest(CountedExampleModel, 200, seed=1, fields=num)
+        expected = subtree_aggregate(
+            CountedExampleModel, Count("pk"), include_self=False
+        )
+        for instance in CountedExampleModel.objects.annotate(expected=expected):
+            self.assertEqual(instance.descendant_count, instance.expected or 0)
+
+
+class GenerateForestCommandTests(TestCase):
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "generate_forest",
+            "tests.ExampleModel",
+            "25",
+            shape="chain",
+            index_field=["num"],
+            stdout=out,
+        )
+        self.assertIn("Generated 25 tests.ExampleModel rows", out.getvalue())
+        deepest = ExampleModel.objects.get(num=24)
+        self.assertEqual(len(deepest.ancestors()), 24)
+
+    def test_command_rejects_field(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "generate_forest", "tests.ExampleModel", "3", index_field=["nope"]
+            )
+
+    def test_command_rejects_model(self):
+        with self.assertRaises(CommandError):
+            call_command("generate_forest", "tests.Missing", "3")
@@ -1,9 +1,14 @@
 import copy
+from collections.abc import Callable
+from typing import Any
 
 from django.test import TestCase
+from parameterized import parameterized_class  # type: ignore[import-untyped]
 
+from django_hierarchical_models.generator import SHAPES, generate_forest
 from django_hierarchical_models.models import Node
 from django_hierarchical_models.models.exceptions import CycleException
+from django_hierarchical_models.testing import HierarchyAssertionsMixin
 from tests.models import ExampleModel
 
 
@@ -1020,3 +1025,179 @@ class HierarchicalModelAdvancedTests(TestCase):
             ),
             mn15,
         )
+
+
+class HasMoreTests(TestCase):
+    a: ExampleModel
+    b: ExampleModel
+    c: ExampleModel
+    d: ExampleModel
+    e: ExampleModel
+
+    @classmethod
+    def setUpTestData(cls):
+        #    a
+        #   / \
+        #  b   c
+        #  |
+        #  d
+        #  |
+        #  e
+        cls.a = create(1)
+        cls.b = create(2, parent=cls.a)
+        cls.c = create(3, parent=cls.a)
+        cls.d = create(4, parent=cls.b)
+        cls.e = create(5, parent=cls.d)
+
+    @staticmethod
+    def ordered(queryset):
+        return queryset.order_by("num")
+
+    def test_fully_expanded(self):
+        node = self.a.children(sibling_transform=self.ordered)
+        self.assertFalse(node.has_more)
+        self.assertFalse(any(n.has_more for n in node.children))
+
+    def test_max_generations(self):
+        with self.assertNumQueries(3):
+            node = self.a.children(max_generations=2, sibling_transform=self.ordered)
+        b, c = node.children
+        (d,) = b.children
+        self.assertEqual(d.instance, self.d)
+        self.assertEqual(d.children, [])
+        self.assertTrue(d.has_more)
+        self.assertFalse(c.has_more)
+        self.assertFalse(b.has_more)
+        self.assertFalse(node.has_more)
+
+    def test_max_generations_zero(self):
+        self.assertTrue(self.a.children(max_generations=0).has_more)
+        self.assertFalse(self.e.children(max_generations=0).has_more)
+
+    def test_max_siblings(self):
+        node = self.a.children(max_siblings=1, sibling_transform=self.ordered)
+        self.assertTrue(node.has_more)
+        self.assertEqual([n.instance for n in node.children], [self.b])
+        self.assertFalse(node.children[0].has_more)
+
+    def test_max_total(self):
+        node = self.a.children(max_total=3, sibling_transform=self.ordered)
+        b, c = node.children
+        self.assertTrue(b.has_more)
+        self.assertFalse(c.has_more)
+        self.assertFalse(node.has_more)
+
+    def test_not_compared(self):
+        self.assertEqual(
+            self.a.children(max_generations=1), self.a.children(max_generations=1)
+        )
+        self.assertEqual(Node(self.a, has_more=True), Node(self.a))
+
+
+class AssertTraversalQueriesTests(HierarchyAssertionsMixin, TestCase):
+    def test_within_budget(self):
+        with self.assertTraversalQueries(max=2) as captured:
+            create(1)
+        self.assertEqual(len(captured), 1)
+
+    def test_over_budget(self):
+        a = create(1)
+        b = create(2, parent=a)
+        c = ExampleModel.objects.get(pk=create(3, parent=b).pk)
+        with self.assertRaisesMessage(AssertionError, "2 queries executed, at most 1"):
+            with self.assertTraversalQueries(max=1):
+                c.ancestors()
+
+    def test_within_named_budget(self):
+        a = create(1)
+        create(2, parent=a)
+        with self.assertRaises(AssertionError):
+            with self.assertWithinBudget("descendants", a):
+                list(a.descendants())
+                list(a.descendants())
+
+
+@parameterized_class(("shape",), [(shape,) for shape in SHAPES])
+class QueryBudgetTests(HierarchyAssertionsMixin, TestCase):
+    shape: str
+    pks: list[int]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pks = generate_forest(
+            ExampleModel, 40, cls.shape, seed=2, fields=lambda i: {"num": i}
+        )
+
+    def assertBudget(self, method: str, call: Callable[[ExampleModel], Any]):
+        for pk in self.pks[::6]:
+            instance = ExampleModel.objects.get(pk=pk)
+            with self.subTest(pk=pk), self.assertWithinBudget(method, instance):
+                call(instance)
+
+    def test_parent(self):
+        self.assertBudget("parent", lambda instance: instance.parent)
+
+    def test_ancestors(self):
+        self.assertBudget("ancestors", lambda instance: instance.ancestors())
+
+    def test_root(self):
+        self.assertBudget("root", lambda instance: instance.root())
+
+    def test_is_child_of(self):
+        first = ExampleModel.objects.get(pk=self.pks[0])
+        self.assertBudget("is_child_of", lambda instance: instance.is_child_of(first))
+
+    def test_set_parent(self):
+        for pk in self.pks[::6]:
+            parent = ExampleModel.objects.get(pk=pk)
+            child = create(-1)
+            with self.subTest(pk=pk), self.assertWithinBudget("set_parent", parent):
+                child.set_parent(parent)
+
+    def test_direct_children(self):
+        self.assertBudget(
+            "direct_children", lambda instance: list(instance.direct_children())
+        )
+
+    def test_children(self):
+        self.assertBudget("children", lambda instance: instance.children())
+        self.assertBudget("children", lambda instance: instance.children(max_total=5))
+        self.assertBudget(
+            "children", lambda instance: instance.children(max_generations=2)
+        )
+
+    def test_descendants(self):
+        self.assertBudget("descendants", lambda instance: list(instance.descendants()))
+        self.assertBudget(
+            "descendants_at_depth",
+            lambda instance: list(instance.descendants_at_depth(2)),
+        )
+        self.assertBudget(
+            "descendants_between_depths",
+            lambda instance: list(instance.descendants_between_depths(1, 3)),
+        )
+
+    def test_descendants_page(self):
+        self.assertBudget(
+            "descendants_page", lambda instance: instance.descendants_page(page_size=10)
+        )
+
+    def test_lazy_children(self):
+        self.assertBudget(
+            "lazy_children", lambda instance: instance.lazy_children().children
+        )
+
+    def test_queryset_methods(self):
+        objects = ExampleModel.objects
+        self.assertBudget(
+            "common_ancestor",
+            lambda instance: objects.common_ancestor(instance, self.pks[-1]),
+        )
+        self.assertBudget(
+            "path_between",
+            lambda instance: objects.path_between(instance, self.pks[-1]),
+        )
+        self.assertBudget(
+            "is_child_of_many",
+            lambda instance: objects.is_child_of_many([instance], self.pks),
+        )
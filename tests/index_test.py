@@ -0,0 +1,145 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from django_hierarchical_models.index import ForestIndex
+from django_hierarchical_models.models import CycleException
+from tests.models import ExampleModel
+
+
+def create(num: int, **kwargs) -> ExampleModel:
+    return ExampleModel.objects.create(num=num, **kwargs)
+
+
+class ForestIndexTests(TestCase):
+    n1: ExampleModel
+    n2: ExampleModel
+    n3: ExampleModel
+    n4: ExampleModel
+    n5: ExampleModel
+    n6: ExampleModel
+    n7: ExampleModel
+    instances: list[ExampleModel]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.n1 = create(1)
+        cls.n2 = create(2, parent=cls.n1)
+        cls.n3 = create(3, parent=cls.n1)
+        cls.n4 = create(4, parent=cls.n2)
+        cls.n5 = create(5, parent=cls.n4)
+        cls.n6 = create(6)
+        cls.n7 = create(7, parent=cls.n6)
+        cls.instances = [cls.n1, cls.n2, cls.n3, cls.n4, cls.n5, cls.n6, cls.n7]
+
+    def check_index(self, index: ForestIndex):
+        self.assertEqual(len(index), 7)
+        for instance in self.instances:
+            self.assertIn(instance, index)
+            self.assertEqual(
+                index.ancestors(instance.pk),
+                [ancestor.pk for ancestor in instance.ancestors()],
+            )
+            self.assertEqual(index.root(instance), instance.root().pk)
+            self.assertEqual(
+                index.children(instance.pk),
+                sorted(child.pk for child in instance.direct_children()),
+            )
+            for other in self.instances:
+                self.assertEqual(
+                    index.is_child_of(instance, other), instance.is_child_of(other)
+                )
+        self.assertEqual(index.parent(self.n4.pk), self.n2.pk)
+        self.assertIsNone(index.parent(self.n6.pk))
+        self.assertEqual(index.ancestors(self.n5.pk, 2), [self.n4.pk, self.n2.pk])
+        self.assertEqual(
+            index.descendants(self.n1.pk),
+            [self.n2.pk, self.n3.pk, self.n4.pk, self.n5.pk],
+        )
+        self.assertEqual(
+            index.descendants(self.n1.pk, max_generations=2),
+            [self.n2.pk, self.n3.pk, self.n4.pk],
+        )
+        self.assertNotIn(-1, index)
+        with self.assertRaises(KeyError):
+            index.root(-1)
+
+    def test_build(self):
+        with self.assertNumQueries(1):
+            index = ForestIndex.build(ExampleModel)
+        with index:
+            self.check_index(index)
+
+    def test_without_csr(self):
+        with ForestIndex.build(ExampleModel, csr=False) as index:
+            self.assertEqual(index.root(self.n5), self.n1.pk)
+            with self.assertRaises(ValueError):
+                index.children(self.n1)
+
+    def test_queryset(self):
+        queryset = ExampleModel.objects.exclude(pk=self.n2.pk)
+        with ForestIndex.build(queryset) as index:
+            self.assertNotIn(self.n2, index)
+            self.assertEqual(index.root(self.n5), self.n4.pk)
+
+    def test_shared_memory(self):
+        owner = ForestIndex.create_shared(ExampleModel)
+        try:
+            with ForestIndex.attach(owner.shared_name) as index:
+                self.check_index(index)
+        finally:
+            owner.unlink()
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "forest.idx")
+            out = StringIO()
+            call_command("build_forest_index", "tests.ExampleModel", path, stdout=out)
+            self.assertEqual(out.getvalue(), f"Wrote 7 rows to {path}\n")
+            with ForestIndex.open(path) as index:
+                self.check_index(index)
+
+    def test_with_parents(self):
+        changes = {
+            self.n2.pk: self.n7.pk,
+            self.n6.pk: self.n3.pk,
+            self.n4.pk: None,
+            self.n1.pk: self.n5.pk,
+        }
+        with ForestIndex.build(ExampleModel) as index:
+            self.assertIsNone(index.with_parents({-1: None}))
+            rows = [(pk, changes.get(pk, parent)) for pk, parent in index.rows()]
+            self.assertEqual(
+                index.with_parents(changes), ForestIndex.serialize_rows(rows)
+            )
+
+    def test_unsaved_instance(self):
+        with ForestIndex.build(ExampleModel) as index:
+            self.assertNotIn(ExampleModel(num=0), index)
+            self.assertNotIn("1", index)
+            with self.assertRaises(KeyError):
+                index.root(None)
+
+    def test_unsorted_rows(self):
+        with self.assertRaises(ValueError):
+            ForestIndex.serialize_rows([(2, None), (1, None)])
+        with self.assertRaises(ValueError):
+            ForestIndex.serialize_rows([(1, None), (1, None)])
+
+    def test_cycle(self):
+        buffer = ForestIndex.serialize_rows([(1, 3), (2, 1), (3, 2), (4, 3), (5, None)])
+        with ForestIndex(buffer) as index:
+            with self.assertRaises(CycleException):
+                index.root(4)
+            with self.assertRaises(CycleException):
+                index.ancestors(4)
+            with self.assertRaises(CycleException):
+                index.is_child_of(4, 5)
+            with self.assertRaises(CycleException) as cm:
+                index.descendants(1)
+            self.assertEqual(str(cm.exception), "The parents of 1 contain a cycle")
+            self.assertEqual(index.ancestors(4, 2), [3, 2])
+            self.assertTrue(index.is_child_of(4, 1))
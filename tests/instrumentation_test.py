@@ -0,0 +1,169 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from django_hierarchical_models.models import (
+    CallStats,
+    hierarchy_stats,
+    traversal_finished,
+)
+from tests.models import CountedExampleModel, ExampleModel
+
+
+def create(num: int, **kwargs) -> ExampleModel:
+    return ExampleModel.objects.create(num=num, **kwargs)
+
+
+def fresh(instance: ExampleModel) -> ExampleModel:
+    return ExampleModel.objects.get(pk=instance.pk)
+
+
+class InstrumentationTests(TestCase):
+    a: ExampleModel
+    b: ExampleModel
+    c: ExampleModel
+    d: ExampleModel
+
+    @classmethod
+    def setUpTestData(cls):
+        # a - b - c
+        #  \
+        #   d
+        cls.a = create(1)
+        cls.b = create(2, parent=cls.a)
+        cls.c = create(3, parent=cls.b)
+        cls.d = create(4, parent=cls.a)
+
+    def test_ancestors(self):
+        c = fresh(self.c)
+        with hierarchy_stats() as stats:
+            c.ancestors()
+        (call,) = stats.calls
+        self.assertEqual(call.model, "tests.ExampleModel")
+        self.assertEqual(call.method, "ancestors")
+        self.assertEqual((call.queries, call.rows, call.depth), (2, 2, 2))
+        self.assertGreater(call.elapsed, 0)
+
+    def test_root_and_is_child_of(self):
+        with hierarchy_stats() as stats:
+            fresh(self.c).root()
+            fresh(self.c).is_child_of(self.a)
+        root, is_child_of = stats.calls
+        self.assertEqual((root.queries, root.depth), (2, 2))
+        self.assertEqual((is_child_of.queries, is_child_of.depth), (2, 2))
+
+    def test_children_counts_nested_queries_once(self):
+        with hierarchy_stats() as stats:
+            self.a.children()
+        (call,) = stats.calls
+        self.assertEqual(call.method, "children")
+        self.assertEqual((call.queries, call.rows, call.depth), (4, 3, 2))
+
+    def test_querysets_are_measured_when_fetched(self):
+        with hierarchy_stats() as stats:
+            direct_children = self.a.direct_children()
+            descendants = self.a.descendants()
+            self.assertEqual(stats.calls, [])
+            list(direct_children)
+            list(descendants.filter(num__gt=2))
+            list(direct_children)
+        self.assertEqual(
+            [(call.method, call.queries, call.rows) for call in stats.calls],
+            [("direct_children", 1, 2), ("descendants", 1, 2)],
+        )
+
+    def test_lazy_children(self):
+        with hierarchy_stats() as stats:
+            node = self.a.lazy_children()
+            _ = node.children
+        (call,) = stats.calls
+        self.assertEqual(
+            (call.method, call.queries, call.rows), ("lazy_children", 1, 2)
+        )
+
+    def test_queryset_methods(self):
+        with hierarchy_stats() as stats:
+            ExampleModel.objects.common_ancestor(self.c, self.d)
+            ExampleModel.objects.is_child_of_many([self.c], [self.a])
+        self.assertEqual(
+            [(call.method, call.queries, call.rows) for call in stats.calls],
+            [("common_ancestor", 1, 4), ("is_child_of_many", 1, 3)],
+        )
+
+    def test_set_parent(self):
+        with hierarchy_stats() as stats:
+            self.d.set_parent(fresh(self.c))
+        (call,) = stats.calls
+        # The ancestors of c fetched by the cycle check, and d.
+        self.assertEqual((call.method, call.queries, call.rows), ("set_parent", 3, 3))
+
+    def test_descendant_count_writes(self):
+        root = CountedExampleModel.objects.create(num=1)
+        with hierarchy_stats() as stats:
+            child = CountedExampleModel.objects.create(num=2, parent=root)
+            child.set_parent(None)
+        self.assertEqual([call.method for call in stats.calls], ["save", "set_parent"])
+
+    def test_nested_blocks(self):
+        with hierarchy_stats() as outer:
+            self.a.children()
+            with hierarchy_stats() as inner:
+                fresh(self.c).ancestors()
+        self.assertEqual(
+            [call.method for call in outer.calls], ["children", "ancestors"]
+        )
+        self.assertEqual([call.method for call in inner.calls], ["ancestors"])
+        self.assertEqual(outer.queries, 4 + 2)
+        self.assertEqual(
+            list(outer.by_method()),
+            ["tests.ExampleModel.children", "tests.ExampleModel.ancestors"],
+        )
+
+    def test_exception_is_recorded(self):
+        with hierarchy_stats() as stats:
+            with self.assertRaises(ValueError):
+                self.a.descendants_page(page_size=0)
+        self.assertEqual([call.method for call in stats.calls], ["descendants_page"])
+
+    def test_signal(self):
+        received = []
+
+        def receiver(sender, stats: CallStats, **kwargs):
+            received.append((sender, stats.method))
+
+        traversal_finished.connect(receiver)
+        try:
+            fresh(self.c).root()
+        finally:
+            traversal_finished.disconnect(receiver)
+        fresh(self.c).root()
+        self.assertEqual(received, [(ExampleModel, "root")])
+
+    def test_disabled(self):
+        c = fresh(self.c)
+        with CaptureQueriesContext(connection) as captured:
+            c.ancestors()
+        self.assertNotIn("/*", captured[0]["sql"])
+
+    @override_settings(HIERARCHICAL_MODELS_SQL_COMMENTS=True)
+    def test_sql_comments(self):
+        executed = []
+
+        def wrapper(execute, sql, params, many, context):
+            executed.append(sql.partition(" */ ")[0])
+            return execute(sql, params, many, context)
+
+        c = fresh(self.c)
+        with connection.execute_wrapper(wrapper):
+            c.ancestors()
+            list(self.a.descendants())
+            ExampleModel.objects.get(pk=self.a.pk)
+        self.assertEqual(
+            executed[:3],
+            [
+                "/* django_hierarchical_models tests.ExampleModel.ancestors",
+                "/* django_hierarchical_models tests.ExampleModel.ancestors",
+                "/* django_hierarchical_models tests.ExampleModel.descendants",
+            ],
+        )
+        self.assertFalse(executed[3].startswith("/*"))
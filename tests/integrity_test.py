@@ -0,0 +1,126 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from django_hierarchical_models.integrity import (
+    break_cycles,
+    check_hierarchy,
+    check_rows,
+    scan_parents,
+)
+from tests.models import ExampleModel, TimestampedExampleModel
+
+
+def create(num: int, **kwargs) -> ExampleModel:
+    return ExampleModel.objects.create(num=num, **kwargs)
+
+
+class CheckRowsTests(TestCase):
+    def test_ok(self):
+        report = check_rows([(1, None), (2, 1), (3, 1), (4, 3)])
+        self.assertTrue(report.ok)
+        self.assertEqual(report.rows, 4)
+
+    def test_problems(self):
+        report = check_rows(
+            [
+                (1, None),
+                (2, 2),
+                (3, 5),
+                (4, 3),
+                (5, 4),
+                (6, 4),
+                (7, 99),
+                (8, 7),
+                (9, 10),
+                (10, 9),
+            ]
+        )
+        self.assertFalse(report.ok)
+        self.assertEqual(report.self_parents, [2])
+        self.assertEqual(report.cycles, [[3, 5, 4], [9, 10]])
+        self.assertEqual(report.dangling, [(7, 99)])
+
+    def test_long_cycle(self):
+        n = 100000
+        rows = [(i, i - 1 if i else n - 1) for i in range(n)]
+        report = check_rows(rows)
+        self.assertEqual(len(report.cycles), 1)
+        self.assertEqual(report.cycles[0][:3], [0, n - 1, n - 2])
+
+    def test_unordered(self):
+        with self.assertRaises(ValueError):
+            check_rows([(2, None), (1, None)])
+
+
+class CheckHierarchyTests(TestCase):
+    def setUp(self):
+        self.a = create(1)
+        self.b = create(2, parent=self.a)
+        self.c = create(3, parent=self.b)
+        self.d = create(4)
+        # a -> c -> b -> a, and d -> d.
+        ExampleModel.objects.filter(pk=self.a.pk).update(parent=self.c)
+        ExampleModel.objects.filter(pk=self.d.pk).update(parent=self.d)
+
+    def test_scan_parents(self):
+        with self.assertNumQueries(3):
+            rows = list(scan_parents(ExampleModel, chunk_size=2))
+        self.assertEqual(
+            rows,
+            [
+                (self.a.pk, self.c.pk),
+                (self.b.pk, self.a.pk),
+                (self.c.pk, self.b.pk),
+                (self.d.pk, self.d.pk),
+            ],
+        )
+
+    def test_check_hierarchy(self):
+        report = check_hierarchy(ExampleModel, chunk_size=3)
+        self.assertEqual(report.self_parents, [self.d.pk])
+        self.assertEqual(report.cycles, [[self.a.pk, self.c.pk, self.b.pk]])
+
+    def test_break_cycles(self):
+        report = check_hierarchy(ExampleModel)
+        self.assertEqual(break_cycles(ExampleModel, report), [self.d.pk, self.a.pk])
+        self.assertTrue(check_hierarchy(ExampleModel).ok)
+        self.assertEqual(ExampleModel.objects.get(pk=self.c.pk).root(), self.a)
+
+    def test_break_cycles_auto_now(self):
+        a = TimestampedExampleModel.objects.create(num=1)
+        TimestampedExampleModel.objects.filter(pk=a.pk).update(parent=a)
+        before = TimestampedExampleModel.objects.get(pk=a.pk).updated
+        break_cycles(TimestampedExampleModel, check_hierarchy(TimestampedExampleModel))
+        a.refresh_from_db()
+        self.assertIsNone(a.parent_id)
+        self.assertGreater(a.updated, before)
+
+    def test_command(self):
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "Found 2 problems"):
+            call_command("check_hierarchy", "tests.ExampleModel", stdout=out)
+        output = out.getvalue()
+        self.assertIn("Checked 4 rows", output)
+        self.assertIn(f"Self-parents: 1\n  {self.d.pk}\n", output)
+        a, b, c = self.a.pk, self.b.pk, self.c.pk
+        self.assertIn(f"Cycles: 1\n  {a} -> {c} -> {b} -> {a}\n", output)
+        self.assertIn("Dangling parents: 0", output)
+
+    def test_command_break_cycles(self):
+        out = StringIO()
+        call_command(
+            "check_hierarchy", "tests.ExampleModel", break_cycles=True, stdout=out
+        )
+        self.assertIn("Made 2 rows roots", out.getvalue())
+        out = StringIO()
+        call_command("check_hierarchy", "tests.ExampleModel", stdout=out)
+        self.assertIn("Cycles: 0", out.getvalue())
+
+    def test_command_limit(self):
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("check_hierarchy", "tests.ExampleModel", limit=0, stdout=out)
+        self.assertIn("... and 1 more", out.getvalue())
@@ -0,0 +1,82 @@
+from django.test import TestCase
+
+from django_hierarchical_models.models import LazyNode
+from tests.models import ExampleModel
+
+
+def create(num: int, **kwargs) -> ExampleModel:
+    return ExampleModel.objects.create(num=num, **kwargs)
+
+
+def ordered(queryset):
+    return queryset.order_by("num")
+
+
+class LazyNodeTests(TestCase):
+    a: ExampleModel
+    b: ExampleModel
+    c: ExampleModel
+    d: ExampleModel
+    e: ExampleModel
+    f: ExampleModel
+    g: ExampleModel
+
+    @classmethod
+    def setUpTestData(cls):
+        #      a
+        #    / | \
+        #   b  c  d
+        #  /|  |
+        # e f  g
+        cls.a = create(1)
+        cls.b = create(2, parent=cls.a)
+        cls.c = create(3, parent=cls.a)
+        cls.d = create(4, parent=cls.a)
+        cls.e = create(5, parent=cls.b)
+        cls.f = create(6, parent=cls.b)
+        cls.g = create(7, parent=cls.c)
+
+    def test_nothing_loaded_up_front(self):
+        with self.assertNumQueries(0):
+            node = self.a.lazy_children()
+        self.assertIsInstance(node, LazyNode)
+        self.assertFalse(node.loaded)
+        self.assertTrue(node.has_more)
+
+    def test_one_query_per_level(self):
+        node = self.a.lazy_children(sibling_transform=ordered)
+        with self.assertNumQueries(1):
+            children = node.children
+        self.assertEqual([n.instance for n in children], [self.b, self.c, self.d])
+        b, c, d = children
+        # d has no children, which the first query already found out.
+        self.assertTrue(d.loaded)
+        self.assertFalse(d.has_more)
+        with self.assertNumQueries(1):
+            self.assertEqual([n.instance for n in b.children], [self.e, self.f])
+            self.assertEqual([n.instance for n in c.children], [self.g])
+            self.assertEqual(d.children, [])
+        with self.assertNumQueries(0):
+            for n in (*b.children, *c.children):
+                self.assertEqual(n.children, [])
+
+    def test_only_visited_parts_loaded(self):
+        node = self.a.lazy_children(sibling_transform=ordered)
+        with self.assertNumQueries(1):
+            b, c, _ = node.children
+        self.assertTrue(b.has_more)
+        self.assertTrue(c.has_more)
+
+    def test_batch_size(self):
+        node = self.a.lazy_children(sibling_transform=ordered, batch_size=1)
+        b, c, _ = node.children
+        with self.assertNumQueries(1):
+            b.children
+        self.assertFalse(c.loaded)
+        with self.assertNumQueries(1):
+            c.children
+
+    def test_leaf(self):
+        node = self.g.lazy_children()
+        with self.assertNumQueries(1):
+            self.assertEqual(node.children, [])
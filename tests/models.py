@@ -1,6 +1,12 @@
 from django.db import models
 
-from django_hierarchical_models.models import HierarchicalModel
+from django_hierarchical_models.models import (
+    DenormalizedColumns,
+    DescendantCountModel,
+    HierarchicalModel,
+    OrderedHierarchicalModel,
+    TreeCache,
+)
 
 
 class ExampleModel(HierarchicalModel):
@@ -8,3 +14,62 @@ class ExampleModel(HierarchicalModel):
 
     def __str__(self):
         return str(self.num)
+
+
+class CachedExampleModel(HierarchicalModel):
+    num = models.IntegerField()
+
+    tree_cache = TreeCache(max_size=20)
+
+    def __str__(self):
+        return str(self.num)
+
+
+class CachedExampleProxy(CachedExampleModel):
+    class Meta:
+        proxy = True
+
+
+class TimestampedExampleModel(HierarchicalModel):
+    num = models.IntegerField()
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return str(self.num)
+
+
+class CountedExampleModel(DescendantCountModel):
+    num = models.IntegerField()
+
+    def __str__(self):
+        return str(self.num)
+
+
+class DenormalizedExampleModel(HierarchicalModel):
+    num = models.IntegerField()
+    depth = models.IntegerField(default=0)
+    top = models.IntegerField(null=True)
+    size = models.IntegerField(default=0)
+
+    def __str__(self):
+        return str(self.num)
+
+
+class OrderedExampleModel(OrderedHierarchicalModel):
+    num = models.IntegerField()
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.num)
+
+
+class DualWriteExampleModel(HierarchicalModel):
+    num = models.IntegerField()
+    depth = models.IntegerField(null=True)
+    tree = models.IntegerField(null=True)
+    path = models.CharField(max_length=255, null=True)
+
+    columns = DenormalizedColumns(depth="depth", root="tree", path="path")
+
+    def __str__(self):
+        return str(self.num)
@@ -0,0 +1,109 @@
+import copy
+import pickle
+import sys
+
+from django.test import SimpleTestCase
+
+from django_hierarchical_models.models import Node
+
+
+def tree() -> Node[int]:
+    #     1
+    #   / | \
+    #  2  3  4
+    # / \    |
+    # 5 6    7
+    return Node(
+        1,
+        [
+            Node(2, [Node(5), Node(6)]),
+            Node(3),
+            Node(4, [Node(7)]),
+        ],
+    )
+
+
+def chain(length: int) -> Node[int]:
+    root = node = Node(0)
+    for i in range(1, length):
+        child = Node(i)
+        node.children.append(child)
+        node = child
+    return root
+
+
+class NodeTests(SimpleTestCase):
+    def test_slots(self):
+        self.assertFalse(hasattr(Node(1), "__dict__"))
+
+    def test_preorder(self):
+        self.assertEqual([n.instance for n in tree().preorder()], [1, 2, 5, 6, 3, 4, 7])
+
+    def test_postorder(self):
+        self.assertEqual(
+            [n.instance for n in tree().postorder()], [5, 6, 2, 3, 7, 4, 1]
+        )
+
+    def test_level_order(self):
+        self.assertEqual(
+            [n.instance for n in tree().level_order()], [1, 2, 3, 4, 5, 6, 7]
+        )
+
+    def test_flatten(self):
+        self.assertEqual(tree().flatten(), [1, 2, 5, 6, 3, 4, 7])
+
+    def test_find(self):
+        root = tree()
+        found = root.find(4)
+        assert found is not None
+        self.assertIs(found, root.children[2])
+        found = root.find(lambda i: i > 5)
+        assert found is not None
+        self.assertEqual(found.instance, 6)
+        self.assertIsNone(root.find(8))
+
+    def test_depth(self):
+        self.assertEqual(tree().depth(), 2)
+        self.assertEqual(Node(1).depth(), 0)
+        self.assertEqual(chain(10).depth(), 9)
+
+    def test_str(self):
+        self.assertEqual(
+            str(tree()), "\n1\n  - 2\n    - 5\n    - 6\n  - 3\n  - 4\n    - 7"
+        )
+
+    def test_repr(self):
+        self.assertEqual(
+            repr(Node(1, [Node(2)])),
+            "Node(instance=1, children=[Node(instance=2, children=[])])",
+        )
+
+    def test_eq(self):
+        self.assertEqual(tree(), tree())
+        other = tree()
+        other.children[2].children[0].instance = 8
+        self.assertNotEqual(tree(), other)
+        other = tree()
+        other.children.pop()
+        self.assertNotEqual(tree(), other)
+
+    def test_copy(self):
+        root = tree()
+        root.children[0].has_more = True
+        root_copy = copy.copy(root)
+        self.assertEqual(root_copy, root)
+        self.assertIsNot(root_copy.children[0], root.children[0])
+        self.assertTrue(root_copy.children[0].has_more)
+
+    def test_pickle(self):
+        self.assertEqual(pickle.loads(pickle.dumps(tree())), tree())
+
+    def test_deep_tree(self):
+        length = sys.getrecursionlimit() * 10
+        root = chain(length)
+        self.assertEqual(root.depth(), length - 1)
+        self.assertEqual(len(root.flatten()), length)
+        self.assertEqual(len(list(root.postorder())), length)
+        self.assertEqual(copy.copy(root), root)
+        self.assertEqual(str(root).count("\n"), length)
+        self.assertTrue(repr(root).startswith("Node(instance=0, "))
@@ -0,0 +1,168 @@
+from django.db import connection
+from django.test import TestCase
+
+from django_hierarchical_models.models.exceptions import CycleException
+from django_hierarchical_models.models.ordered import POSITION_GAP
+from tests.models import OrderedExampleModel
+
+
+def create(num: int, parent=None, **kwargs) -> OrderedExampleModel:
+    return OrderedExampleModel.objects.create(num=num, parent=parent, **kwargs)
+
+
+def nums(queryset) -> list[int]:
+    return [instance.num for instance in queryset]
+
+
+class OrderedHierarchicalModelTests(TestCase):
+    def setUp(self):
+        #      a
+        #   /  |  \
+        #  b   c   d
+        #  |
+        #  e
+        self.a = create(1)
+        self.b = create(2, self.a)
+        self.c = create(3, self.a)
+        self.d = create(4, self.a)
+        self.e = create(5, self.b)
+
+    def fresh(self, instance: OrderedExampleModel) -> OrderedExampleModel:
+        return OrderedExampleModel.objects.get(pk=instance.pk)
+
+    def positions(self, parent: OrderedExampleModel) -> dict[int, int]:
+        return {child.num: child.position for child in parent.direct_children()}
+
+    def test_appended_on_create(self):
+        self.assertEqual(
+            self.positions(self.a), {2: 0, 3: POSITION_GAP, 4: 2 * POSITION_GAP}
+        )
+        self.assertEqual(self.e.position, 0)
+        self.assertEqual(create(6).position, POSITION_GAP)
+
+    def test_explicit_position(self):
+        create(6, self.a, position=-5)
+        self.assertEqual(nums(self.a.direct_children()), [6, 2, 3, 4])
+
+    def test_direct_children_ordered(self):
+        OrderedExampleModel.objects.filter(pk=self.b.pk).update(position=10**6)
+        self.assertEqual(nums(self.a.direct_children()), [3, 4, 2])
+
+    def test_children_ordered(self):
+        self.d.move_before(self.b)
+        node = self.fresh(self.a).children()
+        self.assertEqual([child.instance.num for child in node.children], [4, 2, 3])
+        node = self.fresh(self.a).children(max_siblings=1)
+        self.assertEqual([child.instance.num for child in node.children], [4])
+
+    def test_move_after_writes_one_row(self):
+        d = self.fresh(self.d)
+        # A savepoint, the neighbours, the UPDATE and the savepoint release.
+        with self.assertNumQueries(4) as captured:
+            d.move_after(self.b)
+        updates = [q for q in captured if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(d.position, POSITION_GAP // 2)
+        self.assertEqual(nums(self.a.direct_children()), [2, 4, 3])
+
+    def test_move_before(self):
+        self.d.move_before(self.c)
+        self.assertEqual(nums(self.a.direct_children()), [2, 4, 3])
+        self.c.move_before(self.b)
+        self.assertEqual(self.c.position, -POSITION_GAP)
+        self.assertEqual(nums(self.a.direct_children()), [3, 2, 4])
+
+    def test_move_to_end(self):
+        self.b.move_after(self.d)
+        self.assertEqual(self.b.position, 3 * POSITION_GAP)
+        self.assertEqual(nums(self.a.direct_children()), [3, 4, 2])
+
+    def test_move_to_other_parent(self):
+        self.d.move_before(self.e)
+        self.assertEqual(self.fresh(self.d).parent_id, self.b.pk)
+        self.assertEqual(nums(self.b.direct_children()), [4, 5])
+        self.assertEqual(nums(self.a.direct_children()), [2, 3])
+
+    def test_move_among_roots(self):
+        f = create(6)
+        f.move_before(self.a)
+        self.assertEqual(
+            nums(OrderedExampleModel.objects.filter(parent=None).order_by("position")),
+            [6, 1],
+        )
+
+    def test_move_updates_auto_now(self):
+        updated = self.fresh(self.d).updated
+        self.d.move_before(self.b)
+        self.assertGreater(self.fresh(self.d).updated, updated)
+
+    def test_renumbers_when_full(self):
+        OrderedExampleModel.objects.filter(pk=self.c.pk).update(position=1)
+        d = self.fresh(self.d)
+        d.move_after(self.b)
+        self.assertEqual(nums(self.a.direct_children()), [2, 4, 3])
+        self.assertEqual(
+            self.positions(self.a),
+            {2: 0, 4: POSITION_GAP // 2, 3: POSITION_GAP},
+        )
+
+    def test_renumbers_ties(self):
+        OrderedExampleModel.objects.filter(pk=self.c.pk).update(position=0)
+        self.d.move_before(self.c)
+        self.assertEqual(nums(self.a.direct_children()), [2, 4, 3])
+
+    def test_repeated_moves(self):
+        for _ in range(40):
+            d = self.fresh(self.d)
+            d.move_after(self.b)
+            c = self.fresh(self.c)
+            c.move_after(self.b)
+        self.assertEqual(nums(self.a.direct_children()), [2, 3, 4])
+
+    def test_move_cycle(self):
+        b = self.fresh(self.b)
+        with self.assertRaises(CycleException):
+            b.move_after(self.e)
+        self.assertEqual(b.position, 0)
+        self.assertEqual(self.fresh(self.e).parent_id, self.b.pk)
+
+    def test_move_next_to_self(self):
+        with self.assertRaises(ValueError):
+            self.b.move_after(self.b)
+
+    def test_move_next_to_deleted(self):
+        c = self.fresh(self.c)
+        self.c.delete()
+        with self.assertRaises(ValueError):
+            self.d.move_after(c)
+
+    def test_set_parent_appends(self):
+        self.c.set_parent(self.b)
+        self.assertEqual(self.fresh(self.c).position, POSITION_GAP)
+        self.assertEqual(nums(self.b.direct_children()), [5, 3])
+
+    def test_set_parent_same_parent_keeps_position(self):
+        self.b.set_parent(self.a)
+        self.assertEqual(self.fresh(self.b).position, 0)
+
+    def test_set_parent_cycle_keeps_position(self):
+        with self.assertRaises(CycleException):
+            self.b.set_parent(self.e)
+        self.assertEqual(self.b.position, 0)
+
+    def test_renumber_children(self):
+        OrderedExampleModel.objects.filter(parent=self.a).update(position=7)
+        self.assertEqual(self.a.renumber_children(), 3)
+        self.assertEqual(
+            self.positions(self.a), {2: 0, 3: POSITION_GAP, 4: 2 * POSITION_GAP}
+        )
+
+    def test_index(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, OrderedExampleModel._meta.db_table
+            )
+        self.assertEqual(
+            constraints["tests_orderedexamplemodel_pos"]["columns"],
+            ["parent_id", "position"],
+        )
@@ -0,0 +1,74 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from tests.models import ExampleModel
+
+
+def create(num: int, **kwargs) -> ExampleModel:
+    return ExampleModel.objects.create(num=num, **kwargs)
+
+
+class DescendantsPageTests(TestCase):
+    root: ExampleModel
+    preorder: list[ExampleModel]
+
+    @classmethod
+    def setUpTestData(cls):
+        # Three levels of three children each, created depth first, so
+        # creation order is the expected order.
+        cls.root = create(0)
+        cls.preorder = []
+
+        def build(parent: ExampleModel, depth: int):
+            for _ in range(3):
+                child = create(depth, parent=parent)
+                cls.preorder.append(child)
+                if depth < 3:
+                    build(child, depth + 1)
+
+        build(cls.root, 1)
+
+    def collect(self, page_size: int) -> list[list[ExampleModel]]:
+        pages = []
+        cursor = None
+        while True:
+            items, cursor = self.root.descendants_page(cursor, page_size)
+            pages.append(items)
+            if cursor is None:
+                return pages
+
+    def test_depth_first_order(self):
+        self.assertEqual(len(self.preorder), 39)
+        for page_size in (1, 2, 5, 39, 100):
+            with self.subTest(page_size=page_size):
+                pages = self.collect(page_size)
+                self.assertEqual(sum(pages, []), self.preorder)
+                self.assertTrue(all(len(page) <= page_size for page in pages))
+
+    def test_later_pages_cost_the_same(self):
+        cursor = None
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                _, cursor = self.root.descendants_page(cursor, 5)
+            # One query per expanded instance, plus one per level resumed.
+            self.assertLessEqual(len(queries), 5 + 3 + 1)
+            if cursor is None:
+                break
+
+    def test_leaf(self):
+        leaf = self.preorder[-1]
+        self.assertEqual(leaf.descendants_page(), ([], None))
+
+    def test_changes_between_pages(self):
+        items, cursor = self.root.descendants_page(page_size=2)
+        self.assertEqual(items, self.preorder[:2])
+        items[1].delete()
+        items, cursor = self.root.descendants_page(cursor, 2)
+        self.assertEqual(items, self.preorder[5:7])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            self.root.descendants_page("not a cursor")
+        with self.assertRaises(ValueError):
+            self.root.descendants_page(page_size=0)
@@ -0,0 +1,422 @@
+from django.db.models import Max, Q, Sum
+from django.test import TestCase
+
+from django_hierarchical_models.index import ForestIndex
+from django_hierarchical_models.models import DescendantIds
+from django_hierarchical_models.models.exceptions import CycleException
+from tests.models import ExampleModel
+
+
+def create(num: int, **kwargs) -> ExampleModel:
+    return ExampleModel.objects.create(num=num, **kwargs)
+
+
+class SubtreeAggregateTests(TestCase):
+    a: ExampleModel
+    b: ExampleModel
+    c: ExampleModel
+    d: ExampleModel
+    e: ExampleModel
+
+    @classmethod
+    def setUpTestData(cls):
+        #  a     e
+        #  |
+        #  b
+        # / \
+        # c d
+        cls.a = create(1)
+        cls.b = create(2, parent=cls.a)
+        cls.c = create(3, parent=cls.b)
+        cls.d = create(4, parent=cls.b)
+        cls.e = create(5)
+
+    def test_descendant_ids(self):
+        self.assertCountEqual(
+            ExampleModel.objects.filter(pk__in=DescendantIds(ExampleModel, self.a.pk)),
+            (self.b, self.c, self.d),
+        )
+        self.assertCountEqual(
+            ExampleModel.objects.filter(
+                pk__in=DescendantIds(ExampleModel, self.b, include_self=True)
+            ),
+            (self.b, self.c, self.d),
+        )
+        self.assertFalse(
+            ExampleModel.objects.filter(pk__in=DescendantIds(ExampleModel, self.e.pk))
+        )
+
+    def test_descendant_count(self):
+        with self.assertNumQueries(1):
+            counts = dict(
+                ExampleModel.objects.with_descendant_count().values_list(
+                    "num", "descendant_count"
+                )
+            )
+        self.assertEqual(counts, {1: 3, 2: 2, 3: 0, 4: 0, 5: 0})
+
+    def test_descendant_count_matches_children(self):
+        for instance in ExampleModel.objects.with_descendant_count(name="n"):
+            node = instance.children()
+            total = -1
+            stack = [node]
+            while stack:
+                node = stack.pop()
+                total += 1
+                stack.extend(node.children)
+            self.assertEqual(instance.n, total)
+
+    def test_subtree_sum(self):
+        with self.assertNumQueries(1):
+            sums = dict(
+                ExampleModel.objects.with_subtree_aggregate(Sum("num")).values_list(
+                    "num", "num__sum"
+                )
+            )
+        self.assertEqual(sums, {1: 10, 2: 9, 3: 3, 4: 4, 5: 5})
+
+    def test_subtree_aggregate_exclude_self(self):
+        rows = ExampleModel.objects.with_subtree_aggregate(
+            total=Sum("num"), largest=Max("num"), include_self=False
+        ).values_list("num", "total", "largest")
+        self.assertCountEqual(
+            rows,
+            (
+                (1, 9, 4),
+                (2, 7, 4),
+                (3, None, None),
+                (4, None, None),
+                (5, None, None),
+            ),
+        )
+
+    def test_filter_and_order_by_annotation(self):
+        queryset = (
+            ExampleModel.objects.with_descendant_count()
+            .filter(descendant_count__gt=0)
+            .order_by("-descendant_count")
+        )
+        self.assertQuerySetEqual(queryset, (self.a, self.b))
+
+    def test_cycle(self):
+        # Terminates, and every row in the cycle is one of its own descendants.
+        self.a.parent = self.c
+        self.a.save()
+        counts = dict(
+            ExampleModel.objects.with_descendant_count().values_list(
+                "num", "descendant_count"
+            )
+        )
+        self.assertEqual(counts, {1: 4, 2: 4, 3: 4, 4: 0, 5: 0})
+
+
+class HasChildrenTests(TestCase):
+    def test_with_has_children(self):
+        a = create(1)
+        b = create(2, parent=a)
+        create(3, parent=b)
+        create(4)
+        with self.assertNumQueries(1):
+            rows = dict(
+                ExampleModel.objects.with_has_children().values_list(
+                    "num", "has_children"
+                )
+            )
+        self.assertEqual(rows, {1: True, 2: True, 3: False, 4: False})
+
+    def test_leaves(self):
+        a = create(1)
+        b = create(2, parent=a)
+        c = create(3, parent=b)
+        d = create(4)
+        self.assertCountEqual(ExampleModel.objects.leaves(), (c, d))
+        self.assertQuerySetEqual(b.direct_children().leaves(), (c,))
+
+
+class DescendantsTests(TestCase):
+    a: ExampleModel
+    b: ExampleModel
+    c: ExampleModel
+    d: ExampleModel
+    e: ExampleModel
+    f: ExampleModel
+    g: ExampleModel
+
+    @classmethod
+    def setUpTestData(cls):
+        #      a
+        #    /   \
+        #   b     c
+        #  / \    |
+        # d   e   f
+        #         |
+        #         g
+        cls.a = create(1)
+        cls.b = create(2, parent=cls.a)
+        cls.c = create(3, parent=cls.a)
+        cls.d = create(4, parent=cls.b)
+        cls.e = create(5, parent=cls.b)
+        cls.f = create(6, parent=cls.c)
+        cls.g = create(7, parent=cls.f)
+
+    def assertNums(self, queryset, nums):
+        with self.assertNumQueries(1):
+            self.assertCountEqual([instance.num for instance in queryset], nums)
+
+    def test_descendants(self):
+        self.assertNums(self.a.descendants(), (2, 3, 4, 5, 6, 7))
+        self.assertNums(self.c.descendants(include_self=True), (3, 6, 7))
+        self.assertNums(self.g.descendants(), ())
+
+    def test_max_generations(self):
+        self.assertNums(self.a.descendants(max_generations=2), (2, 3, 4, 5, 6))
+        self.assertNums(self.a.descendants(max_generations=1), (2, 3))
+        self.assertNums(self.a.descendants(max_generations=0), ())
+
+    def test_prune(self):
+        self.assertNums(self.a.descendants(prune=Q(num=3)), (2, 4, 5))
+        self.assertNums(self.a.descendants(prune=Q(num__in=(2, 6))), (3,))
+
+    def test_prune_across_relation(self):
+        self.assertNums(self.a.descendants(prune=Q(parent__num=2)), (2, 3, 6, 7))
+
+    def test_filter(self):
+        self.assertNums(self.a.descendants(filter=Q(num__gt=4)), (5, 6, 7))
+        self.assertNums(self.a.descendants(prune=Q(num=2), filter=Q(num__gt=5)), (6, 7))
+
+    def test_combined(self):
+        self.assertNums(
+            self.a.descendants(
+                max_generations=2, prune=Q(num=2), filter=~Q(num=3), include_self=True
+            ),
+            (1, 6),
+        )
+
+    def test_cycle(self):
+        self.a.parent = self.g
+        self.a.save()
+        self.assertNums(self.a.descendants(prune=Q(num=2)), (1, 3, 6, 7))
+
+    def test_children_prune(self):
+        node = self.a.children(
+            prune=Q(num=3), sibling_transform=lambda x: x.order_by("num")
+        )
+        self.assertEqual(node.flatten(), [self.a, self.b, self.d, self.e])
+
+    def test_children_prune_has_more(self):
+        node = self.c.children(max_generations=1, prune=Q(num=7))
+        self.assertEqual(node.flatten(), [self.c, self.f])
+        self.assertFalse(node.children[0].has_more)
+
+
+class CommonAncestorTests(TestCase):
+    a: ExampleModel
+    b: ExampleModel
+    c: ExampleModel
+    d: ExampleModel
+    e: ExampleModel
+    f: ExampleModel
+    g: ExampleModel
+
+    @classmethod
+    def setUpTestData(cls):
+        #      a     g
+        #    /   \
+        #   b     c
+        #  / \    |
+        # d   e   f
+        cls.a = create(1)
+        cls.b = create(2, parent=cls.a)
+        cls.c = create(3, parent=cls.a)
+        cls.d = create(4, parent=cls.b)
+        cls.e = create(5, parent=cls.b)
+        cls.f = create(6, parent=cls.c)
+        cls.g = create(7)
+
+    def test_common_ancestor(self):
+        objects = ExampleModel.objects
+        with self.assertNumQueries(1):
+            self.assertEqual(objects.common_ancestor(self.d, self.e), self.b)
+        self.assertEqual(objects.common_ancestor(self.d, self.f), self.a)
+        self.assertEqual(objects.common_ancestor(self.d.pk, self.b.pk), self.b)
+        self.assertEqual(objects.common_ancestor(self.d, self.d), self.d)
+        self.assertIsNone(objects.common_ancestor(self.d, self.g))
+        self.assertIsNone(objects.common_ancestor(self.d, 0))
+
+    def test_common_ancestors(self):
+        pairs = [
+            (self.d, self.e),
+            (self.e, self.f),
+            (self.f, self.c),
+            (self.a, self.g),
+        ]
+        with self.assertNumQueries(1):
+            ancestors = ExampleModel.objects.common_ancestors(pairs)
+        self.assertEqual(ancestors, [self.b, self.a, self.c, None])
+
+    def test_path_between(self):
+        objects = ExampleModel.objects
+        with self.assertNumQueries(1):
+            path = objects.path_between(self.d, self.f)
+        self.assertEqual(path, [self.d, self.b, self.a, self.c, self.f])
+        self.assertEqual(objects.path_between(self.f, self.a), [self.f, self.c, self.a])
+        self.assertEqual(objects.path_between(self.a, self.e), [self.a, self.b, self.e])
+        self.assertEqual(objects.path_between(self.e, self.e), [self.e])
+        self.assertIsNone(objects.path_between(self.e, self.g))
+
+    def test_parents_cached(self):
+        (ancestor,) = ExampleModel.objects.common_ancestors([(self.d, self.e)])
+        path = ExampleModel.objects.path_between(self.d, self.e)
+        assert path is not None
+        with self.assertNumQueries(0):
+            self.assertEqual(path[0].parent, ancestor)
+            self.assertEqual(path[1].parent, self.a)
+
+    def test_index(self):
+        with ForestIndex.build(ExampleModel) as index:
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    ExampleModel.objects.common_ancestor(self.d, self.f, index),
+                    self.a,
+                )
+            self.assertEqual(
+                ExampleModel.objects.path_between(self.d, self.e, index),
+                [self.d, self.b, self.e],
+            )
+
+    def test_cycle(self):
+        self.a.parent = self.f
+        self.a.save()
+        with self.assertRaises(CycleException):
+            ExampleModel.objects.common_ancestor(self.d, self.g)
+
+
+class IsChildOfManyTests(TestCase):
+    a: ExampleModel
+    b: ExampleModel
+    c: ExampleModel
+    d: ExampleModel
+    e: ExampleModel
+    f: ExampleModel
+
+    @classmethod
+    def setUpTestData(cls):
+        #      a     f
+        #    /   \
+        #   b     c
+        #  / \
+        # d   e
+        cls.a = create(1)
+        cls.b = create(2, parent=cls.a)
+        cls.c = create(3, parent=cls.a)
+        cls.d = create(4, parent=cls.b)
+        cls.e = create(5, parent=cls.b)
+        cls.f = create(6)
+
+    def expected(self, children, parents):
+        return {
+            (child.pk, parent.pk)
+            for child in children
+            for parent in parents
+            if child.is_child_of(parent)
+        }
+
+    def test_matches_is_child_of(self):
+        instances = [self.a, self.b, self.c, self.d, self.e, self.f]
+        expected = self.expected(instances, instances)
+        with self.assertNumQueries(1):
+            pairs = ExampleModel.objects.is_child_of_many(instances, instances)
+        self.assertEqual(pairs, expected)
+        self.assertIn((self.d.pk, self.a.pk), pairs)
+        self.assertNotIn((self.d.pk, self.d.pk), pairs)
+
+    def test_primary_keys(self):
+        self.assertEqual(
+            ExampleModel.objects.is_child_of_many(
+                [self.d.pk, self.c.pk, 0], [self.b.pk, self.f.pk]
+            ),
+            {(self.d.pk, self.b.pk)},
+        )
+
+    def test_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(ExampleModel.objects.is_child_of_many([], [self.a]), set())
+
+    def test_index(self):
+        with ForestIndex.build(ExampleModel) as index:
+            with self.assertNumQueries(0):
+                pairs = ExampleModel.objects.is_child_of_many(
+                    [self.d, self.e, self.c], [self.a, self.b], index
+                )
+        self.assertEqual(
+            pairs,
+            {
+                (self.d.pk, self.a.pk),
+                (self.d.pk, self.b.pk),
+                (self.e.pk, self.a.pk),
+                (self.e.pk, self.b.pk),
+                (self.c.pk, self.a.pk),
+            },
+        )
+
+    def test_cycle(self):
+        self.a.parent = self.d
+        self.a.save()
+        with self.assertRaises(CycleException):
+            ExampleModel.objects.is_child_of_many([self.e], [self.f])
+
+
+class DescendantsAtDepthTests(TestCase):
+    root: ExampleModel
+
+    @classmethod
+    def setUpTestData(cls):
+        # A binary tree with 4 generations below the root, where num is the
+        # generation.
+        cls.root = create(0)
+        generation = [cls.root]
+        for depth in range(1, 5):
+            generation = [
+                create(depth, parent=parent) for parent in generation for _ in "ab"
+            ]
+
+    def nums(self, queryset) -> list[int]:
+        with self.assertNumQueries(1):
+            return sorted(instance.num for instance in queryset)
+
+    def test_at_depth(self):
+        self.assertEqual(self.nums(self.root.descendants_at_depth(0)), [0])
+        self.assertEqual(self.nums(self.root.descendants_at_depth(1)), [1] * 2)
+        self.assertEqual(self.nums(self.root.descendants_at_depth(3)), [3] * 8)
+        self.assertEqual(self.nums(self.root.descendants_at_depth(5)), [])
+
+    def test_between_depths(self):
+        self.assertEqual(
+            self.nums(self.root.descendants_between_depths(2, 3)), [2] * 4 + [3] * 8
+        )
+        self.assertEqual(
+            self.nums(self.root.descendants_between_depths(0, 1)), [0, 1, 1]
+        )
+        with self.assertNumQueries(0):
+            self.assertFalse(self.root.descendants_between_depths(3, 2))
+
+    def test_relative_to_instance(self):
+        child = self.root.direct_children().first()
+        assert child is not None
+        self.assertEqual(self.nums(child.descendants_at_depth(2)), [3] * 4)
+
+    def test_prune_and_filter(self):
+        child = self.root.direct_children().first()
+        assert child is not None
+        self.assertEqual(
+            self.nums(self.root.descendants_at_depth(2, prune=Q(pk=child.pk))),
+            [2] * 2,
+        )
+        self.assertEqual(
+            self.nums(self.root.descendants_between_depths(1, 4, filter=Q(num__gte=3))),
+            [3] * 8 + [4] * 16,
+        )
+
+    def test_min_generations_requires_max(self):
+        with self.assertRaises(ValueError):
+            DescendantIds(ExampleModel, self.root.pk, min_generations=1)
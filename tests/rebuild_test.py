@@ -0,0 +1,141 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from django_hierarchical_models.index import ForestIndex
+from django_hierarchical_models.rebuild import rebuild, subtree_metrics
+from tests.models import DenormalizedExampleModel
+
+FIELDS = {"depth": "depth", "root": "top", "size": "size"}
+
+
+def create(num: int, **kwargs) -> DenormalizedExampleModel:
+    return DenormalizedExampleModel.objects.create(num=num, **kwargs)
+
+
+class RebuildTests(TestCase):
+    def setUp(self):
+        #   a      e    f
+        #  / \     |
+        # b   c    g
+        # |
+        # d
+        self.a = create(1)
+        self.b = create(2, parent=self.a)
+        self.c = create(3, parent=self.a)
+        self.d = create(4, parent=self.b)
+        self.e = create(5)
+        self.f = create(6)
+        self.g = create(7, parent=self.e)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.state_path = os.path.join(directory.name, "state")
+
+    def assertRebuilt(self, expected: dict):
+        rows = {
+            instance.num: (instance.depth, instance.top, instance.size)
+            for instance in DenormalizedExampleModel.objects.all()
+        }
+        self.assertEqual(rows, expected)
+
+    def expected(self):
+        a, e, f = self.a.pk, self.e.pk, self.f.pk
+        return {
+            1: (0, a, 4),
+            2: (1, a, 2),
+            3: (1, a, 1),
+            4: (2, a, 1),
+            5: (0, e, 2),
+            6: (0, f, 1),
+            7: (1, e, 1),
+        }
+
+    def test_subtree_metrics(self):
+        with ForestIndex.build(DenormalizedExampleModel) as index:
+            metrics = subtree_metrics(index, self.b.pk)
+        self.assertEqual(
+            metrics[self.b.pk],
+            {
+                "depth": 1,
+                "root": self.a.pk,
+                "children": 1,
+                "size": 2,
+                "leaves": 1,
+                "descendants": 1,
+            },
+        )
+        self.assertEqual(set(metrics), {self.b.pk, self.d.pk})
+
+    def test_rebuild(self):
+        progress = []
+        result = rebuild(
+            DenormalizedExampleModel,
+            FIELDS,
+            roots_per_task=2,
+            batch_size=3,
+            progress=lambda result, total: progress.append((result.roots, total)),
+        )
+        self.assertRebuilt(self.expected())
+        self.assertEqual((result.roots, result.rows, result.unreachable), (3, 7, 0))
+        self.assertEqual(progress, [(2, 3), (3, 3)])
+
+    def test_resume(self):
+        with open(self.state_path, "w") as f:
+            f.write(f"[{self.a.pk}]\n")
+        result = rebuild(DenormalizedExampleModel, FIELDS, state_path=self.state_path)
+        self.assertEqual((result.roots, result.skipped, result.rows), (2, 1, 3))
+        expected = self.expected()
+        for num in (1, 2, 3, 4):
+            expected[num] = (0, None, 0)
+        self.assertRebuilt(expected)
+        result = rebuild(DenormalizedExampleModel, FIELDS, state_path=self.state_path)
+        self.assertEqual((result.roots, result.skipped), (0, 3))
+
+    def test_unreachable(self):
+        DenormalizedExampleModel.objects.filter(pk=self.e.pk).update(parent=self.g)
+        result = rebuild(DenormalizedExampleModel, FIELDS)
+        self.assertEqual(result.unreachable, 2)
+
+    def test_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            rebuild(DenormalizedExampleModel, {"height": "depth"})
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "rebuild_hierarchy",
+            "tests.DenormalizedExampleModel",
+            field=["depth=depth", "root=top", "size=size"],
+            roots_per_task=1,
+            state_file=self.state_path,
+            stdout=out,
+        )
+        self.assertRebuilt(self.expected())
+        output = out.getvalue()
+        self.assertIn("1/3 roots", output)
+        self.assertIn("Rebuilt 7 rows under 3 roots", output)
+        out = StringIO()
+        call_command(
+            "rebuild_hierarchy",
+            "tests.DenormalizedExampleModel",
+            field=["depth=depth"],
+            state_file=self.state_path,
+            stdout=out,
+        )
+        self.assertIn("Skipped 3 roots", out.getvalue())
+
+    def test_command_rejects_field(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "rebuild_hierarchy", "tests.DenormalizedExampleModel", field=["depth"]
+            )
+        with self.assertRaises(CommandError):
+            call_command(
+                "rebuild_hierarchy",
+                "tests.DenormalizedExampleModel",
+                field=["height=depth"],
+            )
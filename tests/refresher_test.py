@@ -0,0 +1,105 @@
+import asyncio
+import os
+import tempfile
+
+from django.test import TestCase
+
+from django_hierarchical_models.index import ForestIndex
+from django_hierarchical_models.refresher import IndexRefresher
+from tests.models import TimestampedExampleModel
+
+
+def create(num: int, **kwargs) -> TimestampedExampleModel:
+    return TimestampedExampleModel.objects.create(num=num, **kwargs)
+
+
+class IndexRefresherTests(TestCase):
+    def setUp(self):
+        self.n1 = create(1)
+        self.n2 = create(2, parent=self.n1)
+        self.n3 = create(3)
+        self.refresher = IndexRefresher(
+            TimestampedExampleModel, "updated", full_refresh_every=2
+        )
+
+    def test_initial_refresh(self):
+        self.assertIsNone(self.refresher.index)
+        self.assertEqual(self.refresher.refresh(), 3)
+        self.assertEqual(self.refresher.index.root(self.n2), self.n1.pk)
+
+    def test_incremental_refresh(self):
+        self.refresher.refresh()
+        old = self.refresher.index
+        self.n2.set_parent(self.n3)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.refresher.refresh(), 1)
+        index = self.refresher.index
+        self.assertIsNot(index, old)
+        self.assertEqual(index.ancestors(self.n2), [self.n3.pk])
+        self.assertEqual(index.children(self.n1), [])
+        self.assertEqual(index.children(self.n3), [self.n2.pk])
+        self.assertEqual(old.root(self.n2), self.n1.pk)
+
+    def test_added_rows(self):
+        self.refresher.refresh()
+        old = self.refresher.index
+        n4 = create(4, parent=self.n2)
+        self.assertEqual(self.refresher.refresh(), 1)
+        self.assertEqual(self.refresher.index.ancestors(n4), [self.n2.pk, self.n1.pk])
+        self.assertNotIn(n4, old)
+
+    def test_unchanged_refresh_keeps_index(self):
+        self.refresher.refresh()
+        old = self.refresher.index
+        self.assertEqual(self.refresher.refresh(), 0)
+        self.assertIs(self.refresher.index, old)
+
+    def test_full_refresh_drops_deleted(self):
+        n1, n3 = self.n1.pk, self.n3.pk
+        self.refresher.refresh()
+        self.n3.delete()
+        self.refresher.refresh()
+        self.assertIn(n3, self.refresher.index)
+        self.refresher.refresh()
+        self.assertNotIn(n3, self.refresher.index)
+        self.n1.delete()
+        self.refresher.refresh(full=True)
+        self.assertNotIn(n1, self.refresher.index)
+        self.assertIsNone(self.refresher.index.parent(self.n2))
+
+    def test_queryset_source(self):
+        refresher = IndexRefresher(
+            TimestampedExampleModel.objects.filter(num__lt=3), "updated"
+        )
+        refresher.refresh()
+        self.assertEqual(len(refresher.index), 2)
+
+    def test_path(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.refresher.path = os.path.join(directory, "forest.idx")
+            self.refresher.refresh()
+            self.n2.set_parent(None)
+            self.refresher.refresh()
+            with ForestIndex.open(self.refresher.path) as index:
+                self.assertIsNone(index.parent(self.n2))
+
+    def test_thread(self):
+        self.refresher.refresh()
+        self.refresher.interval = 60
+        self.refresher.start()
+        with self.assertRaises(RuntimeError):
+            self.refresher.start()
+        self.refresher.stop(timeout=5)
+        self.assertIsNone(self.refresher._thread)
+
+    async def test_async(self):
+        async def loaded():
+            while self.refresher.index is None:
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(self.refresher.run())
+        try:
+            await asyncio.wait_for(loaded(), 5)
+        finally:
+            task.cancel()
+        self.assertEqual(len(self.refresher.index), 3)
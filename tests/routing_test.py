@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from django_hierarchical_models.models import routing
+from tests.models import ExampleModel
+
+
+def create(num: int, parent=None, using: str = "default") -> ExampleModel:
+    return ExampleModel.objects.using(using).create(num=num, parent=parent)
+
+
+class ReplicaRoutingTests(TestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        # The same tree on both databases, with num 100 higher on the replica.
+        #   a
+        #  / \\
+        # b   c
+        # |
+        # d
+        self.a = create(1)
+        self.b = create(2, self.a)
+        self.c = create(3, self.a)
+        self.d = create(4, self.b)
+        for instance in (self.a, self.b, self.c, self.d):
+            ExampleModel.objects.using("replica").create(
+                pk=instance.pk, num=instance.num + 100, parent_id=instance.parent_id
+            )
+        self.addCleanup(routing._pinned.clear)
+
+    def fresh(self, instance: ExampleModel) -> ExampleModel:
+        return ExampleModel.objects.get(pk=instance.pk)
+
+    def test_ancestors(self):
+        d = self.fresh(self.d)
+        with self.assertNumQueries(0), self.assertNumQueries(2, using="replica"):
+            ancestors = d.ancestors(using="replica")
+        self.assertEqual([a.num for a in ancestors], [102, 101])
+        self.assertEqual([a.num for a in d.ancestors()], [2, 1])
+
+    def test_ancestors_max_level(self):
+        d = self.fresh(self.d)
+        ancestors = d.ancestors(max_level=1, using="replica")
+        self.assertEqual([a.num for a in ancestors], [102])
+
+    def test_ancestors_replication_lag(self):
+        ExampleModel.objects.using("replica").filter(pk=self.b.pk).delete()
+        d = self.fresh(self.d)
+        ancestors = d.ancestors(using="replica")
+        # Only b, missing from the replica, is read from the primary.
+        self.assertEqual([a.num for a in ancestors], [2, 101])
+
+    def test_root(self):
+        d = self.fresh(self.d)
+        with self.assertNumQueries(0), self.assertNumQueries(2, using="replica"):
+            self.assertEqual(d.root(using="replica").num, 101)
+        self.assertEqual(self.fresh(self.a).root(using="replica").num, 1)
+
+    def test_direct_children(self):
+        with self.assertNumQueries(0), self.assertNumQueries(1, using="replica"):
+            nums = {c.num for c in self.a.direct_children(using="replica")}
+        self.assertEqual(nums, {102, 103})
+        self.assertEqual({c.num for c in self.a.direct_children()}, {2, 3})
+
+    def test_children(self):
+        with self.assertNumQueries(0):
+            node = self.a.children(using="replica")
+        self.assertEqual(node.instance.num, 1)
+        self.assertEqual(
+            sorted(child.instance.num for child in node.children), [102, 103]
+        )
+        self.assertEqual(
+            [child.instance.num for child in node.children[0].children], [104]
+        )
+
+    def test_read_your_writes_off(self):
+        self.c.set_parent(self.d)
+        d = self.fresh(self.d)
+        self.assertEqual(d.direct_children(using="replica").count(), 0)
+
+    @override_settings(HIERARCHICAL_MODELS_READ_YOUR_WRITES=5)
+    def test_read_your_writes(self):
+        with mock.patch.object(routing.time, "monotonic", return_value=100.0):
+            self.c.set_parent(self.d)
+            c = self.fresh(self.c)
+            self.assertEqual([a.num for a in c.ancestors(using="replica")], [4, 2, 1])
+            self.assertEqual(c.root(using="replica").num, 1)
+            self.assertEqual(
+                [n.num for n in self.d.direct_children(using="replica")], [3]
+            )
+            node = self.b.children(using="replica")
+            self.assertEqual(node.children[0].children[0].instance.num, 3)
+        with mock.patch.object(routing.time, "monotonic", return_value=105.0):
+            self.assertEqual(
+                [a.num for a in self.fresh(self.c).ancestors(using="replica")],
+                [104, 102, 101],
+            )
+        self.assertEqual(routing._pinned, {})
+
+    @override_settings(HIERARCHICAL_MODELS_READ_YOUR_WRITES=5)
+    def test_read_your_writes_other_model(self):
+        self.c.set_parent(self.d)
+        self.assertEqual(routing.db_for_read(ExampleModel, "replica"), "default")
+        self.assertIsNone(routing._pinned.get("tests.CachedExampleModel"))
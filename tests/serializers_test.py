@@ -0,0 +1,97 @@
+import datetime
+import json
+import sys
+from io import StringIO
+
+from django.test import SimpleTestCase
+
+from django_hierarchical_models.models import Node
+from django_hierarchical_models.serializers import (
+    dump_flat,
+    dump_json,
+    dump_jsonl,
+    flat_rows,
+)
+from tests.models import ExampleModel
+
+
+def node(pk: int, *children: Node[ExampleModel]) -> Node[ExampleModel]:
+    return Node(ExampleModel(pk=pk, num=pk * 10), list(children))
+
+
+def tree() -> Node[ExampleModel]:
+    return node(1, node(2, node(4)), node(3))
+
+
+class SerializerTests(SimpleTestCase):
+    def test_dump_json(self):
+        out = StringIO()
+        dump_json(tree(), out, fields=("pk", "num"))
+        self.assertEqual(
+            json.loads(out.getvalue()),
+            {
+                "pk": 1,
+                "num": 10,
+                "children": [
+                    {
+                        "pk": 2,
+                        "num": 20,
+                        "children": [{"pk": 4, "num": 40, "children": []}],
+                    },
+                    {"pk": 3, "num": 30, "children": []},
+                ],
+            },
+        )
+
+    def test_dump_json_no_fields(self):
+        out = StringIO()
+        dump_json(node(1, node(2)), out, fields=(), children_key="c")
+        self.assertEqual(json.loads(out.getvalue()), {"c": [{"c": []}]})
+
+    def test_dump_json_encoder(self):
+        root = node(1)
+        root.instance.when = datetime.date(2020, 1, 2)  # type: ignore
+        out = StringIO()
+        dump_json(root, out, fields=("when",))
+        self.assertEqual(json.loads(out.getvalue())["when"], "2020-01-02")
+
+    def test_flat_rows(self):
+        self.assertEqual(
+            list(flat_rows(tree(), fields=("num",))),
+            [(1, None, 10), (2, 1, 20), (4, 2, 40), (3, 1, 30)],
+        )
+
+    def test_dump_jsonl(self):
+        out = StringIO()
+        dump_jsonl(tree(), out)
+        self.assertEqual(
+            [json.loads(line) for line in out.getvalue().splitlines()],
+            [
+                {"pk": 1, "parent": None},
+                {"pk": 2, "parent": 1},
+                {"pk": 4, "parent": 2},
+                {"pk": 3, "parent": 1},
+            ],
+        )
+
+    def test_dump_flat(self):
+        out = StringIO()
+        dump_flat(tree(), out, fields=("num",))
+        self.assertEqual(
+            json.loads(out.getvalue()),
+            [[1, None, 10], [2, 1, 20], [4, 2, 40], [3, 1, 30]],
+        )
+
+    def test_deep_tree(self):
+        length = sys.getrecursionlimit() * 5
+        root = leaf = node(0)
+        for pk in range(1, length):
+            child = node(pk)
+            leaf.children.append(child)
+            leaf = child
+        out = StringIO()
+        dump_json(root, out)
+        self.assertEqual(out.getvalue().count('"pk"'), length)
+        out = StringIO()
+        dump_jsonl(root, out)
+        self.assertEqual(len(out.getvalue().splitlines()), length)
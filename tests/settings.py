@@ -12,6 +12,9 @@ if "SQLITE" in os.environ:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
         },
+        "replica": {
+            "ENGINE": "django.db.backends.sqlite3",
+        },
     }
 else:
     DATABASES = {
@@ -24,6 +27,10 @@ else:
             "PORT": os.environ.get("POSTGRES_PORT", "5432"),
         },
     }
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "TEST": {"NAME": "test_replica"},  # type: ignore[dict-item]
+    }
 
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
@@ -0,0 +1,175 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from django_hierarchical_models.models.exceptions import CycleException
+from django_hierarchical_models.transfer import (
+    export_csv,
+    export_jsonl,
+    export_rows,
+    import_csv,
+    import_jsonl,
+    import_rows,
+)
+from tests.models import DenormalizedExampleModel, ExampleModel
+
+
+def create(num: int, parent=None) -> ExampleModel:
+    return ExampleModel.objects.create(num=num, parent=parent)
+
+
+def shape(model=ExampleModel, **filters) -> set[tuple]:
+    """(num, parent num) of every row."""
+
+    return {
+        (instance.num, instance.parent.num if instance.parent else None)
+        for instance in model.objects.filter(**filters).select_related("parent")
+    }
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        #   a      e    f
+        #  / \     |
+        # b   c    g
+        # |
+        # d
+        self.a = create(1)
+        self.b = create(2, self.a)
+        self.c = create(3, self.a)
+        self.d = create(4, self.b)
+        self.e = create(5)
+        self.f = create(6)
+        self.g = create(7, self.e)
+        self.tree = {(1, None), (2, 1), (3, 1), (4, 2), (5, None), (6, None), (7, 5)}
+
+    def test_export_rows_by_generation(self):
+        with self.assertNumQueries(4):
+            rows = list(export_rows(ExampleModel))
+        self.assertEqual(
+            [row["num"] for row in rows],
+            [1, 5, 6, 2, 3, 7, 4],
+        )
+        self.assertEqual(rows[0], {"pk": self.a.pk, "parent": None, "num": 1})
+        self.assertEqual(rows[3]["parent"], self.a.pk)
+
+    def test_export_rows_subtree(self):
+        rows = list(export_rows(ExampleModel, root=self.b, fields=["num"]))
+        self.assertEqual(
+            rows,
+            [
+                {"pk": self.b.pk, "parent": None, "num": 2},
+                {"pk": self.d.pk, "parent": self.b.pk, "num": 4},
+            ],
+        )
+
+    def test_export_rows_queryset(self):
+        rows = export_rows(ExampleModel.objects.exclude(pk=self.b.pk))
+        self.assertEqual([row["num"] for row in rows], [1, 5, 6, 3, 7])
+
+    def test_export_rows_batches_parents(self):
+        # The roots, then two queries for the three parents of the second and
+        # third generations, and one for the last.
+        with self.assertNumQueries(1 + 2 + 2 + 1):
+            rows = list(export_rows(ExampleModel, batch_size=2))
+        self.assertEqual(len(rows), 7)
+
+    def test_export_rows_cycle(self):
+        ExampleModel.objects.filter(pk=self.a.pk).update(parent=self.d)
+        with self.assertRaises(CycleException):
+            list(export_rows(ExampleModel, root=self.a))
+
+    def test_jsonl_round_trip(self):
+        fp = StringIO()
+        self.assertEqual(export_jsonl(fp, ExampleModel), 7)
+        ExampleModel.objects.all().delete()
+        fp.seek(0)
+        # One INSERT per generation.
+        with self.assertNumQueries(3):
+            self.assertEqual(import_jsonl(fp, ExampleModel), 7)
+        self.assertEqual(shape(), self.tree)
+
+    def test_csv_round_trip(self):
+        DenormalizedExampleModel.objects.create(num=1, top=None)
+        root = DenormalizedExampleModel.objects.get()
+        DenormalizedExampleModel.objects.create(num=2, top=root.pk, parent=root)
+        fp = StringIO()
+        self.assertEqual(export_csv(fp, DenormalizedExampleModel), 2)
+        self.assertEqual(fp.getvalue().splitlines()[0], "pk,parent,num,depth,top,size")
+        fp.seek(0)
+        self.assertEqual(import_csv(fp, DenormalizedExampleModel), 2)
+        imported = DenormalizedExampleModel.objects.exclude(
+            pk__in=[root.pk, root.pk + 1]
+        ).order_by("pk")
+        self.assertEqual(
+            [(row.num, row.top, row.parent_id) for row in imported],
+            [(1, None, None), (2, root.pk, imported[0].pk)],
+        )
+
+    def test_import_under_parent(self):
+        rows = list(export_rows(ExampleModel, root=self.a))
+        import_rows(ExampleModel, rows, parent=self.f)
+        self.assertEqual(
+            shape(pk__gt=self.g.pk),
+            {(1, 6), (2, 1), (3, 1), (4, 2)},
+        )
+
+    def test_import_batch_size(self):
+        rows = list(export_rows(ExampleModel))
+        with self.assertNumQueries(4):
+            self.assertEqual(import_rows(ExampleModel, rows, batch_size=2), 7)
+
+    def test_import_out_of_order(self):
+        rows = list(export_rows(ExampleModel))
+        with self.assertRaisesMessage(ValueError, f"parent {self.b.pk}"):
+            import_rows(ExampleModel, [rows[0], rows[-1]])
+
+    def test_commands(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for format in ("jsonl", "csv"):
+            path = os.path.join(directory.name, f"forest.{format}")
+            call_command(
+                "export_forest",
+                "tests.ExampleModel",
+                root=str(self.e.pk),
+                output=path,
+                format=format,
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+            out = StringIO()
+            call_command(
+                "import_forest",
+                "tests.ExampleModel",
+                path,
+                format=format,
+                parent=str(self.c.pk),
+                stdout=out,
+            )
+            self.assertIn("Imported 2 rows into tests.ExampleModel", out.getvalue())
+        self.assertEqual(
+            ExampleModel.objects.filter(parent=self.c).count(),
+            2,
+        )
+
+    def test_export_command_stdout(self):
+        out = StringIO()
+        call_command("export_forest", "tests.ExampleModel", field=["num"], stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(set(rows[0]), {"pk", "parent", "num"})
+
+    def test_import_command_errors(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "forest.jsonl")
+        with open(path, "w") as f:
+            f.write(json.dumps({"pk": 2, "parent": 1, "num": 2}) + "\n")
+        with self.assertRaises(CommandError):
+            call_command("import_forest", "tests.ExampleModel", path)